@@ -0,0 +1,177 @@
+# accounts/geoip.py
+"""
+Offline IPv4 → (lat, lng) lookup.
+
+The table is a flat binary file memory-mapped read-only, so every worker
+shares the same pages and a lookup is a binary search with no I/O:
+
+    header  : MAGIC (8 bytes) + record count (uint32)
+    records : start_ip uint32, end_ip uint32, lat float32, lng float32
+              sorted by start_ip, non-overlapping
+"""
+import csv
+import ipaddress
+import mmap
+import os
+import struct
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+
+
+MAGIC = b"SQGEOIP1"
+HEADER = struct.Struct("<8sI")
+RECORD = struct.Struct("<IIff")
+
+LOOKUP_CACHE_SIZE = 65536
+
+
+class IPRangeTable:
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a geoip table")
+
+    def close(self):
+        self._mm.close()
+
+    def _start_at(self, idx: int) -> int:
+        return RECORD.unpack_from(self._mm, HEADER.size + idx * RECORD.size)[0]
+
+    def lookup(self, ip_int: int):
+        # rightmost record with start_ip <= ip_int, searched in the mapped file
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._start_at(mid) <= ip_int:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        idx = lo - 1
+        if idx < 0:
+            return None
+
+        start, end, lat, lng = RECORD.unpack_from(self._mm, HEADER.size + idx * RECORD.size)
+        if not (start <= ip_int <= end):
+            return None
+
+        return lat, lng
+
+
+def _parse_ip(value: str) -> int:
+    value = value.strip()
+    if value.isdigit():
+        return int(value)
+    return int(ipaddress.IPv4Address(value))
+
+
+def build_ip_table(csv_path: str, out_path: str) -> int:
+    """
+    Convert a "start,end,lat,lng" CSV (integer or dotted IPs, optional
+    header row) into the binary table. Returns the number of ranges written.
+    """
+    rows = []
+    with open(csv_path, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 4:
+                continue
+            try:
+                rows.append((_parse_ip(row[0]), _parse_ip(row[1]), float(row[2]), float(row[3])))
+            except ValueError:
+                continue  # header / IPv6 / malformed
+
+    rows.sort()
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(rows)))
+        for record in rows:
+            f.write(RECORD.pack(*record))
+    os.replace(tmp_path, out_path)
+
+    return len(rows)
+
+
+_table = None
+_table_key = None         # (inode, mtime) of the opened file
+_table_checked_at = 0.0
+_table_lock = threading.Lock()
+
+# build_geoip_table swaps the file in place (os.replace); workers notice on the next check
+TABLE_RECHECK_SECONDS = 60
+
+
+def get_ip_table():
+    """
+    Lazily open the configured table; None if it isn't installed.
+    Reopened when the file is replaced, which also drops cached lookups.
+    """
+    global _table, _table_key, _table_checked_at
+
+    now = time.monotonic()
+    if _table is not None and now - _table_checked_at < TABLE_RECHECK_SECONDS:
+        return _table
+
+    with _table_lock:
+        _table_checked_at = now
+
+        try:
+            st = os.stat(settings.GEOIP_DATABASE_PATH)
+        except FileNotFoundError:
+            return _table
+
+        key = (st.st_ino, st.st_mtime_ns)
+        if key != _table_key:
+            old_table = _table
+            _table = IPRangeTable(settings.GEOIP_DATABASE_PATH)
+            _table_key = key
+            _cached_lookup.cache_clear()
+
+            # ✅ release the replaced mapping (the file handle closed after mmap())
+            if old_table is not None:
+                old_table.close()
+
+    return _table
+
+
+@lru_cache(maxsize=LOOKUP_CACHE_SIZE)
+def _cached_lookup(table, ip_int: int):
+    # only reached with an open table; cleared whenever the table is reopened
+    return table.lookup(ip_int)
+
+
+def local_ip_location(ip_address: str):
+    try:
+        ip = ipaddress.ip_address(ip_address)
+    except ValueError:
+        return None
+
+    if ip.version != 4 or not ip.is_global:
+        return None
+
+    # ✅ no table -> not cached, so installing one takes effect without a restart
+    table = get_ip_table()
+    if table is None:
+        return None
+
+    try:
+        hit = _cached_lookup(table, int(ip))
+    except ValueError:
+        return None  # table closed by a reload mid-lookup; the next call uses the new one
+    if not hit:
+        return None
+
+    lat, lng = hit
+    return {
+        "lat": lat,
+        "lng": lng,
+        "source": "IP",
+    }
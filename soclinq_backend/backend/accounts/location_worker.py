@@ -0,0 +1,116 @@
+# accounts/location_worker.py
+"""
+Background IP → location enrichment.
+
+The middleware only enqueues (user_id, ip); a single daemon thread per
+process does the geo-IP lookup, admin unit resolution and user.save().
+Pending work is deduplicated per user: if a user fires ten requests before
+the worker gets to them, they are enriched once, with the latest IP.
+"""
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_QUEUE_SIZE = 10_000
+
+
+class LocationEnrichmentWorker:
+    def __init__(self, max_pending: int):
+        self.max_pending = max_pending
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = {}  # user_id -> latest ip
+        self._lock = threading.Lock()
+
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # started lazily so forked workers (gunicorn) each get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run,
+                    name="location-enrichment",
+                    daemon=True,
+                )
+                self._thread.start()
+
+    def enqueue(self, user_id, ip_address) -> bool:
+        """
+        Schedule enrichment. Never blocks; returns False if dropped.
+        """
+        if not user_id or not ip_address:
+            return False
+
+        self._ensure_started()
+
+        with self._lock:
+            if user_id in self._pending:
+                # ✅ already queued: just refresh the IP
+                self._pending[user_id] = ip_address
+                return True
+
+            try:
+                self._queue.put_nowait(user_id)
+            except queue.Full:
+                return False
+
+            self._pending[user_id] = ip_address
+            return True
+
+    def _run(self):
+        while True:
+            user_id = self._queue.get()
+
+            with self._lock:
+                ip_address = self._pending.pop(user_id, None)
+
+            if ip_address is None:
+                continue
+
+            try:
+                enrich_user_location(user_id, ip_address)
+            except Exception:
+                logger.exception("location enrichment failed for user %s", user_id)
+            finally:
+                close_old_connections()
+
+
+def enrich_user_location(user_id, ip_address):
+    from accounts.utils import get_ip_location, update_user_location
+
+    ip_location = get_ip_location(ip_address)
+    if not ip_location:
+        return
+
+    User = get_user_model()
+    user = User.objects.filter(id=user_id).first()
+    if not user:
+        return
+
+    # 🚫 Never override GPS (re-checked against fresh state)
+    if user.last_known_location and user.location_source == "GPS":
+        return
+
+    update_user_location(
+        user=user,
+        lat=ip_location["lat"],
+        lng=ip_location["lng"],
+        source="IP",
+    )
+
+
+location_worker = LocationEnrichmentWorker(
+    max_pending=getattr(settings, "LOCATION_ENRICHMENT_QUEUE_SIZE", DEFAULT_QUEUE_SIZE),
+)
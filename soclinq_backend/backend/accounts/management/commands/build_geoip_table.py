@@ -0,0 +1,31 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accounts.geoip import build_ip_table
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the memory-mapped offline IPv4 location table from a "
+        "start,end,lat,lng CSV (e.g. an IP2Location / DB-IP lite export)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_path", help="Source CSV file")
+        parser.add_argument(
+            "--out",
+            default=None,
+            help="Output path (default: settings.GEOIP_DATABASE_PATH)",
+        )
+
+    def handle(self, *args, **options):
+        out_path = options["out"] or settings.GEOIP_DATABASE_PATH
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+        count = build_ip_table(options["csv_path"], out_path)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Wrote {count} IPv4 ranges to {out_path}")
+        )
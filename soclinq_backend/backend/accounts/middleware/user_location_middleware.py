@@ -1,11 +1,15 @@
+from django.core.cache import cache
 from django.utils.deprecation import MiddlewareMixin
 
-from accounts.utils import get_ip_location, update_user_location
+from accounts.location_worker import location_worker
+from accounts.utils import IP_UPDATE_THROTTLE_MINUTES
 
 
 class UserLocationMiddleware(MiddlewareMixin):
     """
     IP-based location fallback middleware with throttling.
+    The lookup itself runs in the background worker; the request only
+    pays for one cache round trip.
     """
 
     def process_request(self, request):
@@ -18,21 +22,15 @@ class UserLocationMiddleware(MiddlewareMixin):
         if user.last_known_location and user.location_source == "GPS":
             return
 
-        ip_address = self._get_client_ip(request)
-        ip_location = get_ip_location(ip_address)
-
-        if not ip_location:
-            return
-
+        # ⏱️ Throttle up front: at most one enrichment per user per window
+        throttle_key = f"loc_enrich:{user.id}"
         try:
-            update_user_location(
-                user=user,
-                lat=ip_location["lat"],
-                lng=ip_location["lng"],
-                source="IP",
-            )
+            if not cache.add(throttle_key, 1, timeout=IP_UPDATE_THROTTLE_MINUTES * 60):
+                return
         except Exception:
-            pass  # never block requests
+            return  # never block requests
+
+        location_worker.enqueue(user.id, self._get_client_ip(request))
 
     def _get_client_ip(self, request):
         xff = request.META.get("HTTP_X_FORWARDED_FOR")
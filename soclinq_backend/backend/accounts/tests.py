@@ -1,3 +1,68 @@
-from django.test import TestCase
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.test import SimpleTestCase, override_settings
+
+from accounts import geoip
+
+
+# =========================
+# ✅ OFFLINE GEO-IP TABLE
+# =========================
+
+class GeoIPTableTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "ipv4.bin")
+
+        for name, value in (("_table", None), ("_table_key", None), ("_table_checked_at", 0.0)):
+            patcher = mock.patch.object(geoip, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        geoip._cached_lookup.cache_clear()
+        self.addCleanup(geoip._cached_lookup.cache_clear)
+
+        settings_patcher = override_settings(GEOIP_DATABASE_PATH=self.path)
+        settings_patcher.enable()
+        self.addCleanup(settings_patcher.disable)
+
+    def build(self, *rows):
+        csv_path = os.path.join(self.tmp.name, "ranges.csv")
+        with open(csv_path, "w") as f:
+            f.write("start,end,lat,lng\n")
+            for row in rows:
+                f.write(",".join(str(v) for v in row) + "\n")
+        return geoip.build_ip_table(csv_path, self.path)
+
+    def test_lookup(self):
+        count = self.build(("8.8.8.0", "8.8.8.255", 37.5, -122.0), ("1.1.1.0", "1.1.1.255", -33.5, 151.0))
+        self.assertEqual(count, 2)
+
+        hit = geoip.local_ip_location("1.1.1.1")
+        self.assertEqual(hit["source"], "IP")
+        self.assertAlmostEqual(hit["lat"], -33.5)
+
+        self.assertIsNone(geoip.local_ip_location("9.9.9.9"))  # past the last range
+        self.assertIsNone(geoip.local_ip_location("10.0.0.1"))  # private
+        self.assertIsNone(geoip.local_ip_location("not an ip"))
+
+    def test_missing_table_is_not_cached(self):
+        self.assertIsNone(geoip.local_ip_location("8.8.8.8"))
+
+        self.build(("8.8.8.0", "8.8.8.255", 37.5, -122.0))
+
+        self.assertIsNotNone(geoip.local_ip_location("8.8.8.8"))
+
+    def test_rebuilt_table_is_reloaded_and_old_one_closed(self):
+        self.build(("8.8.8.0", "8.8.8.255", 37.5, -122.0))
+        self.assertAlmostEqual(geoip.local_ip_location("8.8.8.8")["lat"], 37.5)
+        old_table = geoip._table
+
+        self.build(("8.8.8.0", "8.8.8.255", 40.0, -100.0))
+        with mock.patch.object(geoip, "TABLE_RECHECK_SECONDS", 0):
+            self.assertAlmostEqual(geoip.local_ip_location("8.8.8.8")["lat"], 40.0)
+
+        self.assertIsNot(geoip._table, old_table)
+        self.assertTrue(old_table._mm.closed)
@@ -58,11 +58,12 @@ def update_user_location(user, lat, lng, source="UNKNOWN"):
         country_code=None,
     )
 
-    admin_units, confidence = resolver.resolve()
+    resolved = resolver.resolve()
+    admin_units = resolved.admin_units
 
     user.last_known_location = point
     user.location_source = source
-    user.location_confidence = confidence
+    user.location_confidence = resolved.confidence
     user.location_updated_at = now
 
     user.admin_0 = admin_units.get(0)
@@ -81,17 +82,35 @@ def update_user_location(user, lat, lng, source="UNKNOWN"):
 
 
 import requests
+from django.conf import settings
+
+from .geoip import local_ip_location
+
 
 def get_ip_location(ip_address):
     """
     Resolve IP to approximate lat/lng.
-    Keep this lightweight and replaceable.
+    Backend is chosen by settings.GEOIP_BACKEND:
+      "local" (default) – memory-mapped offline table, no network
+      "ipapi"           – legacy ipapi.co HTTP lookup (dev only)
+      anything else     – disabled
     """
     if not ip_address:
         return None
 
+    backend = getattr(settings, "GEOIP_BACKEND", "local")
+
+    if backend == "local":
+        return local_ip_location(ip_address)
+
+    if backend == "ipapi":
+        return _ipapi_location(ip_address)
+
+    return None
+
+
+def _ipapi_location(ip_address):
     try:
-        # Example using ipapi.co (replace later if needed)
         resp = requests.get(
             f"https://ipapi.co/{ip_address}/json/",
             timeout=2,
@@ -163,6 +182,7 @@ class MeSerializer(serializers.ModelSerializer):
 
 
 # websocket/ws_tokens.py
+import uuid
 from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
@@ -174,6 +194,7 @@ def issue_ws_token(user):
     payload = {
         "sub": str(user.id),
         "scope": "ws",
+        "jti": uuid.uuid4().hex,  # key for the WS principal cache
         "iat": timezone.now(),
         "exp": timezone.now() + timedelta(seconds=WS_TOKEN_TTL),
     }
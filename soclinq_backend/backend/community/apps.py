@@ -5,3 +5,6 @@ from django.db.utils import OperationalError
 class CommunityConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "community"
+
+    def ready(self):
+        from community import signals  # noqa: F401
@@ -0,0 +1,256 @@
+# community/forwarding.py
+"""
+Bulk forward engine.
+
+Forwarding M messages to T targets used to cost M*T transactions and M*T
+blocking channel-layer calls. Here every copy (and its attachments) is built
+in memory and written with bulk_create inside ONE transaction; after commit
+each target group gets ONE batched event ("message:batch") with all of its
+new messages, and the T group sends run concurrently.
+
+Copies of one target keep the source order: they get consecutive
+microsecond timestamps from a single `now`. A reply pointer is only kept when
+the copy lands in the source's own hub / conversation; elsewhere it would
+expose a message the target's members can't see.
+"""
+import asyncio
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from community.hub_stats import set_hub_last_message
+from community.hydration import serialize_hub_messages
+from community.models import HubMessage, MessageAttachment, PrivateMessage, PrivateMessageAttachment
+from websocket.events.broadcaster import hub_group_shards
+from websocket.events.bus import Event, HubEvent, PrivateEvent, apublish_hub, apublish_private, record_failed
+
+logger = logging.getLogger(__name__)
+
+
+ATTACHMENT_COPY_FIELDS = (
+    "attachment_type",
+    "url",
+    "s3_key",
+    "thumbnail_url",
+    "mime_type",
+    "file_name",
+    "file_size",
+    "width",
+    "height",
+    "duration_ms",
+)
+
+
+def _copy_attachments(model, src, message) -> list:
+    # src.attachments must be prefetched
+    return [
+        model(message=message, **{name: getattr(a, name) for name in ATTACHMENT_COPY_FIELDS})
+        for a in src.attachments.all()
+    ]
+
+
+def _in_source_order(src_list) -> list:
+    return sorted(src_list, key=lambda m: (m.created_at, m.id))
+
+
+def _reply_to_id(src, same_thread: bool):
+    return src.reply_to_id if same_thread else None
+
+
+# =========================
+# ✅ FAN-OUT
+# =========================
+
+async def _publish_batches(publishers):
+    """
+    publishers: [(target_id, event, coroutine)]; one failed target doesn't stop the others.
+    """
+    results = await asyncio.gather(*(coro for _, _, coro in publishers), return_exceptions=True)
+
+    for (target_id, event, _), result in zip(publishers, results):
+        if isinstance(result, BaseException):
+            record_failed(event.type)
+            logger.error(
+                "forward batch publish failed for %s", target_id,
+                exc_info=(type(result), result, result.__traceback__),
+            )
+
+
+def _publish_on_commit(make_publishers):
+    """
+    make_publishers: zero-arg callable returning [(target_id, event, coroutine)];
+    run concurrently after commit.
+    """
+    transaction.on_commit(lambda: async_to_sync(_publish_batches)(make_publishers()))
+
+
+# =========================
+# ✅ HUBS
+# =========================
+
+def forward_hub_messages(user, src_list, target_hub_ids, request=None) -> list:
+    """
+    Forward src_list (attachments prefetched) into each of target_hub_ids
+    (membership already checked). Returns the serialized copies.
+    """
+    src_list = _in_source_order(src_list)
+    target_hub_ids = list(dict.fromkeys(target_hub_ids))
+    if not src_list or not target_hub_ids:
+        return []
+
+    now = timezone.now()
+    messages, attachments = [], []
+    last_per_hub = {}
+
+    for hub_id in target_hub_ids:
+        for i, src in enumerate(src_list):
+            msg = HubMessage(
+                hub_id=hub_id,
+                sender=user,
+                text=src.text or "",
+                message_type=src.message_type,
+                reply_to_id=_reply_to_id(src, str(src.hub_id) == str(hub_id)),
+                forwarded_from=src,
+                is_forwarded=True,
+                created_at=now + timedelta(microseconds=i),
+            )
+            messages.append(msg)
+            attachments.extend(_copy_attachments(MessageAttachment, src, msg))
+            last_per_hub[hub_id] = msg
+
+    with transaction.atomic():
+        HubMessage.objects.bulk_create(messages)
+        MessageAttachment.objects.bulk_create(attachments)
+
+        # ✅ one UPDATE for all sources (each went to every target)
+        HubMessage.objects.filter(id__in=[src.id for src in src_list]).update(
+            forwarded_count=F("forwarded_count") + len(target_hub_ids)
+        )
+
+        for msg in last_per_hub.values():
+            set_hub_last_message(msg)
+
+        payloads = serialize_hub_messages(messages, request=request, viewer_id=user.id)
+
+        by_hub = {}
+        for msg, payload in zip(messages, payloads):
+            by_hub.setdefault(str(msg.hub_id), []).append(payload)
+
+        shards = {hub_id: hub_group_shards(hub_id) for hub_id in by_hub}
+
+        events = {
+            hub_id: Event(HubEvent.MESSAGE_BATCH, {"hubId": hub_id, "messages": hub_payloads})
+            for hub_id, hub_payloads in by_hub.items()
+        }
+
+        _publish_on_commit(lambda: [
+            (hub_id, event, apublish_hub(hub_id, event, shards=shards[hub_id]))
+            for hub_id, event in events.items()
+        ])
+
+    return payloads
+
+
+# =========================
+# ✅ PRIVATE CONVERSATIONS
+# =========================
+
+def _private_payload(msg, src, attachments) -> dict:
+    sender = msg.sender
+    reply = src.reply_to if msg.reply_to_id else None
+
+    return {
+        "id": str(msg.id),
+        "clientTempId": None,
+        "conversationId": str(msg.conversation_id),
+        "messageType": msg.message_type,
+        "text": msg.text,
+        "sender": {"id": str(sender.id), "name": sender.full_name or sender.username},
+        "createdAt": msg.created_at.isoformat(),
+        "isMine": True,
+        "deletedAt": None,
+        "editedAt": None,
+        "attachments": [
+            {
+                "id": str(a.id),
+                "type": a.attachment_type,
+                "url": a.url,
+                "thumbnailUrl": a.thumbnail_url,
+                "mime_type": a.mime_type,
+                "file_name": a.file_name,
+                "file_size": a.file_size,
+                "width": a.width,
+                "height": a.height,
+                "duration_ms": a.duration_ms,
+            }
+            for a in attachments
+        ],
+        "reactions": [],
+        "myReaction": None,
+        "replyTo": (
+            {
+                "id": str(reply.id),
+                "text": "" if reply.deleted_at else (reply.text or ""),
+                "senderName": reply.sender.full_name or reply.sender.username,
+            }
+            if reply
+            else None
+        ),
+    }
+
+
+def forward_private_messages(user, src_list, target_conversation_ids) -> list:
+    """
+    Forward src_list (attachments prefetched, reply_to__sender selected) into each of
+    target_conversation_ids (membership already checked). Returns payloads.
+    """
+    src_list = _in_source_order(src_list)
+    target_conversation_ids = list(dict.fromkeys(target_conversation_ids))
+    if not src_list or not target_conversation_ids:
+        return []
+
+    now = timezone.now()
+    copies, attachments = [], []
+
+    for conversation_id in target_conversation_ids:
+        for i, src in enumerate(src_list):
+            msg = PrivateMessage(
+                conversation_id=conversation_id,
+                sender=user,
+                text=src.text or "",
+                message_type=src.message_type,
+                reply_to_id=_reply_to_id(src, str(src.conversation_id) == str(conversation_id)),
+                created_at=now + timedelta(microseconds=i),
+            )
+            copy_attachments = _copy_attachments(PrivateMessageAttachment, src, msg)
+            copies.append((msg, src, copy_attachments))
+            attachments.extend(copy_attachments)
+
+    with transaction.atomic():
+        PrivateMessage.objects.bulk_create([msg for msg, _, _ in copies])
+        PrivateMessageAttachment.objects.bulk_create(attachments)
+
+        payloads = [_private_payload(msg, src, copy_attachments) for msg, src, copy_attachments in copies]
+
+        by_conversation = {}
+        for payload in payloads:
+            by_conversation.setdefault(payload["conversationId"], []).append(payload)
+
+        events = {
+            conversation_id: Event(
+                PrivateEvent.MESSAGE_BATCH,
+                {"conversationId": conversation_id, "messages": convo_payloads},
+            )
+            for conversation_id, convo_payloads in by_conversation.items()
+        }
+
+        _publish_on_commit(lambda: [
+            (conversation_id, event, apublish_private(conversation_id, event))
+            for conversation_id, event in events.items()
+        ])
+
+    return payloads
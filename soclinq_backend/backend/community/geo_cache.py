@@ -0,0 +1,132 @@
+# community/geo_cache.py
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# precision 7 ≈ 150m x 150m cells: small enough that a cell rarely straddles
+# an LGA boundary, large enough that a neighbourhood shares one entry
+DEFAULT_PRECISION = 7
+DEFAULT_LOCAL_SIZE = 10_000
+DEFAULT_SHARED_TTL_SECONDS = 60 * 60 * 24
+DEFAULT_SHARED_ALIAS = "geo_resolve"
+
+
+def geohash_encode(lat: float, lng: float, precision: int = DEFAULT_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits = bits << 1
+            rng[1] = mid
+
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+class ResolutionCache:
+    """
+    geohash cell → resolved admin unit ids.
+
+    Two tiers: an in-process LRU in front of the `shared_alias` Django cache
+    (Redis when GEO_RESOLVE_CACHE_URL is set, so workers reuse each other's
+    resolutions; a dummy cache otherwise, leaving only the local tier).
+    Values are plain dicts: {"units": {level: unit_id}, "fallback": bool}.
+    """
+
+    def __init__(self, precision: int, local_size: int, shared_ttl: int, shared_alias: str = DEFAULT_SHARED_ALIAS):
+        self.precision = precision
+        self.local_size = local_size
+        self.shared_ttl = shared_ttl
+        self.shared_alias = shared_alias
+
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0}
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _key(self, lat: float, lng: float, country_code: str | None) -> str:
+        cell = geohash_encode(lat, lng, self.precision)
+        return f"georesolve:{(country_code or '*').upper()}:{cell}"
+
+    def _remember(self, key: str, value: dict):
+        with self._lock:
+            self._local[key] = value
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
+
+    def get(self, lat: float, lng: float, country_code: str | None = None):
+        key = self._key(lat, lng, country_code)
+
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return value
+
+        value = self.shared.get(key)
+        if value is not None:
+            self._remember(key, value)
+            with self._lock:
+                self._stats["shared_hits"] += 1
+            return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def set(self, lat: float, lng: float, country_code: str | None, value: dict):
+        key = self._key(lat, lng, country_code)
+        self._remember(key, value)
+        self.shared.set(key, value, timeout=self.shared_ttl)
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["local_size"] = len(self._local)
+
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = (
+            (stats["local_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        )
+        return stats
+
+
+resolution_cache = ResolutionCache(
+    precision=getattr(settings, "GEO_RESOLVE_CACHE_PRECISION", DEFAULT_PRECISION),
+    local_size=getattr(settings, "GEO_RESOLVE_CACHE_LOCAL_SIZE", DEFAULT_LOCAL_SIZE),
+    shared_ttl=getattr(settings, "GEO_RESOLVE_CACHE_TTL_SECONDS", DEFAULT_SHARED_TTL_SECONDS),
+    shared_alias=getattr(settings, "GEO_RESOLVE_CACHE_ALIAS", DEFAULT_SHARED_ALIAS),
+)
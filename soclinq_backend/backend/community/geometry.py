@@ -0,0 +1,40 @@
+# community/geometry.py
+from django.db import connection, transaction
+
+from community.models import AdminUnit, AdminUnitPiece
+
+
+SUBDIVIDE_MAX_VERTICES = 256
+
+
+def rebuild_admin_unit_pieces(country_code: str | None = None, max_vertices: int = SUBDIVIDE_MAX_VERTICES) -> int:
+    """
+    Regenerate AdminUnitPiece rows with ST_Subdivide, entirely inside PostGIS.
+    Scoped to one country when given. Returns the number of pieces written.
+    """
+    pieces_table = AdminUnitPiece._meta.db_table
+    units_table = AdminUnit._meta.db_table
+
+    where = ""
+    params = [max_vertices]
+    if country_code:
+        where = "WHERE country_code = %s"
+        params.append(country_code)
+
+    with transaction.atomic():
+        pieces = AdminUnitPiece.objects.all()
+        if country_code:
+            pieces = pieces.filter(country_code=country_code)
+        pieces.delete()
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {pieces_table} (admin_unit_id, country_code, level, geom)
+                SELECT id, country_code, level, ST_Subdivide(geom, %s)
+                FROM {units_table}
+                {where}
+                """,
+                params,
+            )
+            return cursor.rowcount
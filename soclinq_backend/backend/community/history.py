@@ -0,0 +1,391 @@
+# community/history.py
+"""
+Keyset-paginated message history.
+
+Pages are addressed by a (created_at, id) cursor instead of OFFSET, so the
+cost of a page depends on the page size only, not on how far back the
+user has scrolled:
+
+  before=<cursor>   older messages (default: newest page)
+  after=<cursor>    newer messages
+  around=<msg id>   "jump to message": the anchor plus context on both sides
+
+Rows are fetched with values() (no model instances) and returned oldest ->
+newest, the order the chat UI renders. Private pages are hydrated
+(attachments, reactions, reply targets) in a fixed number of queries.
+"""
+import base64
+from collections import Counter, defaultdict
+from datetime import datetime, timezone as dt_timezone
+from uuid import UUID
+
+from django.db.models import Exists, OuterRef, Q
+
+from community.models import (
+    HubMessage,
+    HubMessageHidden,
+    PrivateConversationMember,
+    PrivateMessage,
+    PrivateMessageAttachment,
+    PrivateMessageReaction,
+)
+
+
+BEFORE = "before"
+AFTER = "after"
+AROUND = "around"
+
+
+# =========================
+# ✅ CURSORS
+# =========================
+
+def encode_cursor(created_at, message_id: UUID) -> str:
+    """
+    cursor format: base64("timestamp|uuid")
+    """
+    raw = f"{created_at.isoformat()}|{str(message_id)}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """
+    returns (created_at_iso, uuid_str) or (None, None)
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at_str, message_id_str = raw.split("|", 1)
+        return created_at_str, message_id_str
+    except Exception:
+        return None, None
+
+
+def parse_cursor(cursor: str | None):
+    """
+    returns (created_at, UUID) or None for a missing/invalid cursor
+    """
+    if not cursor:
+        return None
+
+    created_at_str, message_id_str = decode_cursor(cursor)
+    if not created_at_str or not message_id_str:
+        return None
+
+    try:
+        created_at = datetime.fromisoformat(created_at_str)
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=dt_timezone.utc)
+        return created_at, UUID(message_id_str)
+    except (TypeError, ValueError):
+        return None
+
+
+# =========================
+# ✅ KEYSET PAGING
+# =========================
+
+def _older_than(created_at, message_id, inclusive=False) -> Q:
+    # created_at__lte gives the planner an index range; the OR only breaks ties
+    tie = Q(id__lte=message_id) if inclusive else Q(id__lt=message_id)
+    return Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | tie)
+
+
+def _newer_than(created_at, message_id) -> Q:
+    return Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(id__gt=message_id))
+
+
+def _slice(qs, limit):
+    rows = list(qs[: limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def keyset_page(qs, fields, limit, direction=BEFORE, anchor=None):
+    """
+    qs:        filtered queryset (no ordering needed)
+    fields:    values() columns; must include "id" and "created_at"
+    direction: BEFORE / AFTER / AROUND
+    anchor:    (created_at, id) cursor position, None = newest page
+
+    Returns (rows oldest -> newest, has_older, has_newer).
+    """
+    qs = qs.values(*fields)
+    newest_first = qs.order_by("-created_at", "-id")
+    oldest_first = qs.order_by("created_at", "id")
+
+    if anchor is None:
+        rows, has_older = _slice(newest_first, limit)
+        rows.reverse()
+        return rows, has_older, False
+
+    created_at, message_id = anchor
+
+    if direction == AFTER:
+        rows, has_newer = _slice(oldest_first.filter(_newer_than(created_at, message_id)), limit)
+        return rows, True, has_newer
+
+    if direction == AROUND:
+        older_limit = limit // 2 + 1  # anchor included
+        older, has_older = _slice(
+            newest_first.filter(_older_than(created_at, message_id, inclusive=True)),
+            older_limit,
+        )
+        newer, has_newer = _slice(
+            oldest_first.filter(_newer_than(created_at, message_id)),
+            limit - older_limit,
+        )
+        older.reverse()
+        return older + newer, has_older, has_newer
+
+    rows, has_older = _slice(newest_first.filter(_older_than(created_at, message_id)), limit)
+    rows.reverse()
+    return rows, has_older, True
+
+
+def page_cursors(rows, has_older, has_newer) -> dict:
+    """
+    nextCursor -> older page, newerCursor -> newer page
+    """
+    if not rows:
+        return {"nextCursor": None, "newerCursor": None}
+
+    oldest, newest = rows[0], rows[-1]
+    return {
+        "nextCursor": encode_cursor(oldest["created_at"], oldest["id"]) if has_older else None,
+        "newerCursor": encode_cursor(newest["created_at"], newest["id"]) if has_newer else None,
+    }
+
+
+# =========================
+# ✅ HUB HISTORY
+# =========================
+
+# the hub payload has always sent getattr(sender, "photo", None); senders have no
+# photo column today, so the value is only fetched once one exists
+_sender_model = HubMessage._meta.get_field("sender").related_model
+SENDER_PHOTO_FIELDS = (
+    ("sender__photo",)
+    if any(f.name == "photo" for f in _sender_model._meta.concrete_fields)
+    else ()
+)
+
+HUB_HISTORY_FIELDS = (
+    "id",
+    "text",
+    "created_at",
+    "sender_id",
+    "sender__full_name",
+    "sender__username",
+) + SENDER_PHOTO_FIELDS
+
+
+def visible_hub_messages(hub_id, user_id):
+    """
+    Hub messages minus the ones the user deleted for themselves.
+
+    NOT EXISTS binds both columns of HubMessageHidden's unique (message, user)
+    index, so it is a per-row index probe, unlike .exclude(hidden_by__user=...)
+    which anti-joins the whole table.
+    """
+    hidden = HubMessageHidden.objects.filter(user_id=user_id, message_id=OuterRef("pk"))
+    return HubMessage.objects.filter(hub_id=hub_id).filter(~Exists(hidden))
+
+
+def resolve_anchor(queryset, message_id):
+    """
+    (created_at, id) of a message in queryset, for AROUND paging.
+    """
+    try:
+        message_id = UUID(str(message_id))
+    except (TypeError, ValueError):
+        return None
+
+    row = queryset.filter(id=message_id).values_list("created_at", "id").first()
+    return tuple(row) if row else None
+
+
+def hub_history(hub_id, user_id, limit, before=None, after=None, around=None):
+    """
+    One page of hub history for user_id.
+    Returns (rows, cursors); rows are values() dicts of HUB_HISTORY_FIELDS.
+    """
+    qs = visible_hub_messages(hub_id, user_id)
+
+    direction, anchor = BEFORE, parse_cursor(before)
+    if around:
+        direction, anchor = AROUND, resolve_anchor(qs, around)
+    elif after:
+        direction, anchor = AFTER, parse_cursor(after)
+
+    rows, has_older, has_newer = keyset_page(qs, HUB_HISTORY_FIELDS, limit, direction, anchor)
+    return rows, page_cursors(rows, has_older, has_newer)
+
+
+# =========================
+# ✅ PRIVATE HISTORY
+# =========================
+
+PRIVATE_HISTORY_FIELDS = (
+    "id",
+    "client_temp_id",
+    "message_type",
+    "text",
+    "created_at",
+    "edited_at",
+    "deleted_at",
+    "reply_to_id",
+    "sender_id",
+    "sender__full_name",
+    "sender__username",
+)
+
+PRIVATE_ATTACHMENT_FIELDS = (
+    "id",
+    "message_id",
+    "attachment_type",
+    "url",
+    "thumbnail_url",
+    "mime_type",
+    "file_name",
+    "file_size",
+    "width",
+    "height",
+    "duration_ms",
+)
+
+
+def private_history(conversation_id, limit, before=None, after=None, around=None):
+    """
+    One page of a private conversation (soft-deleted messages excluded).
+    Returns (rows, cursors, has_newer); rows are values() dicts of PRIVATE_HISTORY_FIELDS.
+    """
+    qs = PrivateMessage.objects.filter(conversation_id=conversation_id, deleted_at__isnull=True)
+
+    direction, anchor = BEFORE, parse_cursor(before)
+    if around:
+        direction, anchor = AROUND, resolve_anchor(qs, around)
+    elif after:
+        direction, anchor = AFTER, parse_cursor(after)
+
+    rows, has_older, has_newer = keyset_page(qs, PRIVATE_HISTORY_FIELDS, limit, direction, anchor)
+    return rows, page_cursors(rows, has_older, has_newer), has_newer
+
+
+def _private_attachments(message_ids) -> dict:
+    by_message = defaultdict(list)
+    rows = (
+        PrivateMessageAttachment.objects
+        .filter(message_id__in=message_ids)
+        .order_by("created_at")
+        .values(*PRIVATE_ATTACHMENT_FIELDS)
+    )
+    for a in rows:
+        by_message[a["message_id"]].append({
+            "id": str(a["id"]),
+            "type": a["attachment_type"],
+            "url": a["url"],
+            "thumbnailUrl": a["thumbnail_url"],
+            "mime_type": a["mime_type"],
+            "file_name": a["file_name"],
+            "file_size": a["file_size"],
+            "width": a["width"],
+            "height": a["height"],
+            "duration_ms": a["duration_ms"],
+        })
+    return by_message
+
+
+def _private_reactions(message_ids, user_id):
+    """
+    ({message_id: [{"emoji", "count"}]}, {message_id: my emoji}) from one query.
+    """
+    counts = defaultdict(Counter)
+    mine = {}
+    rows = (
+        PrivateMessageReaction.objects
+        .filter(message_id__in=message_ids)
+        .values_list("message_id", "user_id", "emoji")
+    )
+    for message_id, reactor_id, emoji in rows:
+        counts[message_id][emoji] += 1
+        if reactor_id == user_id:
+            mine[message_id] = emoji
+
+    summaries = {
+        message_id: [{"emoji": emoji, "count": n} for emoji, n in counter.most_common()]
+        for message_id, counter in counts.items()
+    }
+    return summaries, mine
+
+
+def _private_reply_targets(reply_ids, conversation_id) -> dict:
+    # scoped: a reply_to pointing into another conversation is never shown
+    rows = (
+        PrivateMessage.objects
+        .filter(id__in=reply_ids, conversation_id=conversation_id)
+        .values("id", "text", "deleted_at", "sender__full_name", "sender__username")
+    )
+    return {
+        r["id"]: {
+            "id": str(r["id"]),
+            "text": "" if r["deleted_at"] else (r["text"] or ""),
+            "senderName": r["sender__full_name"] or r["sender__username"],
+        }
+        for r in rows
+    }
+
+
+def hydrate_private_messages(rows, conversation_id, user_id) -> list:
+    """
+    Page rows -> API payloads; attachments, reactions and reply targets are
+    loaded for the whole page at once (3 queries, whatever the page size).
+    """
+    if not rows:
+        return []
+
+    message_ids = [r["id"] for r in rows]
+    reply_ids = {r["reply_to_id"] for r in rows if r["reply_to_id"]}
+
+    attachments = _private_attachments(message_ids)
+    reactions, my_reactions = _private_reactions(message_ids, user_id)
+    replies = _private_reply_targets(reply_ids, conversation_id) if reply_ids else {}
+
+    return [
+        {
+            "id": str(m["id"]),
+            "clientTempId": m["client_temp_id"] or None,
+            "conversationId": str(conversation_id),
+            "messageType": m["message_type"],
+            "text": m["text"] or "",
+            "sender": {"id": str(m["sender_id"]), "name": m["sender__full_name"] or m["sender__username"]},
+            "createdAt": m["created_at"].isoformat(),
+            "isMine": m["sender_id"] == user_id,
+            "deletedAt": m["deleted_at"].isoformat() if m["deleted_at"] else None,
+            "editedAt": m["edited_at"].isoformat() if m["edited_at"] else None,
+            "attachments": attachments.get(m["id"], []),
+            "reactions": reactions.get(m["id"], []),
+            "myReaction": my_reactions.get(m["id"]),
+            "replyTo": replies.get(m["reply_to_id"]) if m["reply_to_id"] else None,
+        }
+        for m in rows
+    ]
+
+
+def advance_private_read_marker(member, newest_at, now) -> bool:
+    """
+    Move member.last_read_at forward only if a message newer than the
+    marker was just shown; re-reading history writes nothing.
+    """
+    if newest_at is None:
+        return False
+    if member.last_read_at and member.last_read_at >= newest_at:
+        return False
+
+    updated = (
+        PrivateConversationMember.objects
+        .filter(pk=member.pk)
+        .filter(Q(last_read_at__isnull=True) | Q(last_read_at__lt=newest_at))
+        .update(last_read_at=now)
+    )
+    if updated:
+        member.last_read_at = now
+    return bool(updated)
@@ -0,0 +1,161 @@
+# community/hub_stats.py
+from datetime import datetime, timezone as dt_timezone
+
+from django.db.models import Count, DateTimeField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from community.models import CommunityHub, CommunityMembership, HubMessage, HubReadReceipt
+from websocket.presence import hub_online_counts
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def hub_unread_counts(user, hub_ids) -> dict[str, int]:
+    """
+    Unread message count per hub for one user, in a single grouped query,
+    measured against the user's read watermark.
+
+    A hub the user never opened counts every message as unread.
+    Returns {hub_id_str: count}; hubs with nothing unread are omitted.
+    """
+    if not hub_ids:
+        return {}
+
+    read_cursor_subq = (
+        HubReadReceipt.objects
+        .filter(user=user, hub_id=OuterRef("hub_id"))
+        .values("last_read_message_at")[:1]
+    )
+
+    rows = (
+        HubMessage.objects
+        .filter(hub_id__in=hub_ids)
+        .filter(
+            created_at__gt=Coalesce(
+                Subquery(read_cursor_subq),
+                Value(EPOCH, output_field=DateTimeField()),
+            )
+        )
+        .order_by()
+        .values("hub_id")
+        .annotate(cnt=Count("id"))
+    )
+
+    return {str(r["hub_id"]): r["cnt"] for r in rows}
+
+
+def hub_member_counts(hub_ids) -> dict[str, int]:
+    """
+    Active member count per hub, in a single grouped query.
+    """
+    if not hub_ids:
+        return {}
+
+    rows = (
+        CommunityMembership.objects
+        .filter(hub_id__in=hub_ids, is_active=True)
+        .order_by()
+        .values("hub_id")
+        .annotate(cnt=Count("id"))
+    )
+
+    return {str(r["hub_id"]): r["cnt"] for r in rows}
+
+
+def set_hub_last_message(msg):
+    """
+    Point the hub's last-message preview at `msg`.
+    Never moves the pointer backwards, so concurrent sends can't clobber
+    a newer message with an older one.
+    """
+    CommunityHub.objects.filter(id=msg.hub_id).filter(
+        Q(last_message_at__isnull=True) | Q(last_message_at__lte=msg.created_at)
+    ).update(last_message=msg, last_message_at=msg.created_at)
+
+
+def refresh_hub_last_message(hub_id):
+    """
+    Recompute the pointer from the newest non-deleted message.
+    Uses the (hub, -created_at) index, so it's a single index probe.
+    """
+    latest = (
+        HubMessage.objects
+        .filter(hub_id=hub_id, deleted_at__isnull=True)
+        .order_by("-created_at", "-id")
+        .values("id", "created_at")
+        .first()
+    )
+
+    CommunityHub.objects.filter(id=hub_id).update(
+        last_message_id=latest["id"] if latest else None,
+        last_message_at=latest["created_at"] if latest else None,
+    )
+
+
+def hub_last_messages(hub_ids) -> dict[str, HubMessage]:
+    """
+    Last message per hub, read through the denormalized pointer.
+    One query regardless of how many messages the hubs hold.
+    """
+    if not hub_ids:
+        return {}
+
+    pointer_ids = (
+        CommunityHub.objects
+        .filter(id__in=hub_ids, last_message__isnull=False)
+        .values("last_message_id")
+    )
+
+    messages = HubMessage.objects.filter(id__in=Subquery(pointer_ids)).select_related("sender")
+
+    return {str(m.hub_id): m for m in messages}
+
+
+def hub_listing_overlays(user, hub_ids) -> dict[str, dict]:
+    """
+    Per-user fields merged onto serialized hubs in listing endpoints.
+    Constant number of queries (plus one Redis round trip) for any number of hubs.
+    """
+    hub_ids = [str(h) for h in hub_ids]
+    if not hub_ids:
+        return {}
+
+    joined_rows = (
+        CommunityMembership.objects
+        .filter(user=user, is_active=True, hub_id__in=hub_ids)
+        .values("hub_id", "role")
+    )
+    joined_map = {str(r["hub_id"]): r["role"] for r in joined_rows}
+
+    members_map = hub_member_counts(hub_ids)
+    unread_map = hub_unread_counts(user, hub_ids)
+    online_map = hub_online_counts(hub_ids)
+    last_msg_map = hub_last_messages(hub_ids)
+
+    overlays = {}
+    for hid in hub_ids:
+        role = joined_map.get(hid)
+        last_msg = last_msg_map.get(hid)
+
+        overlays[hid] = {
+            "user_joined": role is not None,
+            "user_role": role,
+
+            "members_count": members_map.get(hid, 0),
+            "online_count": online_map.get(hid, 0),
+            "unread_count": unread_map.get(hid, 0),
+
+            "last_message_text": last_msg.text if last_msg else None,
+            "last_message_type": last_msg.message_type if last_msg else None,
+            "last_message_at": last_msg.created_at.isoformat() if last_msg else None,
+            "last_message_sender_name": (
+                getattr(last_msg.sender, "username", None)
+                if last_msg and last_msg.sender
+                else None
+            ),
+
+            "pinned_message_id": None,
+        }
+
+    return overlays
@@ -0,0 +1,127 @@
+# community/hub_tree.py
+import time
+
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+from community.models import AdminUnit, CommunityHub, HubType
+from community.serializers import HubSerializer
+
+
+HUB_TREE_TTL_SECONDS = 60 * 60  # safety net; invalidation is explicit
+
+# settings.CACHES["hub_tree"], resolved per thread like django.core.cache.cache
+cache = ConnectionProxy(caches, "hub_tree")
+
+
+def _version_key(state_id) -> str:
+    return f"hub_tree:version:{state_id}"
+
+
+def _tree_key(state_id, version) -> str:
+    return f"hub_tree:{state_id}:v{version}"
+
+
+def get_hub_tree_version(state_id) -> int:
+    key = _version_key(state_id)
+    version = cache.get(key)
+
+    if version is None:
+        # ✅ seed from the clock so an evicted counter never resurrects an old snapshot
+        cache.add(key, int(time.time() * 1000), timeout=None)
+        version = cache.get(key)
+
+    return version
+
+
+def invalidate_hub_tree(state_id):
+    key = _version_key(state_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time() * 1000), timeout=None)
+
+
+def hub_state_unit_id(hub):
+    """
+    ADMIN_1 unit whose tree contains this hub, or None.
+    SYSTEM hubs sit in the tree at ADMIN_2; LOCAL hubs hang off an ADMIN_2 hub.
+    """
+    if hub.hub_type == HubType.SYSTEM:
+        if not hub.admin_unit_id:
+            return None
+        qs = AdminUnit.objects.filter(id=hub.admin_unit_id, level=2)
+    else:
+        if not hub.parent_id:
+            return None
+        qs = AdminUnit.objects.filter(hub__id=hub.parent_id, level=2)
+
+    return qs.values_list("parent_id", flat=True).first()
+
+
+def build_state_hub_tree(state_unit) -> list[dict]:
+    """
+    state → LGA → hubs snapshot with user-independent hub data only.
+    """
+    lga_units = list(
+        AdminUnit.objects.filter(level=2, parent=state_unit)
+        .select_related("hub")
+        .defer("geom")
+        .order_by("name")
+    )
+
+    system_hubs = {}
+    for lga in lga_units:
+        system_hub = getattr(lga, "hub", None)
+
+        if not system_hub:
+            system_hub = CommunityHub.objects.create(
+                admin_unit=lga,
+                name=lga.name,
+                hub_type=HubType.SYSTEM,
+                is_active=True,
+                is_verified=True,
+            )
+
+        system_hubs[lga.id] = system_hub
+
+    # ✅ all local hubs of the state in one query
+    local_by_parent = {}
+    local_hubs = (
+        CommunityHub.objects.filter(
+            parent_id__in=[h.id for h in system_hubs.values()],
+            hub_type=HubType.LOCAL,
+            is_active=True,
+        )
+        .order_by("name")
+    )
+    for hub in local_hubs:
+        local_by_parent.setdefault(hub.parent_id, []).append(hub)
+
+    tree = []
+    for lga in lga_units:
+        system_hub = system_hubs[lga.id]
+        hub_list = [system_hub] + local_by_parent.get(system_hub.id, [])
+
+        tree.append(
+            {
+                "lga": {"id": str(lga.id), "name": lga.name},
+                "hubs": [dict(data) for data in HubSerializer(hub_list, many=True).data],
+            }
+        )
+
+    return tree
+
+
+def get_state_hub_tree(state_unit) -> list[dict]:
+    """
+    Cached, versioned snapshot of build_state_hub_tree().
+    """
+    key = _tree_key(state_unit.id, get_hub_tree_version(state_unit.id))
+
+    tree = cache.get(key)
+    if tree is None:
+        tree = build_state_hub_tree(state_unit)
+        cache.set(key, tree, timeout=HUB_TREE_TTL_SECONDS)
+
+    return tree
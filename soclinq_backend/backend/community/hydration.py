@@ -0,0 +1,93 @@
+# community/hydration.py
+"""
+Page-level hydration for HubMessageSerializer.
+
+Serializing messages one by one costs a query per message for attachments,
+another for the reply target (+ its sender) and more for reactions.
+hydrate_hub_messages() loads all of that for a list of messages in four
+queries, whatever the list size; pass the result in the serializer context:
+
+    hydration = hydrate_hub_messages(messages, viewer_id=user.id)
+    HubMessageSerializer(messages, many=True, context={"hydration": hydration})
+
+or just call serialize_hub_messages(). Without a hydration the serializer
+falls back to per-message lookups.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db.models import Count
+
+from community.models import HubMessage, MessageAttachment, MessageReaction
+from community.services import HubMessageSerializer
+
+
+@dataclass
+class HubMessageHydration:
+    viewer_id: int | None = None
+    attachments: dict = field(default_factory=dict)   # message_id -> [MessageAttachment]
+    replies: dict = field(default_factory=dict)       # reply_to_id -> HubMessage (sender loaded)
+    reactions: dict = field(default_factory=dict)     # message_id -> [{"emoji", "count"}]
+    my_reactions: dict = field(default_factory=dict)  # message_id -> emoji
+
+
+def hydrate_hub_messages(messages, viewer_id=None) -> HubMessageHydration:
+    hydration = HubMessageHydration(viewer_id=viewer_id)
+
+    message_ids = [m.id for m in messages]
+    if not message_ids:
+        return hydration
+
+    # ✅ attachments (1 query)
+    attachments = defaultdict(list)
+    for a in MessageAttachment.objects.filter(message_id__in=message_ids).order_by("created_at"):
+        attachments[a.message_id].append(a)
+    hydration.attachments = attachments
+
+    # ✅ reply targets + their senders (1 query)
+    reply_ids = {m.reply_to_id for m in messages if m.reply_to_id}
+    if reply_ids:
+        hydration.replies = {
+            r.id: r
+            for r in HubMessage.objects.select_related("sender").filter(id__in=reply_ids)
+        }
+
+    # ✅ reaction summary (1 grouped query)
+    reactions = defaultdict(list)
+    rows = (
+        MessageReaction.objects
+        .filter(message_id__in=message_ids)
+        .values("message_id", "emoji")
+        .annotate(count=Count("id"))
+        .order_by("message_id", "-count", "emoji")
+    )
+    for r in rows:
+        reactions[r["message_id"]].append({"emoji": r["emoji"], "count": r["count"]})
+    hydration.reactions = reactions
+
+    # ✅ viewer's own reaction, latest wins (1 query)
+    if viewer_id:
+        rows = (
+            MessageReaction.objects
+            .filter(message_id__in=message_ids, user_id=viewer_id)
+            .order_by("created_at")
+            .values_list("message_id", "emoji")
+        )
+        hydration.my_reactions = dict(rows)
+
+    return hydration
+
+
+def serialize_hub_messages(messages, request=None, viewer_id=None) -> list:
+    """
+    Serialize a list of HubMessage (sender select_related) with one hydration.
+    """
+    messages = list(messages)
+    if viewer_id is None and request is not None and request.user.is_authenticated:
+        viewer_id = request.user.id
+
+    context = {"hydration": hydrate_hub_messages(messages, viewer_id=viewer_id)}
+    if request is not None:
+        context["request"] = request
+
+    return HubMessageSerializer(messages, many=True, context=context).data
@@ -0,0 +1,67 @@
+# community/idempotency.py
+"""
+Per-sender idempotent creation keyed by client_temp_id.
+
+Mobile clients retry sends on flaky networks with the same client_temp_id.
+create_once() runs the insert at most once per (sender, client_temp_id):
+
+  1. lookup:        one probe of the (sender, client_temp_id) unique index
+  2. race backstop: the model's partial unique constraint; the loser of
+                    a concurrent insert gets the winner's row
+
+There is no cache tier: a retry may land on any worker, and the index probe
+is as cheap as a shared-cache round trip.
+
+Models need `sender` and `client_temp_id` fields and a
+UniqueConstraint(fields=["sender", "client_temp_id"], condition=~Q(client_temp_id="")).
+
+Callers pass a queryset scoped to the thread (hub / conversation): a
+client_temp_id already used by the sender in another thread is never
+returned as the "original"; create_once raises ClientTempIdConflict instead.
+"""
+from django.db import IntegrityError, transaction
+
+
+class ClientTempIdConflict(Exception):
+    """
+    The sender already used this client_temp_id in a different thread.
+    """
+
+
+def find_original(queryset, sender_id, client_temp_id):
+    return queryset.filter(sender_id=sender_id, client_temp_id=client_temp_id).first()
+
+
+def create_once(queryset, sender_id, client_temp_id, create):
+    """
+    queryset: thread-scoped (e.g. filter(hub_id=...)); where originals are looked up
+    create:   zero-arg callable doing the insert(s); runs in a savepoint
+
+    Returns (obj, created).
+    """
+    if not client_temp_id:
+        with transaction.atomic():
+            return create(), True
+
+    original = find_original(queryset, sender_id, client_temp_id)
+    if original:
+        return original, False
+
+    try:
+        with transaction.atomic():
+            obj = create()
+    except IntegrityError:
+        # lost the race against a concurrent retry, or the id belongs to another thread
+        original = queryset.filter(sender_id=sender_id, client_temp_id=client_temp_id).first()
+        if original:
+            return original, False
+
+        used_elsewhere = queryset.model._default_manager.filter(
+            sender_id=sender_id,
+            client_temp_id=client_temp_id,
+        ).exists()
+        if used_elsewhere:
+            raise ClientTempIdConflict(client_temp_id)
+        raise
+
+    return obj, True
@@ -1,19 +1,35 @@
+import json
+import multiprocessing
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import requests
 
 from django.conf import settings
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 from django.contrib.gis.gdal import DataSource
-from django.db import transaction
+from django.db import connections, transaction
 
 from community.models import AdminUnit, CommunityHub, HubType
 from community.utils import iso2_to_iso3
+from community.geometry import rebuild_admin_unit_pieces
+from community.hub_tree import invalidate_hub_tree
 
 
 GADM_VERSION = "4.1"
 GADM_FILE_VERSION = "41"
 GADM_BASE_URL = "https://geodata.ucdavis.edu/gadm"
 
+DEFAULT_BATCH_SIZE = 500
+
+
+def _import_country_in_subprocess(country_code: str, options: dict):
+    # runs in a forked worker; parent connections were closed before forking
+    call_command("load_gadm", country=country_code, workers=1, **options)
+    return country_code
+
 
 class Command(BaseCommand):
     help = (
@@ -25,7 +41,7 @@ class Command(BaseCommand):
         parser.add_argument(
             "--country",
             required=True,
-            help="ISO-3166-1 alpha-2 country code (e.g. NG)",
+            help="ISO-3166-1 alpha-2 country code(s), comma separated (e.g. NG or NG,GH)",
         )
         parser.add_argument(
             "--max-level",
@@ -33,9 +49,42 @@ class Command(BaseCommand):
             default=2,
             help="Maximum administrative level to import (default: 2)",
         )
+        parser.add_argument(
+            "--bulk",
+            action="store_true",
+            help=(
+                "Stream features and load them in batched multi-row upserts "
+                "(INSERT ... ON CONFLICT DO UPDATE via bulk_create, one transaction "
+                "per batch) instead of COPY, so re-runs update existing units in place"
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f"Features per batch in --bulk mode (default: {DEFAULT_BATCH_SIZE})",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Skip levels already completed by a previous --bulk run",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Import several countries in parallel processes (default: 1)",
+        )
 
     def handle(self, *args, **options):
-        country_code = options["country"].upper()
+        countries = [c.strip().upper() for c in options["country"].split(",") if c.strip()]
+        workers = max(1, options["workers"])
+
+        if len(countries) > 1:
+            self._import_many(countries, workers, options)
+            return
+
+        country_code = countries[0]
         max_level = options["max_level"]
 
         self.stdout.write(
@@ -44,16 +93,54 @@ class Command(BaseCommand):
 
         geopackage_path = self._get_or_download_geopackage(country_code)
 
-        self._import_admin_units_and_hubs(
-            country_code=country_code,
-            geopackage_path=geopackage_path,
-            max_level=max_level,
-        )
+        if options["bulk"]:
+            self._bulk_import_admin_units_and_hubs(
+                country_code=country_code,
+                geopackage_path=geopackage_path,
+                max_level=max_level,
+                batch_size=options["batch_size"],
+                resume=options["resume"],
+            )
+        else:
+            self._import_admin_units_and_hubs(
+                country_code=country_code,
+                geopackage_path=geopackage_path,
+                max_level=max_level,
+            )
+
+        pieces = rebuild_admin_unit_pieces(country_code)
+        self.stdout.write(f"🧩 Subdivided boundaries into {pieces} pieces")
 
         self.stdout.write(
             self.style.SUCCESS("✅ GADM import and SYSTEM hub bootstrap completed")
         )
 
+    def _import_many(self, countries, workers, options):
+        forwarded = {
+            "max_level": options["max_level"],
+            "bulk": options["bulk"],
+            "batch_size": options["batch_size"],
+            "resume": options["resume"],
+        }
+
+        if workers == 1:
+            for country_code in countries:
+                call_command("load_gadm", country=country_code, **forwarded)
+            return
+
+        # ✅ each country writes disjoint rows, so processes don't contend
+        connections.close_all()
+        ctx = multiprocessing.get_context("fork")
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futures = [
+                pool.submit(_import_country_in_subprocess, country_code, forwarded)
+                for country_code in countries
+            ]
+            for future in futures:
+                done = future.result()
+                self.stdout.write(self.style.SUCCESS(f"✅ {done} finished"))
+
     # ------------------------------------------------------------------
     # Download helpers
     # ------------------------------------------------------------------
@@ -180,3 +267,195 @@ class Command(BaseCommand):
                 f"🏘️  SYSTEM hubs ensured for ADMIN_0 → ADMIN_{max_level}"
             )
         )
+
+    # ------------------------------------------------------------------
+    # Bulk import (streamed, batched, resumable)
+    # ------------------------------------------------------------------
+
+    def _checkpoint_path(self, country_code: str) -> str:
+        data_dir = os.path.join(settings.BASE_DIR, "data", "gadm")
+        return os.path.join(data_dir, f"{country_code}.checkpoint.json")
+
+    def _load_checkpoint(self, country_code: str) -> dict:
+        path = self._checkpoint_path(country_code)
+        if not os.path.exists(path):
+            return {"completed_levels": [], "hubs_done": False}
+
+        with open(path) as f:
+            return json.load(f)
+
+    def _save_checkpoint(self, country_code: str, checkpoint: dict):
+        path = self._checkpoint_path(country_code)
+        tmp_path = f"{path}.tmp"
+
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, path)
+
+    def _bulk_import_admin_units_and_hubs(
+        self,
+        country_code: str,
+        geopackage_path: str,
+        max_level: int,
+        batch_size: int,
+        resume: bool,
+    ):
+        datasource = DataSource(geopackage_path)
+        available_layers = {layer.name for layer in datasource}
+
+        checkpoint = (
+            self._load_checkpoint(country_code)
+            if resume
+            else {"completed_levels": [], "hubs_done": False}
+        )
+
+        for level in range(0, max_level + 1):
+            if level in checkpoint["completed_levels"]:
+                self.stdout.write(f"⏭️  ADMIN_{level} already imported, skipping")
+                continue
+
+            layer_name = f"ADM_ADM_{level}"
+
+            if layer_name not in available_layers:
+                self.stdout.write(
+                    self.style.WARNING(f"⚠️ Layer {layer_name} not found, skipping")
+                )
+                continue
+
+            self._bulk_import_level(
+                country_code=country_code,
+                layer=datasource[layer_name],
+                level=level,
+                batch_size=batch_size,
+            )
+
+            checkpoint["completed_levels"].append(level)
+            checkpoint["hubs_done"] = False
+            self._save_checkpoint(country_code, checkpoint)
+
+        if not checkpoint["hubs_done"]:
+            self._bulk_ensure_system_hubs(country_code, batch_size)
+            checkpoint["hubs_done"] = True
+            self._save_checkpoint(country_code, checkpoint)
+
+    def _bulk_import_level(self, country_code: str, layer, level: int, batch_size: int):
+        self.stdout.write(f"📦 Importing ADMIN_{level}: {len(layer)} units")
+
+        # parent GID -> AdminUnit.id (previous level is fully loaded by now)
+        parent_ids = {}
+        if level > 0:
+            parent_ids = dict(
+                AdminUnit.objects.filter(country_code=country_code, level=level - 1)
+                .values_list("code", "id")
+            )
+
+        started = time.monotonic()
+        imported = 0
+        batch = []
+
+        for feature in layer:
+            admin_code, admin_name = self._get_admin_code_and_name(feature, level)
+            if not admin_code or not admin_name:
+                continue
+
+            parent_code = self._get_parent_admin_code(feature, level)
+
+            batch.append(
+                AdminUnit(
+                    country_code=country_code,
+                    level=level,
+                    code=admin_code,
+                    name=admin_name,
+                    geom=feature.geom.geos,
+                    parent_id=parent_ids.get(parent_code) if parent_code else None,
+                )
+            )
+
+            if len(batch) >= batch_size:
+                imported += self._flush_admin_units(batch)
+                batch = []
+
+        if batch:
+            imported += self._flush_admin_units(batch)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"   ADMIN_{level}: {imported} features in {elapsed:.1f}s "
+            f"({imported / elapsed:.0f} features/s)"
+        )
+
+    def _flush_admin_units(self, batch) -> int:
+        # not COPY: COPY can't upsert without a staging table, and --resume /
+        # re-imports rely on ON CONFLICT updating units that already exist
+        with transaction.atomic():
+            AdminUnit.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=["country_code", "level", "code"],
+                update_fields=["name", "geom", "parent"],
+            )
+        return len(batch)
+
+    def _bulk_ensure_system_hubs(self, country_code: str, batch_size: int):
+        started = time.monotonic()
+
+        units = list(
+            AdminUnit.objects.filter(country_code=country_code)
+            .values_list("id", "name", "parent_id", "level")
+        )
+
+        existing = set(
+            CommunityHub.objects.filter(
+                admin_unit__country_code=country_code,
+                hub_type=HubType.SYSTEM,
+            ).values_list("admin_unit_id", flat=True)
+        )
+
+        CommunityHub.objects.bulk_create(
+            [
+                CommunityHub(
+                    admin_unit_id=unit_id,
+                    name=name,
+                    hub_type=HubType.SYSTEM,
+                    is_verified=True,
+                    is_active=True,
+                )
+                for unit_id, name, _, _ in units
+                if unit_id not in existing
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+
+        # ✅ wire hub parents to mirror the admin unit hierarchy
+        hubs = {
+            unit_id: (hub_id, parent_id)
+            for hub_id, unit_id, parent_id in CommunityHub.objects.filter(
+                admin_unit__country_code=country_code,
+                hub_type=HubType.SYSTEM,
+            ).values_list("id", "admin_unit_id", "parent_id")
+        }
+
+        to_update = []
+        for unit_id, _, parent_unit_id, _ in units:
+            hub_id, current_parent_id = hubs.get(unit_id, (None, None))
+            if not hub_id or not parent_unit_id:
+                continue
+
+            parent_hub_id = hubs.get(parent_unit_id, (None, None))[0]
+            if parent_hub_id and parent_hub_id != current_parent_id:
+                to_update.append(CommunityHub(id=hub_id, parent_id=parent_hub_id))
+
+        CommunityHub.objects.bulk_update(to_update, ["parent"], batch_size=batch_size)
+
+        # ✅ bulk writes skip signals, so drop cached hub trees explicitly
+        for unit_id, _, _, level in units:
+            if level == 1:
+                invalidate_hub_tree(unit_id)
+
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"🏘️  SYSTEM hubs ensured for {len(units)} units in {elapsed:.1f}s"
+            )
+        )
@@ -0,0 +1,102 @@
+# community/messaging.py
+"""
+Message creation for the chat send paths (REST and WebSocket).
+
+Sends are idempotent per (sender, client_temp_id), see community.idempotency:
+a lookup on the uniq_*_sender_client_temp_id index catches retries, and the
+same constraints catch concurrent ones.
+"""
+import uuid
+
+from community.hub_stats import set_hub_last_message
+from community.idempotency import create_once
+from community.models import HubMessage, MessageAttachment, MessageType, PrivateMessage
+
+
+def _valid_uuids(values) -> list:
+    ids = []
+    for value in values:
+        try:
+            ids.append(uuid.UUID(str(value)))
+        except (TypeError, ValueError):
+            continue
+    return ids
+
+
+def create_hub_message(
+    hub_id,
+    sender_id,
+    text="",
+    message_type=MessageType.TEXT,
+    client_temp_id="",
+    reply_to_id=None,
+    attachment_ids=(),
+):
+    """
+    Create a hub message (membership must already be checked).
+    Returns (message, created); created is False for a retried client_temp_id.
+    Raises ClientTempIdConflict if the client_temp_id was used in another thread.
+    """
+    client_temp_id = client_temp_id or ""
+
+    # ✅ Resolve reply_to
+    reply_obj = None
+    if reply_to_id:
+        try:
+            reply_obj = HubMessage.objects.filter(hub_id=hub_id, id=reply_to_id).first()
+        except Exception:
+            reply_obj = None
+
+    def create():
+        msg = HubMessage.objects.create(
+            hub_id=hub_id,
+            sender_id=sender_id,
+            text=text,
+            message_type=message_type,
+            client_temp_id=client_temp_id,
+            reply_to=reply_obj,
+        )
+
+        # ✅ Attach only existing, unclaimed attachments (avoid user hacking)
+        valid_ids = _valid_uuids(attachment_ids)
+        if valid_ids:
+            MessageAttachment.objects.filter(
+                id__in=valid_ids,
+                message__isnull=True,
+            ).update(message=msg)
+
+        return msg
+
+    msg, created = create_once(
+        HubMessage.objects.select_related("sender", "reply_to__sender").filter(hub_id=hub_id),
+        sender_id,
+        client_temp_id,
+        create,
+    )
+
+    if created:
+        # ✅ keep hub listing preview pointer current
+        set_hub_last_message(msg)
+
+    return msg, created
+
+
+def create_private_message(conversation_id, sender_id, text, client_temp_id=""):
+    """
+    Create a private message (membership must already be checked).
+    Returns (message, created); created is False for a retried client_temp_id.
+    Raises ClientTempIdConflict if the client_temp_id was used in another thread.
+    """
+    client_temp_id = client_temp_id or ""
+
+    return create_once(
+        PrivateMessage.objects.select_related("sender").filter(conversation_id=conversation_id),
+        sender_id,
+        client_temp_id,
+        lambda: PrivateMessage.objects.create(
+            conversation_id=conversation_id,
+            sender_id=sender_id,
+            text=text,
+            client_temp_id=client_temp_id,
+        ),
+    )
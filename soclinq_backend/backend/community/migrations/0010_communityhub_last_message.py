@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-17 09:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_last_message(apps, schema_editor):
+    CommunityHub = apps.get_model("community", "CommunityHub")
+    HubMessage = apps.get_model("community", "HubMessage")
+
+    latest = (
+        HubMessage.objects
+        .filter(hub_id=models.OuterRef("pk"), deleted_at__isnull=True)
+        .order_by("-created_at", "-id")
+    )
+
+    CommunityHub.objects.update(
+        last_message_id=models.Subquery(latest.values("id")[:1]),
+        last_message_at=models.Subquery(latest.values("created_at")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0009_hubmessagereceipt_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='communityhub',
+            name='last_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='community.hubmessage'),
+        ),
+        migrations.AddField(
+            model_name='communityhub',
+            name='last_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_message, migrations.RunPython.noop),
+    ]
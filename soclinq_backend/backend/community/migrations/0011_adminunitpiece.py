@@ -0,0 +1,37 @@
+# Generated by Django 5.2.9 on 2026-10-17 10:02
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0010_communityhub_last_message'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdminUnitPiece',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('country_code', models.CharField(max_length=2)),
+                ('level', models.PositiveSmallIntegerField()),
+                ('geom', django.contrib.gis.db.models.fields.PolygonField(srid=4326)),
+                ('admin_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pieces', to='community.adminunit')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GistIndex(fields=['geom'], name='adminunitpiece_geom_gist'), models.Index(fields=['country_code', 'level'], name='adminunitpiece_country_level')],
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO community_adminunitpiece (admin_unit_id, country_code, level, geom)
+                SELECT id, country_code, level, ST_Subdivide(geom, 256)
+                FROM community_adminunit
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
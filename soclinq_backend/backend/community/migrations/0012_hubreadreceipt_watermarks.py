@@ -0,0 +1,68 @@
+# Generated by Django 5.2.9 on 2026-10-17 14:05
+
+from django.db import migrations, models
+
+
+def backfill_watermarks(apps, schema_editor):
+    HubReadReceipt = apps.get_model("community", "HubReadReceipt")
+    HubMessage = apps.get_model("community", "HubMessage")
+
+    seen_created_at = HubMessage.objects.filter(pk=models.OuterRef("last_seen_message_id")).values("created_at")[:1]
+
+    HubReadReceipt.objects.filter(last_seen_message__isnull=False).update(
+        last_read_message_id=models.F("last_seen_message_id"),
+        last_read_message_at=models.Subquery(seen_created_at),
+        read_at=models.F("last_seen_at"),
+        last_delivered_message_id=models.F("last_seen_message_id"),
+        last_delivered_message_at=models.Subquery(seen_created_at),
+        delivered_at=models.F("last_seen_at"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0011_adminunitpiece'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hubreadreceipt',
+            name='delivered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hubreadreceipt',
+            name='last_delivered_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hubreadreceipt',
+            name='last_delivered_message_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hubreadreceipt',
+            name='last_read_message_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hubreadreceipt',
+            name='last_read_message_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hubreadreceipt',
+            name='read_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='hubreadreceipt',
+            index=models.Index(fields=['hub', 'last_delivered_message_at', 'last_delivered_message_id'], name='hubread_delivered_cursor'),
+        ),
+        migrations.AddIndex(
+            model_name='hubreadreceipt',
+            index=models.Index(fields=['hub', 'last_read_message_at', 'last_read_message_id'], name='hubread_read_cursor'),
+        ),
+        migrations.RunPython(backfill_watermarks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-17 16:40
+
+from django.db import migrations, models
+
+
+def blank_duplicate_client_temp_ids(apps, schema_editor):
+    """
+    Keep client_temp_id on the oldest message of each (sender, client_temp_id)
+    pair and clear it on the retries so the unique constraint can be built.
+    """
+    HubMessage = apps.get_model("community", "HubMessage")
+
+    dupes = (
+        HubMessage.objects.exclude(client_temp_id="")
+        .values("sender_id", "client_temp_id")
+        .annotate(n=models.Count("id"))
+        .filter(n__gt=1)
+    )
+
+    for row in dupes:
+        ids = list(
+            HubMessage.objects.filter(sender_id=row["sender_id"], client_temp_id=row["client_temp_id"])
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+        )
+        HubMessage.objects.filter(id__in=ids[1:]).update(client_temp_id="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0012_hubreadreceipt_watermarks'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_duplicate_client_temp_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='hubmessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_temp_id', ''), _negated=True), fields=('sender', 'client_temp_id'), name='uniq_hubmessage_sender_client_temp_id'),
+        ),
+    ]
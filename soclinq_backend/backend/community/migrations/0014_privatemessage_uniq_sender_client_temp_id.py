@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:05
+
+from django.db import migrations, models
+
+
+def blank_duplicate_client_temp_ids(apps, schema_editor):
+    """
+    Keep client_temp_id on the oldest message of each (sender, client_temp_id)
+    pair and clear it on the retries so the unique constraint can be built.
+    """
+    PrivateMessage = apps.get_model("community", "PrivateMessage")
+
+    dupes = (
+        PrivateMessage.objects.exclude(client_temp_id="")
+        .values("sender_id", "client_temp_id")
+        .annotate(n=models.Count("id"))
+        .filter(n__gt=1)
+    )
+
+    for row in dupes:
+        ids = list(
+            PrivateMessage.objects.filter(sender_id=row["sender_id"], client_temp_id=row["client_temp_id"])
+            .order_by("created_at", "id")
+            .values_list("id", flat=True)
+        )
+        PrivateMessage.objects.filter(id__in=ids[1:]).update(client_temp_id="")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0013_hubmessage_uniq_sender_client_temp_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_duplicate_client_temp_ids, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='privatemessage',
+            constraint=models.UniqueConstraint(condition=models.Q(('client_temp_id', ''), _negated=True), fields=('sender', 'client_temp_id'), name='uniq_privatemessage_sender_client_temp_id'),
+        ),
+    ]
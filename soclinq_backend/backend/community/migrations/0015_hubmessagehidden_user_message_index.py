@@ -0,0 +1,22 @@
+# Generated by Django 5.2.9 on 2026-10-17 17:40
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Kept so migration history stays linear. This used to add the
+    hubhidden_user_message index, which duplicates the unique (message, user)
+    index; databases that applied it get it dropped, others are untouched.
+    """
+
+    dependencies = [
+        ('community', '0014_privatemessage_uniq_sender_client_temp_id'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'DROP INDEX IF EXISTS "hubhidden_user_message";',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-17 18:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models.functions import Cast
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('community', '0015_hubmessagehidden_user_message_index'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='communityhub',
+            name='search_vector',
+            field=models.GeneratedField(
+                db_persist=True,
+                expression=(
+                    SearchVector('name', weight='A', config='simple')
+                    + SearchVector('category', weight='B', config='simple')
+                    + SearchVector(Cast('tags', models.TextField()), weight='C', config='simple')
+                    + SearchVector('description', weight='D', config='simple')
+                ),
+                output_field=django.contrib.postgres.search.SearchVectorField(),
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='communityhub',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='communityhub_search_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='communityhub',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='communityhub_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
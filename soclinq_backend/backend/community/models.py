@@ -3,9 +3,13 @@ import uuid
 from django.contrib.gis.db import models as gis_models
 from django.db import models
 from django.conf import settings
-from django.contrib.postgres.indexes import GistIndex 
+from django.contrib.postgres.indexes import GinIndex, GistIndex 
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models.functions import Cast
 from django.utils import timezone
 
+HUB_SEARCH_CONFIG = "simple"  # place names and slang: no stemming, no stop words
+
 class HubPrivacy(models.TextChoices):
     PUBLIC = "PUBLIC", "Public"
     PRIVATE = "PRIVATE", "Private"
@@ -117,6 +121,36 @@ class AdminUnit(models.Model):
     def __str__(self):
         return f"{self.name} (ADMIN_{self.level})"
 
+
+class AdminUnitPiece(models.Model):
+    """
+    ST_Subdivide fragment of an AdminUnit boundary.
+    Each piece has few vertices and a tight bounding box (indexed by GiST),
+    so point-in-polygon checks stay cheap even for huge coastal LGAs.
+    Rebuilt by community.geometry.rebuild_admin_unit_pieces().
+    """
+
+    admin_unit = models.ForeignKey(
+        AdminUnit,
+        on_delete=models.CASCADE,
+        related_name="pieces",
+    )
+
+    # denormalized from AdminUnit so lookups never join back for filtering
+    country_code = models.CharField(max_length=2)
+    level = models.PositiveSmallIntegerField()
+
+    geom = gis_models.PolygonField(srid=4326)
+
+    class Meta:
+        indexes = [
+            GistIndex(fields=["geom"], name="adminunitpiece_geom_gist"),
+            models.Index(fields=["country_code", "level"], name="adminunitpiece_country_level"),
+        ]
+
+    def __str__(self):
+        return f"piece of {self.admin_unit_id} (ADMIN_{self.level})"
+
 class CommunityHub(models.Model):
     """
     Security-grade community hub.
@@ -144,6 +178,19 @@ class CommunityHub(models.Model):
     # ✅ tags + search
     tags = models.JSONField(default=list, blank=True)
 
+    # weighted tsvector of name/category/tags/description (community.search);
+    # computed by Postgres on every write, bulk_create() and update() included
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("name", weight="A", config=HUB_SEARCH_CONFIG)
+            + SearchVector("category", weight="B", config=HUB_SEARCH_CONFIG)
+            + SearchVector(Cast("tags", models.TextField()), weight="C", config=HUB_SEARCH_CONFIG)
+            + SearchVector("description", weight="D", config=HUB_SEARCH_CONFIG)
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
     # ✅ media
     cover_image = models.URLField(blank=True, null=True)
     avatar_icon = models.URLField(blank=True, null=True)
@@ -327,6 +374,16 @@ class CommunityHub(models.Model):
     messages_count = models.PositiveIntegerField(default=0)
     attachments_count = models.PositiveIntegerField(default=0)
 
+    # ✅ denormalized last message pointer (hub listing previews)
+    last_message = models.ForeignKey(
+        "community.HubMessage",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    last_message_at = models.DateTimeField(null=True, blank=True)
+
     active_members_7d = models.PositiveIntegerField(default=0)
     new_members_7d = models.PositiveIntegerField(default=0)
     engagement_score = models.PositiveIntegerField(default=0)
@@ -362,6 +419,8 @@ class CommunityHub(models.Model):
             models.Index(fields=["verification_status"]),
             models.Index(fields=["hub_purpose"]),
             models.Index(fields=["name"]),
+            GinIndex(fields=["search_vector"], name="communityhub_search_gin"),
+            GinIndex(fields=["name"], opclasses=["gin_trgm_ops"], name="communityhub_name_trgm"),
         ]
 
     def __str__(self):
@@ -466,6 +525,14 @@ class HubMessage(models.Model):
             models.Index(fields=["hub", "-created_at"]),
             models.Index(fields=["sender", "-created_at"]),
         ]
+        constraints = [
+            # ✅ a retried send can never insert twice
+            models.UniqueConstraint(
+                fields=["sender", "client_temp_id"],
+                condition=~models.Q(client_temp_id=""),
+                name="uniq_hubmessage_sender_client_temp_id",
+            ),
+        ]
 
     def __str__(self):
         preview = self.text[:25] if self.text else "[media]"
@@ -554,10 +621,28 @@ class HubReadReceipt(models.Model):
 
     last_seen_at = models.DateTimeField(auto_now=True)
 
+    # ✅ watermark cursors: (created_at, id) of the newest message delivered/read.
+    # "has user X read message M" == read cursor >= (M.created_at, M.id)
+    last_delivered_message_at = models.DateTimeField(null=True, blank=True)
+    last_delivered_message_id = models.UUIDField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    last_read_message_at = models.DateTimeField(null=True, blank=True)
+    last_read_message_id = models.UUIDField(null=True, blank=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         unique_together = ("user", "hub")
         indexes = [
             models.Index(fields=["hub", "last_seen_at"]),
+            models.Index(
+                fields=["hub", "last_delivered_message_at", "last_delivered_message_id"],
+                name="hubread_delivered_cursor",
+            ),
+            models.Index(
+                fields=["hub", "last_read_message_at", "last_read_message_id"],
+                name="hubread_read_cursor",
+            ),
         ]
 
     def __str__(self):
@@ -831,6 +916,14 @@ class PrivateMessage(models.Model):
             models.Index(fields=["conversation", "-created_at"]),
             models.Index(fields=["sender", "-created_at"]),
         ]
+        constraints = [
+            # ✅ a retried send can never insert twice
+            models.UniqueConstraint(
+                fields=["sender", "client_temp_id"],
+                condition=~models.Q(client_temp_id=""),
+                name="uniq_privatemessage_sender_client_temp_id",
+            ),
+        ]
 
     def __str__(self):
         preview = self.text[:25] if self.text else "[media]"
@@ -0,0 +1,95 @@
+# community/read_state.py
+"""
+Watermark read state for hubs.
+
+Each (user, hub) HubReadReceipt row carries two cursors, the (created_at, id)
+of the newest message the user has had delivered / has read. A message M is
+read by U iff U's read cursor >= (M.created_at, M.id), so per-message state
+costs one row per member instead of one row per member per message.
+
+settings.HUB_READ_MODEL:
+  "receipts"  (default) – cursors + legacy per-message HubMessageReceipt rows
+  "watermark"           – cursors only; receipts/seen_by are no longer written
+"""
+from django.conf import settings
+from django.db.models import Q
+
+from community.models import HubReadReceipt
+
+
+def watermark_mode() -> bool:
+    return getattr(settings, "HUB_READ_MODEL", "receipts") == "watermark"
+
+
+def _cursor_before(prefix: str, at, message_id) -> Q:
+    """
+    Rows whose cursor is missing or strictly older than (at, message_id).
+    """
+    return (
+        Q(**{f"{prefix}_at__isnull": True})
+        | Q(**{f"{prefix}_at__lt": at})
+        | Q(**{f"{prefix}_at": at, f"{prefix}_id__lt": message_id})
+    )
+
+
+def _cursor_reached(prefix: str, at, message_id) -> Q:
+    """
+    Rows whose cursor is at or past (at, message_id).
+    """
+    return Q(**{f"{prefix}_at__gt": at}) | Q(**{f"{prefix}_at": at, f"{prefix}_id__gte": message_id})
+
+
+def advance_hub_watermarks(user_id, hub_id, now, delivered=None, read=None):
+    """
+    Move the user's cursors forward. delivered/read are (created_at, message_id)
+    tuples or None. Never moves a cursor backwards; reading implies delivery.
+    """
+    if read and (not delivered or delivered < read):
+        delivered = read
+
+    if not delivered:
+        return
+
+    HubReadReceipt.objects.get_or_create(user_id=user_id, hub_id=hub_id)
+
+    rows = HubReadReceipt.objects.filter(user_id=user_id, hub_id=hub_id)
+
+    rows.filter(_cursor_before("last_delivered_message", *delivered)).update(
+        last_delivered_message_at=delivered[0],
+        last_delivered_message_id=delivered[1],
+        delivered_at=now,
+    )
+
+    if read:
+        rows.filter(_cursor_before("last_read_message", *read)).update(
+            last_read_message_at=read[0],
+            last_read_message_id=read[1],
+            read_at=now,
+            # legacy pointer kept in step with the read cursor
+            last_seen_message_id=read[1],
+            last_seen_at=now,
+        )
+
+
+def message_read_by(msg):
+    """
+    HubReadReceipt rows of users (other than the sender) who have read `msg`.
+    """
+    return (
+        HubReadReceipt.objects
+        .filter(hub_id=msg.hub_id)
+        .filter(_cursor_reached("last_read_message", msg.created_at, msg.id))
+        .exclude(user_id=msg.sender_id)
+    )
+
+
+def message_delivered_to(msg):
+    """
+    HubReadReceipt rows of users (other than the sender) who have received `msg`.
+    """
+    return (
+        HubReadReceipt.objects
+        .filter(hub_id=msg.hub_id)
+        .filter(_cursor_reached("last_delivered_message", msg.created_at, msg.id))
+        .exclude(user_id=msg.sender_id)
+    )
@@ -0,0 +1,107 @@
+# community/search.py
+"""
+Hub search (PostgreSQL full-text + trigram).
+
+CommunityHub.search_vector holds a weighted tsvector (name A, category B,
+tags C, description D) generated by Postgres (see the model) and backed
+by a GIN index; communityhub_name_trgm is a pg_trgm GIN index on name.
+
+A hub matches when
+  - every query word is a prefix of a word in the vector ("lag ma" -> "Lagos Mainland"), or
+  - the query is word-similar to the name (typos: "ikejja" -> "Ikeja").
+
+Both predicates are index-backed, so latency tracks the number of matches,
+not the number of hubs. Matches are ranked by
+
+  text relevance
+  + trust_score / engagement_score (log-damped)
+  + proximity to the user's admin_2 (LGA) / admin_1 (state)
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramWordSimilarity,
+)
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.functions import Ln
+
+from community.models import HUB_SEARCH_CONFIG, CommunityHub
+
+
+SEARCH_CONFIG = HUB_SEARCH_CONFIG  # must match the generated search_vector
+
+# ✅ blend weights
+WEIGHT_TEXT = 1.0
+WEIGHT_TRIGRAM = 0.6
+WEIGHT_TRUST = 0.3        # trust_score is 0-100
+WEIGHT_ENGAGEMENT = 0.05  # per ln(1 + engagement_score)
+WEIGHT_SAME_LGA = 0.5
+WEIGHT_SAME_STATE = 0.25
+
+MAX_QUERY_WORDS = 8
+
+_word_re = re.compile(r"\w+", re.UNICODE)
+
+
+def prefix_query(q: str):
+    """
+    "lag main" -> to_tsquery('lag:* & main:*'); None if q has no words.
+    Words are \\w+ only, so nothing can break the tsquery syntax.
+    """
+    words = _word_re.findall(q.lower())[:MAX_QUERY_WORDS]
+    if not words:
+        return None
+    return SearchQuery(" & ".join(f"{w}:*" for w in words), search_type="raw", config=SEARCH_CONFIG)
+
+
+def _proximity(user):
+    whens = []
+    if user.admin_2_id:
+        whens += [
+            When(admin_unit_id=user.admin_2_id, then=Value(WEIGHT_SAME_LGA)),
+            When(parent__admin_unit_id=user.admin_2_id, then=Value(WEIGHT_SAME_LGA)),
+        ]
+    if user.admin_1_id:
+        whens += [
+            When(admin_unit_id=user.admin_1_id, then=Value(WEIGHT_SAME_STATE)),
+            When(admin_unit__parent_id=user.admin_1_id, then=Value(WEIGHT_SAME_STATE)),
+            When(parent__admin_unit__parent_id=user.admin_1_id, then=Value(WEIGHT_SAME_STATE)),
+        ]
+
+    if not whens:
+        return Value(0.0, output_field=FloatField())
+    return Case(*whens, default=Value(0.0), output_field=FloatField())
+
+
+def search_hubs(user, q: str, limit: int = 20):
+    """
+    Active hubs matching q, best first.
+    """
+    q = q.strip()
+    if not q:
+        return CommunityHub.objects.none()
+
+    ts_query = prefix_query(q)
+
+    match = Q(name__trigram_word_similar=q)
+    text_rank = Value(0.0, output_field=FloatField())
+    if ts_query is not None:
+        match |= Q(search_vector=ts_query)
+        text_rank = SearchRank(F("search_vector"), ts_query)
+
+    return (
+        CommunityHub.objects.filter(is_active=True)
+        .filter(match)
+        .annotate(
+            score=(
+                text_rank * WEIGHT_TEXT
+                + TrigramWordSimilarity(q, "name") * WEIGHT_TRIGRAM
+                + F("trust_score") / 100.0 * WEIGHT_TRUST
+                + Ln(F("engagement_score") + 1.0) * WEIGHT_ENGAGEMENT
+                + _proximity(user)
+            )
+        )
+        .order_by("-score", "-is_verified", "name")[:limit]
+    )
@@ -5,7 +5,8 @@ from community.models import AdminUnit, CommunityHub
 from django.contrib.gis.geos import Point
 from django.contrib.gis.db.models.functions import Distance
 from django.db.models import Q
-from community.models import AdminUnit, CommunityHub
+from community.models import AdminUnit, AdminUnitPiece, CommunityHub
+from community.geo_cache import resolution_cache
 
 
 @dataclass
@@ -47,15 +48,31 @@ class LocationResolver:
         # Small buffer (~20m) to handle boundary & GPS jitter
         buffered_point = self.point.buffer(0.0002)
 
-        qs = AdminUnit.objects.filter(
-            geom__intersects=buffered_point
+        # ✅ intersect against small subdivided pieces, not full GADM polygons
+        pieces = AdminUnitPiece.objects.filter(geom__intersects=buffered_point)
+        if self.country_code:
+            pieces = pieces.filter(country_code=self.country_code)
+
+        found = list(
+            AdminUnit.objects.filter(id__in=pieces.values("admin_unit_id"))
+            .select_related("hub")
+            .defer("geom")
+            .order_by("level")
         )
 
-        if self.country_code:
-            qs = qs.filter(country_code=self.country_code)
+        if not found:
+            # countries imported before pieces existed
+            qs = AdminUnit.objects.filter(
+                geom__intersects=buffered_point
+            )
+
+            if self.country_code:
+                qs = qs.filter(country_code=self.country_code)
+
+            found = qs.order_by("level")
 
         units = {}
-        for u in qs.order_by("level"):
+        for u in found:
             units[u.level] = u
 
         return units
@@ -116,13 +133,51 @@ class LocationResolver:
 
         return "MEDIUM"
 
-    def resolve(self) -> ResolvedLocation:
-        admin_units = self.resolve_admin_units()
-        used_fallback = False
+    def _load_cached_admin_units(self, unit_ids: dict) -> dict[int, AdminUnit] | None:
+        """
+        Rehydrate a cached resolution by primary key (no spatial query).
+        Returns None if any unit has disappeared since it was cached.
+        """
+        if not unit_ids:
+            return {}
+
+        units = {
+            u.level: u
+            for u in AdminUnit.objects.filter(id__in=unit_ids.values())
+            .select_related("hub")
+            .defer("geom")
+        }
+
+        if len(units) != len(unit_ids):
+            return None
+
+        return units
 
-        if not admin_units or 2 not in admin_units:
-            admin_units = self.resolve_nearest_admin_units()
-            used_fallback = True
+    def resolve(self) -> ResolvedLocation:
+        cached = resolution_cache.get(self.lat, self.lng, self.country_code)
+        admin_units = None
+
+        if cached is not None:
+            admin_units = self._load_cached_admin_units(cached["units"])
+            used_fallback = cached["fallback"]
+
+        if admin_units is None:
+            admin_units = self.resolve_admin_units()
+            used_fallback = False
+
+            if not admin_units or 2 not in admin_units:
+                admin_units = self.resolve_nearest_admin_units()
+                used_fallback = True
+
+            resolution_cache.set(
+                self.lat,
+                self.lng,
+                self.country_code,
+                {
+                    "units": {level: str(u.id) for level, u in admin_units.items()},
+                    "fallback": used_fallback,
+                },
+            )
 
         confidence = self._calculate_confidence(admin_units, used_fallback)
         hubs = self.resolve_system_hubs(admin_units)
@@ -188,6 +243,7 @@ def ensure_system_hubs_and_join(user, admin_units):
 
 
 from rest_framework import serializers
+from django.db.models import Count
 from community.models import HubMessage, MessageAttachment
 
 
@@ -225,7 +281,13 @@ class HubMessageSerializer(serializers.ModelSerializer):
     isMine = serializers.SerializerMethodField()
     editedAt = serializers.DateTimeField(source="edited_at", allow_null=True, required=False)
     deletedAt = serializers.DateTimeField(source="deleted_at", allow_null=True, required=False)
+    reactions = serializers.SerializerMethodField()
+    myReaction = serializers.SerializerMethodField()
+
+    # ✅ context["hydration"] (community.hydration) replaces the per-message queries below
 
+    def _hydration(self):
+        return self.context.get("hydration")
 
     def get_sender(self, obj):
         user = obj.sender
@@ -238,12 +300,25 @@ class HubMessageSerializer(serializers.ModelSerializer):
     def get_isMine(self, obj):
         req = self.context.get("request")
         if not req or not req.user.is_authenticated:
+            hydration = self._hydration()
+            if hydration and hydration.viewer_id:
+                return str(obj.sender_id) == str(hydration.viewer_id)
             return False
         return str(obj.sender_id) == str(req.user.id)
 
     def get_replyTo(self, obj):
         if not obj.reply_to_id:
             return None
+
+        hydration = self._hydration()
+        if hydration is not None:
+            reply = hydration.replies.get(obj.reply_to_id)
+            return {
+                "id": str(obj.reply_to_id),
+                "text": reply.text if reply else "",
+                "senderName": (getattr(reply.sender, "full_name", None) or reply.sender.username) if reply else None,
+            }
+
         return {
             "id": str(obj.reply_to_id),
             "text": obj.reply_to.text if obj.reply_to else "",
@@ -268,9 +343,37 @@ class HubMessageSerializer(serializers.ModelSerializer):
 
 
     def get_attachments(self, obj):
-        qs = obj.attachments.all()
+        hydration = self._hydration()
+        qs = hydration.attachments.get(obj.id, []) if hydration is not None else obj.attachments.all()
         return MessageAttachmentSerializer(qs, many=True).data
 
+    def get_reactions(self, obj):
+        hydration = self._hydration()
+        if hydration is not None:
+            return hydration.reactions.get(obj.id, [])
+
+        rows = (
+            obj.reactions.values("emoji")
+            .annotate(count=Count("id"))
+            .order_by("-count", "emoji")
+        )
+        return [{"emoji": r["emoji"], "count": r["count"]} for r in rows]
+
+    def get_myReaction(self, obj):
+        hydration = self._hydration()
+        if hydration is not None:
+            return hydration.my_reactions.get(obj.id)
+
+        req = self.context.get("request")
+        if not req or not req.user.is_authenticated:
+            return None
+        return (
+            obj.reactions.filter(user=req.user)
+            .order_by("-created_at")
+            .values_list("emoji", flat=True)
+            .first()
+        )
+
     class Meta:
         model = HubMessage
         fields = [
@@ -286,5 +389,6 @@ class HubMessageSerializer(serializers.ModelSerializer):
             "isMine",
             "editedAt",    
             "deletedAt",
+            "reactions",
             "myReaction",
         ]
@@ -0,0 +1,31 @@
+# community/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from community.hub_tree import hub_state_unit_id, invalidate_hub_tree
+from community.models import CommunityHub, CommunityMembership, PrivateConversationMember
+from websocket.admission import conversation_membership_key, hub_membership_key, membership_cache
+
+
+@receiver(post_save, sender=CommunityHub)
+@receiver(post_delete, sender=CommunityHub)
+def invalidate_state_hub_tree(sender, instance, **kwargs):
+    """
+    Any saved change to a hub (create, rename, deactivate...) drops the cached
+    tree of its state. Pointer/counter writes go through .update() and don't fire.
+    """
+    state_id = hub_state_unit_id(instance)
+    if state_id:
+        invalidate_hub_tree(state_id)
+
+
+@receiver(post_save, sender=CommunityMembership)
+@receiver(post_delete, sender=CommunityMembership)
+def invalidate_ws_hub_membership(sender, instance, **kwargs):
+    membership_cache.delete(hub_membership_key(instance.hub_id, instance.user_id))
+
+
+@receiver(post_save, sender=PrivateConversationMember)
+@receiver(post_delete, sender=PrivateConversationMember)
+def invalidate_ws_conversation_membership(sender, instance, **kwargs):
+    membership_cache.delete(conversation_membership_key(instance.conversation_id, instance.user_id))
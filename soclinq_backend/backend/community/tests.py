@@ -1,3 +1,860 @@
-from django.test import TestCase
+import base64
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import MultiPolygon, Point, Polygon
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from community.forwarding import forward_hub_messages, forward_private_messages
+from community.geo_cache import ResolutionCache
+from community.geometry import rebuild_admin_unit_pieces
+from community.history import (
+    decode_cursor,
+    encode_cursor,
+    hub_history,
+    hydrate_private_messages,
+    parse_cursor,
+    private_history,
+)
+from community import hub_tree
+from community.hub_stats import (
+    hub_last_messages,
+    hub_member_counts,
+    hub_unread_counts,
+    refresh_hub_last_message,
+    set_hub_last_message,
+)
+from community.hydration import serialize_hub_messages
+from community.idempotency import ClientTempIdConflict
+from community.messaging import create_hub_message, create_private_message
+from community.models import (
+    AdminUnit,
+    AdminUnitPiece,
+    CommunityHub,
+    CommunityMembership,
+    HubMessage,
+    HubMessageHidden,
+    HubReadReceipt,
+    HubType,
+    MessageAttachment,
+    MessageReaction,
+    PrivateConversation,
+    PrivateMessage,
+)
+from community.read_state import advance_hub_watermarks, message_delivered_to, message_read_by
+from community.search import search_hubs
+from community.services import LocationResolver
+from websocket.events.bus import HubEvent, PrivateEvent
+
+User = get_user_model()
+
+
+def make_user(n):
+    return User.objects.create_user(phone_number=f"+23480000000{n:02d}", username=f"user{n}")
+
+
+# =========================
+# ✅ CURSORS
+# =========================
+
+class CursorTests(SimpleTestCase):
+    def test_round_trip(self):
+        created_at = datetime(2026, 3, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc)
+        message_id = uuid.uuid4()
+
+        self.assertEqual(parse_cursor(encode_cursor(created_at, message_id)), (created_at, message_id))
+
+    def test_naive_timestamp_is_utc(self):
+        raw = f"2026-03-01T12:00:00|{uuid.uuid4()}"
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+
+        created_at, _ = parse_cursor(cursor)
+        self.assertEqual(created_at.tzinfo, dt_timezone.utc)
+
+    def test_tampered_cursor_is_ignored(self):
+        def b64(raw):
+            return base64.urlsafe_b64encode(raw.encode()).decode()
+
+        for cursor in (
+            "",
+            None,
+            "not base64 !!",
+            b64("no separator"),
+            b64(f"yesterday|{uuid.uuid4()}"),
+            b64("2026-03-01T12:00:00|not-a-uuid"),
+            b64("|"),
+        ):
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(parse_cursor(cursor))
+
+        self.assertEqual(decode_cursor("not base64 !!"), (None, None))
+
+
+# =========================
+# ✅ KEYSET HISTORY
+# =========================
+
+class HubHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.hub = CommunityHub.objects.create(name="Ikeja")
+
+        # three messages share one timestamp, so pages must break ties on id
+        t0 = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        stamps = [t0, t0 + timedelta(seconds=1)] + [t0 + timedelta(seconds=2)] * 3 + [t0 + timedelta(seconds=3)]
+
+        cls.messages = [
+            HubMessage.objects.create(
+                id=uuid.UUID(int=i + 1),
+                hub=cls.hub,
+                sender=cls.bob,
+                text=f"m{i}",
+                created_at=created_at,
+            )
+            for i, created_at in enumerate(stamps)
+        ]
+
+        # alice deleted m3 for herself (it sits inside the tie group)
+        cls.hidden = cls.messages[3]
+        HubMessageHidden.objects.create(message=cls.hidden, user=cls.alice)
+
+    def ids(self, rows):
+        return [row["id"] for row in rows]
+
+    def all_ids(self, user):
+        return [m.id for m in self.messages if not (user == self.alice and m == self.hidden)]
+
+    def test_newest_page(self):
+        rows, cursors = hub_history(self.hub.id, self.bob.id, 2)
+
+        self.assertEqual(self.ids(rows), [m.id for m in self.messages[-2:]])
+        self.assertIsNotNone(cursors["nextCursor"])
+        self.assertIsNone(cursors["newerCursor"])
+
+    def test_before_walks_all_messages_once(self):
+        for user in (self.alice, self.bob):
+            with self.subTest(user=user.username):
+                rows, cursors = hub_history(self.hub.id, user.id, 2)
+                seen = self.ids(rows)
+                while cursors["nextCursor"]:
+                    rows, cursors = hub_history(self.hub.id, user.id, 2, before=cursors["nextCursor"])
+                    seen = self.ids(rows) + seen
+
+                self.assertEqual(seen, self.all_ids(user))
+
+    def test_after_walks_all_messages_once(self):
+        for user in (self.alice, self.bob):
+            with self.subTest(user=user.username):
+                first = self.all_ids(user)[0]
+                rows, cursors = hub_history(self.hub.id, user.id, 2, around=first)
+                seen = self.ids(rows)
+                while cursors["newerCursor"]:
+                    rows, cursors = hub_history(self.hub.id, user.id, 2, after=cursors["newerCursor"])
+                    seen += self.ids(rows)
+
+                self.assertEqual(seen, self.all_ids(user))
+
+    def test_around_anchor_in_tie_group(self):
+        anchor = self.messages[4]
+
+        rows, cursors = hub_history(self.hub.id, self.bob.id, 4, around=anchor.id)
+
+        # limit // 2 + 1 older (anchor included), the rest newer
+        self.assertEqual(self.ids(rows), [m.id for m in self.messages[2:6]])
+        self.assertIsNotNone(cursors["nextCursor"])
+        self.assertIsNone(cursors["newerCursor"])
+
+    def test_around_skips_hidden_messages(self):
+        anchor = self.messages[4]
+
+        rows, _ = hub_history(self.hub.id, self.alice.id, 4, around=anchor.id)
+
+        self.assertEqual(self.ids(rows), [m.id for m in self.messages[1:3] + self.messages[4:6]])
+
+    def test_around_hidden_message_falls_back_to_newest(self):
+        rows, cursors = hub_history(self.hub.id, self.alice.id, 2, around=self.hidden.id)
+
+        self.assertEqual(self.ids(rows), [m.id for m in self.messages[-2:]])
+        self.assertIsNone(cursors["newerCursor"])
+
+
+class PrivateHistoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.carol = make_user(3)
+        cls.conversation = PrivateConversation.objects.create(user1=cls.alice, user2=cls.bob)
+        cls.other = PrivateConversation.objects.create(user1=cls.bob, user2=cls.carol)
+
+    def hydrate(self):
+        rows, _, _ = private_history(self.conversation.id, 10)
+        return hydrate_private_messages(rows, self.conversation.id, self.alice.id)
+
+    def test_reply_in_same_conversation(self):
+        target = PrivateMessage.objects.create(conversation=self.conversation, sender=self.bob, text="hello")
+        PrivateMessage.objects.create(conversation=self.conversation, sender=self.alice, text="hi", reply_to=target)
+
+        self.assertEqual(self.hydrate()[-1]["replyTo"]["text"], "hello")
+
+    def test_reply_into_other_conversation_hidden(self):
+        secret = PrivateMessage.objects.create(conversation=self.other, sender=self.carol, text="secret")
+        PrivateMessage.objects.create(conversation=self.conversation, sender=self.bob, text="fwd", reply_to=secret)
+
+        self.assertIsNone(self.hydrate()[-1]["replyTo"])
+
+
+# =========================
+# ✅ IDEMPOTENT SENDS
+# =========================
+
+class IdempotentSendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.hub = CommunityHub.objects.create(name="Ikeja")
+        cls.other_hub = CommunityHub.objects.create(name="Yaba")
+        cls.conversation = PrivateConversation.objects.create(user1=cls.alice, user2=cls.bob)
+
+    def test_retry_returns_original(self):
+        msg, created = create_hub_message(self.hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+        self.assertTrue(created)
+
+        # one index probe on (sender, client_temp_id), no insert
+        with self.assertNumQueries(1):
+            retry, created = create_hub_message(self.hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+
+        self.assertFalse(created)
+        self.assertEqual(retry.id, msg.id)
+        self.assertEqual(HubMessage.objects.filter(client_temp_id="tmp-1").count(), 1)
+
+    def test_concurrent_retry_falls_back_to_constraint(self):
+        msg, _ = create_hub_message(self.hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+
+        # the retry's lookup ran before the original committed
+        with mock.patch("community.idempotency.find_original", return_value=None):
+            retry, created = create_hub_message(self.hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+
+        self.assertFalse(created)
+        self.assertEqual(retry.id, msg.id)
+        self.assertEqual(HubMessage.objects.filter(client_temp_id="tmp-1").count(), 1)
+
+    def test_same_id_in_another_hub_conflicts(self):
+        create_hub_message(self.hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+
+        with self.assertRaises(ClientTempIdConflict):
+            create_hub_message(self.other_hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+
+        self.assertFalse(HubMessage.objects.filter(hub=self.other_hub).exists())
+
+    def test_other_sender_may_reuse_id(self):
+        create_hub_message(self.hub.id, self.alice.id, text="hi", client_temp_id="tmp-1")
+
+        _, created = create_hub_message(self.hub.id, self.bob.id, text="hi", client_temp_id="tmp-1")
+
+        self.assertTrue(created)
+
+    def test_empty_id_always_creates(self):
+        create_hub_message(self.hub.id, self.alice.id, text="hi")
+        _, created = create_hub_message(self.hub.id, self.alice.id, text="hi")
+
+        self.assertTrue(created)
+        self.assertEqual(HubMessage.objects.filter(hub=self.hub).count(), 2)
+
+    def test_private_retry(self):
+        msg, created = create_private_message(self.conversation.id, self.alice.id, "hi", client_temp_id="tmp-1")
+        self.assertTrue(created)
+
+        with mock.patch("community.idempotency.find_original", return_value=None):
+            retry, created = create_private_message(self.conversation.id, self.alice.id, "hi", client_temp_id="tmp-1")
+
+        self.assertFalse(created)
+        self.assertEqual(retry.id, msg.id)
+        self.assertEqual(PrivateMessage.objects.filter(client_temp_id="tmp-1").count(), 1)
+
+
+# =========================
+# ✅ BULK FORWARD
+# =========================
+
+class ForwardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.carol = make_user(3)
+        cls.source_hub = CommunityHub.objects.create(name="Ikeja")
+        cls.targets = [CommunityHub.objects.create(name=f"Target {i}") for i in range(3)]
+        cls.dave = make_user(4)
+        cls.source_conversation = PrivateConversation.objects.create(user1=cls.alice, user2=cls.bob)
+        cls.conversations = [
+            PrivateConversation.objects.create(user1=cls.alice, user2=cls.carol),
+            PrivateConversation.objects.create(user1=cls.alice, user2=cls.dave),
+        ]
+
+        t0 = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        cls.sources = [
+            HubMessage.objects.create(hub=cls.source_hub, sender=cls.bob, text=f"m{i}", created_at=t0 + timedelta(seconds=i))
+            for i in range(3)
+        ]
+        cls.private_sources = [
+            PrivateMessage.objects.create(
+                conversation=cls.source_conversation,
+                sender=cls.bob,
+                text=f"m{i}",
+                created_at=t0 + timedelta(seconds=i),
+            )
+            for i in range(3)
+        ]
+
+    def load_sources(self, model=HubMessage, sources=None):
+        # picked out of order; copies must still follow source order
+        ids = [m.id for m in reversed(sources or self.sources)]
+        return list(
+            model.objects.filter(id__in=ids)
+            .select_related("reply_to__sender")
+            .prefetch_related("attachments")
+        )
+
+    def test_hub_copies_keep_source_order(self):
+        with mock.patch("community.forwarding.apublish_hub", new=mock.AsyncMock()):
+            forward_hub_messages(self.alice, self.load_sources(), [h.id for h in self.targets])
+
+        for hub in self.targets:
+            copies = HubMessage.objects.filter(hub=hub).order_by("created_at", "id")
+            self.assertEqual([c.forwarded_from_id for c in copies], [m.id for m in self.sources])
+
+    def test_hub_forward_counts_in_one_update(self):
+        src_list = self.load_sources()
+
+        with mock.patch("community.forwarding.apublish_hub", new=mock.AsyncMock()):
+            with CaptureQueriesContext(connection) as ctx:
+                forward_hub_messages(self.alice, src_list, [h.id for h in self.targets])
+
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "community_hubmessage"')]
+        self.assertEqual(len(updates), 1)
+
+        for src in HubMessage.objects.filter(id__in=[m.id for m in self.sources]):
+            self.assertEqual(src.forwarded_count, len(self.targets))
+
+    def test_hub_one_batch_per_target(self):
+        publish = mock.AsyncMock()
+
+        with mock.patch("community.forwarding.apublish_hub", new=publish):
+            with self.captureOnCommitCallbacks(execute=True):
+                forward_hub_messages(self.alice, self.load_sources(), [h.id for h in self.targets])
+
+        self.assertEqual(publish.await_count, len(self.targets))
+        self.assertEqual({c.args[0] for c in publish.await_args_list}, {str(h.id) for h in self.targets})
+
+        for c in publish.await_args_list:
+            event = c.args[1]
+            self.assertEqual(event.type, HubEvent.MESSAGE_BATCH)
+            self.assertEqual([m["text"] for m in event.payload["messages"]], ["m0", "m1", "m2"])
+
+    def test_failed_target_does_not_stop_others(self):
+        failing = str(self.targets[0].id)
+
+        async def fail_one(hub_id, event, shards=None):
+            if hub_id == failing:
+                raise ConnectionError("redis down")
+
+        publish = mock.AsyncMock(side_effect=fail_one)
+
+        with mock.patch("community.forwarding.apublish_hub", new=publish):
+            with self.assertLogs("community.forwarding", "ERROR"):
+                with self.captureOnCommitCallbacks(execute=True):
+                    forward_hub_messages(self.alice, self.load_sources(), [h.id for h in self.targets])
+
+        self.assertEqual(publish.await_count, len(self.targets))
+
+    def test_hub_reply_pointer_stays_in_its_hub(self):
+        reply = HubMessage.objects.create(hub=self.source_hub, sender=self.bob, text="re", reply_to=self.sources[0])
+        src_list = self.load_sources(sources=[reply])
+
+        with mock.patch("community.forwarding.apublish_hub", new=mock.AsyncMock()):
+            payloads = forward_hub_messages(self.alice, src_list, [self.targets[0].id, self.source_hub.id])
+
+        copies = {c.hub_id: c for c in HubMessage.objects.filter(forwarded_from=reply)}
+        self.assertIsNone(copies[self.targets[0].id].reply_to_id)
+        self.assertEqual(copies[self.source_hub.id].reply_to_id, self.sources[0].id)
+        self.assertIsNone(payloads[0]["replyTo"])
+
+    def test_private_reply_not_leaked_to_other_conversation(self):
+        reply = PrivateMessage.objects.create(
+            conversation=self.source_conversation,
+            sender=self.bob,
+            text="re",
+            reply_to=self.private_sources[0],
+        )
+        src_list = self.load_sources(PrivateMessage, [reply])
+
+        with mock.patch("community.forwarding.apublish_private", new=mock.AsyncMock()):
+            payloads = forward_private_messages(self.alice, src_list, [self.conversations[0].id])
+
+        self.assertIsNone(payloads[0]["replyTo"])
+        copy = PrivateMessage.objects.get(conversation=self.conversations[0])
+        self.assertIsNone(copy.reply_to_id)
+
+    def test_private_one_batch_per_conversation(self):
+        src_list = self.load_sources(PrivateMessage, self.private_sources)
+        publish = mock.AsyncMock()
+
+        with mock.patch("community.forwarding.apublish_private", new=publish):
+            with self.captureOnCommitCallbacks(execute=True):
+                forward_private_messages(self.alice, src_list, [c.id for c in self.conversations])
+
+        self.assertEqual(publish.await_count, len(self.conversations))
+
+        for c in publish.await_args_list:
+            event = c.args[1]
+            self.assertEqual(event.type, PrivateEvent.MESSAGE_BATCH)
+            self.assertEqual([m["text"] for m in event.payload["messages"]], ["m0", "m1", "m2"])
+
+        for conversation in self.conversations:
+            copies = PrivateMessage.objects.filter(conversation=conversation).order_by("created_at", "id")
+            self.assertEqual([c.text for c in copies], ["m0", "m1", "m2"])
+
+
+# =========================
+# ✅ HUB SEARCH
+# =========================
+
+def make_unit(code, level, parent=None):
+    square = Polygon(((0, 0), (0, 1), (1, 1), (1, 0), (0, 0)), srid=4326)
+    return AdminUnit.objects.create(
+        country_code="NG",
+        level=level,
+        code=code,
+        name=code,
+        parent=parent,
+        geom=MultiPolygon(square, srid=4326),
+    )
+
+
+class HubSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lagos = make_unit("NGA.25_1", 1)
+        cls.ikeja_lga = make_unit("NGA.25.10_1", 2, parent=cls.lagos)
+        cls.oyo = make_unit("NGA.31_1", 1)
+        cls.ibadan_lga = make_unit("NGA.31.5_1", 2, parent=cls.oyo)
+
+        cls.user = make_user(1)
+        cls.user.admin_1 = cls.lagos
+        cls.user.admin_2 = cls.ikeja_lga
+        cls.user.save(update_fields=["admin_1", "admin_2"])
+
+        cls.mainland = CommunityHub.objects.create(name="Lagos Mainland")
+        cls.island = CommunityHub.objects.create(name="Lagos Island")
+        cls.ikeja = CommunityHub.objects.create(name="Ikeja")
+        cls.market = CommunityHub.objects.create(name="Traders", tags=["market", "oshodi"])
+        cls.closed = CommunityHub.objects.create(name="Lagos Mainland Old", is_active=False)
+
+        # same name in the user's LGA, in the user's state, and elsewhere
+        ibadan = CommunityHub.objects.create(name="Ibadan", admin_unit=cls.ibadan_lga)
+        ikeja_lga_hub = CommunityHub.objects.create(name="Ikeja LGA", admin_unit=cls.ikeja_lga)
+        cls.watch_far = CommunityHub.objects.create(name="Neighbourhood Watch", parent=ibadan)
+        cls.watch_state = CommunityHub.objects.create(
+            name="Neighbourhood Watch",
+            admin_unit=make_unit("NGA.25.11_1", 2, parent=cls.lagos),
+        )
+        cls.watch_local = CommunityHub.objects.create(name="Neighbourhood Watch", parent=ikeja_lga_hub)
+
+    def names(self, q):
+        return [hub.name for hub in search_hubs(self.user, q)]
+
+    def test_prefix_match_every_word(self):
+        self.assertEqual(self.names("lag main"), ["Lagos Mainland"])
+
+    def test_prefix_match_tags(self):
+        self.assertEqual(self.names("mark"), ["Traders"])
+
+    def test_typo_match(self):
+        self.assertIn("Ikeja", self.names("ikejja"))
+
+    def test_inactive_hubs_excluded(self):
+        self.assertNotIn(self.closed.id, [hub.id for hub in search_hubs(self.user, "lagos")])
+
+    def test_empty_query(self):
+        self.assertEqual(self.names("  "), [])
+        self.assertEqual(self.names("!!"), [])
+
+    def test_proximity_ranking(self):
+        ids = [hub.id for hub in search_hubs(self.user, "neighbourhood watch")]
+
+        self.assertEqual(ids, [self.watch_local.id, self.watch_state.id, self.watch_far.id])
+
+
+# =========================
+# ✅ SUBDIVIDED BOUNDARIES
+# =========================
+
+class AdminUnitPieceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lagos = make_unit("NGA.25_1", 1)
+        # 129-vertex ring, well over the piece limit used below
+        cls.ikeja_lga = AdminUnit.objects.create(
+            country_code="NG",
+            level=2,
+            code="NGA.25.10_1",
+            name="Ikeja",
+            parent=cls.lagos,
+            geom=MultiPolygon(Point(0.5, 0.5, srid=4326).buffer(0.4, quadsegs=32), srid=4326),
+        )
+        cls.accra = AdminUnit.objects.create(
+            country_code="GH",
+            level=1,
+            code="GHA.1_1",
+            name="Greater Accra",
+            geom=MultiPolygon(Polygon(((5, 5), (5, 6), (6, 6), (6, 5), (5, 5)), srid=4326), srid=4326),
+        )
+
+    def test_rebuild_bounds_piece_size(self):
+        written = rebuild_admin_unit_pieces("NG", max_vertices=16)
+
+        pieces = AdminUnitPiece.objects.filter(admin_unit=self.ikeja_lga)
+        self.assertGreater(pieces.count(), 1)
+        self.assertTrue(all(piece.geom.num_coords <= 16 for piece in pieces))
+        self.assertEqual(written, AdminUnitPiece.objects.count())
+        self.assertFalse(AdminUnitPiece.objects.filter(country_code="GH").exists())
+
+    def test_rebuild_replaces_only_that_country(self):
+        rebuild_admin_unit_pieces()
+        ghana = list(AdminUnitPiece.objects.filter(country_code="GH").values_list("id", flat=True))
+
+        rebuild_admin_unit_pieces("NG")
+
+        self.assertEqual(list(AdminUnitPiece.objects.filter(country_code="GH").values_list("id", flat=True)), ghana)
+        self.assertEqual(AdminUnitPiece.objects.filter(country_code="NG").values("admin_unit").distinct().count(), 2)
+
+    def test_resolves_through_pieces(self):
+        rebuild_admin_unit_pieces("NG", max_vertices=16)
+
+        units = LocationResolver(0.5, 0.5, "NG").resolve_admin_units()
+
+        self.assertEqual({level: unit.id for level, unit in units.items()}, {1: self.lagos.id, 2: self.ikeja_lga.id})
+
+    def test_falls_back_to_full_boundaries_without_pieces(self):
+        units = LocationResolver(5.5, 5.5, "GH").resolve_admin_units()
+
+        self.assertEqual({level: unit.id for level, unit in units.items()}, {1: self.accra.id})
+
+
+# =========================
+# ✅ STATE HUB TREE
+# =========================
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "hub_tree": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "hub_tree_test",
+        },
+    }
+)
+class HubTreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lagos = make_unit("NGA.25_1", 1)
+        cls.ikeja_lga = make_unit("NGA.25.10_1", 2, parent=cls.lagos)
+        cls.yaba_lga = make_unit("NGA.25.11_1", 2, parent=cls.lagos)
+        cls.ikeja = CommunityHub.objects.create(name="Ikeja", hub_type=HubType.SYSTEM, admin_unit=cls.ikeja_lga)
+
+    def setUp(self):
+        hub_tree.cache.clear()
+
+    def hub_names(self, tree):
+        return {row["lga"]["name"]: [hub["name"] for hub in row["hubs"]] for row in tree}
+
+    def test_missing_system_hubs_are_created(self):
+        tree = hub_tree.get_state_hub_tree(self.lagos)
+
+        self.assertEqual(self.hub_names(tree), {"NGA.25.10_1": ["Ikeja"], "NGA.25.11_1": ["NGA.25.11_1"]})
+        self.assertTrue(CommunityHub.objects.filter(admin_unit=self.yaba_lga, hub_type=HubType.SYSTEM).exists())
+
+    def test_second_read_is_served_from_cache(self):
+        # creating a missing system hub bumps the version, so start with all of them
+        CommunityHub.objects.create(name="Yaba", hub_type=HubType.SYSTEM, admin_unit=self.yaba_lga)
+        tree = hub_tree.get_state_hub_tree(self.lagos)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(hub_tree.get_state_hub_tree(self.lagos), tree)
+
+    def test_hub_changes_invalidate_the_state(self):
+        hub_tree.get_state_hub_tree(self.lagos)
+
+        local = CommunityHub.objects.create(name="Allen Avenue", hub_type=HubType.LOCAL, parent=self.ikeja)
+        self.assertEqual(self.hub_names(hub_tree.get_state_hub_tree(self.lagos))["NGA.25.10_1"], ["Ikeja", "Allen Avenue"])
+
+        local.is_active = False
+        local.save()
+        self.assertEqual(self.hub_names(hub_tree.get_state_hub_tree(self.lagos))["NGA.25.10_1"], ["Ikeja"])
+
+    def test_hub_state_unit_id(self):
+        local = CommunityHub(name="Allen Avenue", hub_type=HubType.LOCAL, parent=self.ikeja)
+        orphan = CommunityHub(name="Nowhere", hub_type=HubType.LOCAL)
+
+        self.assertEqual(hub_tree.hub_state_unit_id(self.ikeja), self.lagos.id)
+        self.assertEqual(hub_tree.hub_state_unit_id(local), self.lagos.id)
+        self.assertIsNone(hub_tree.hub_state_unit_id(orphan))
+
+
+# =========================
+# ✅ GEO RESOLUTION CACHE
+# =========================
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "geo_resolve": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "geo_resolve_test",
+        },
+    }
+)
+class ResolutionCacheTests(SimpleTestCase):
+    def make_cache(self):
+        return ResolutionCache(precision=7, local_size=2, shared_ttl=60, shared_alias="geo_resolve")
+
+    def test_other_worker_hits_shared_tier(self):
+        value = {"units": {"2": "lga"}, "fallback": False}
+        self.make_cache().set(6.6, 3.35, "NG", value)
+
+        other = self.make_cache()
+        self.assertEqual(other.get(6.6, 3.35, "NG"), value)
+        self.assertEqual(other.get(6.6, 3.35, "NG"), value)
+
+        stats = other.stats()
+        self.assertEqual((stats["shared_hits"], stats["local_hits"], stats["misses"]), (1, 1, 0))
+
+    def test_local_tier_is_bounded(self):
+        resolutions = self.make_cache()
+        for lat in (1.0, 2.0, 3.0):
+            resolutions.set(lat, 3.0, "NG", {"units": {}, "fallback": True})
+
+        self.assertEqual(resolutions.stats()["local_size"], 2)
+
+
+# =========================
+# ✅ HUB LISTING COUNTS
+# =========================
+
+class HubCountsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.hubs = [CommunityHub.objects.create(name=f"Hub {i}") for i in range(4)]
+
+        t0 = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        for i, hub in enumerate(cls.hubs):
+            CommunityMembership.objects.create(user=cls.alice, hub=hub)
+            for n in range(i + 1):
+                HubMessage.objects.create(hub=hub, sender=cls.bob, text=f"m{n}", created_at=t0 + timedelta(minutes=n))
+
+        CommunityMembership.objects.create(user=cls.bob, hub=cls.hubs[0])
+        CommunityMembership.objects.create(user=cls.bob, hub=cls.hubs[1], is_active=False)
+
+        # alice read hub 2 up to its 2nd message and hub 3 completely
+        HubReadReceipt.objects.create(user=cls.alice, hub=cls.hubs[2], last_read_message_at=t0 + timedelta(minutes=1))
+        HubReadReceipt.objects.create(user=cls.alice, hub=cls.hubs[3], last_read_message_at=t0 + timedelta(minutes=3))
+
+    def hub_ids(self):
+        return [hub.id for hub in self.hubs]
+
+    def test_unread_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = hub_unread_counts(self.alice, self.hub_ids())
+
+        # never opened -> everything unread; fully read hubs are omitted
+        self.assertEqual(counts, {str(self.hubs[0].id): 1, str(self.hubs[1].id): 2, str(self.hubs[2].id): 1})
+
+    def test_member_counts_in_one_query(self):
+        with self.assertNumQueries(1):
+            counts = hub_member_counts(self.hub_ids())
+
+        self.assertEqual(counts[str(self.hubs[0].id)], 2)
+        self.assertEqual(counts[str(self.hubs[1].id)], 1)
+
+    def test_empty_hub_list(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(hub_unread_counts(self.alice, []), {})
+            self.assertEqual(hub_member_counts([]), {})
+
+
+class HubLastMessageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.hubs = [CommunityHub.objects.create(name=f"Hub {i}") for i in range(3)]
+        cls.t0 = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+    def message(self, hub, minutes, text="hi"):
+        return HubMessage.objects.create(
+            hub=hub, sender=self.alice, text=text, created_at=self.t0 + timedelta(minutes=minutes)
+        )
+
+    def pointer(self, hub):
+        hub.refresh_from_db(fields=["last_message", "last_message_at"])
+        return hub.last_message_id
+
+    def test_send_moves_pointer(self):
+        msg, _ = create_hub_message(self.hubs[0].id, self.alice.id, text="hello")
+
+        self.assertEqual(self.pointer(self.hubs[0]), msg.id)
+
+    def test_pointer_never_moves_backwards(self):
+        newer = self.message(self.hubs[0], 5)
+        older = self.message(self.hubs[0], 1)
+
+        set_hub_last_message(newer)
+        set_hub_last_message(older)
+
+        self.assertEqual(self.pointer(self.hubs[0]), newer.id)
+
+    def test_refresh_skips_deleted_messages(self):
+        kept = self.message(self.hubs[0], 1)
+        deleted = self.message(self.hubs[0], 2)
+        set_hub_last_message(deleted)
+
+        HubMessage.objects.filter(id=deleted.id).update(deleted_at=self.t0)
+        refresh_hub_last_message(self.hubs[0].id)
+        self.assertEqual(self.pointer(self.hubs[0]), kept.id)
+
+        HubMessage.objects.filter(id=kept.id).update(deleted_at=self.t0)
+        refresh_hub_last_message(self.hubs[0].id)
+        self.assertIsNone(self.pointer(self.hubs[0]))
+
+    def test_previews_in_one_query(self):
+        for i, hub in enumerate(self.hubs[:2]):
+            for n in range(10):
+                set_hub_last_message(self.message(hub, n, text=f"{i}-{n}"))
+
+        with self.assertNumQueries(1):
+            previews = hub_last_messages([hub.id for hub in self.hubs])
+            names = {hid: m.sender.username for hid, m in previews.items()}
+
+        self.assertEqual({hid: m.text for hid, m in previews.items()}, {
+            str(self.hubs[0].id): "0-9",
+            str(self.hubs[1].id): "1-9",
+        })
+        self.assertEqual(set(names.values()), {self.alice.username})
+
+
+# =========================
+# ✅ READ WATERMARKS
+# =========================
+
+class ReadWatermarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.hub = CommunityHub.objects.create(name="Ikeja")
+
+        t0 = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+        # messages[1] and messages[2] share a timestamp; the id breaks the tie
+        cls.messages = sorted(
+            (
+                HubMessage.objects.create(hub=cls.hub, sender=cls.alice, text=f"m{i}", created_at=t0 + timedelta(minutes=m))
+                for i, m in enumerate((0, 1, 1, 2))
+            ),
+            key=lambda msg: (msg.created_at, msg.id),
+        )
+        cls.now = t0 + timedelta(hours=1)
+
+    def cursor(self, msg):
+        return (msg.created_at, msg.id)
+
+    def readers(self, msg):
+        return set(message_read_by(msg).values_list("user_id", flat=True))
+
+    def advance(self, delivered=None, read=None):
+        advance_hub_watermarks(self.bob.id, self.hub.id, self.now, delivered=delivered, read=read)
+
+    def test_read_implies_delivered(self):
+        self.advance(read=self.cursor(self.messages[1]))
+
+        receipt = HubReadReceipt.objects.get(user=self.bob, hub=self.hub)
+        self.assertEqual(receipt.last_delivered_message_id, self.messages[1].id)
+        self.assertEqual(receipt.last_read_message_id, self.messages[1].id)
+        self.assertEqual(receipt.last_seen_message_id, self.messages[1].id)
+
+    def test_cursors_never_move_backwards(self):
+        self.advance(read=self.cursor(self.messages[2]))
+        self.advance(delivered=self.cursor(self.messages[0]), read=self.cursor(self.messages[1]))
+
+        receipt = HubReadReceipt.objects.get(user=self.bob, hub=self.hub)
+        self.assertEqual(receipt.last_delivered_message_id, self.messages[2].id)
+        self.assertEqual(receipt.last_read_message_id, self.messages[2].id)
+
+    def test_read_by_compares_against_cursor(self):
+        self.advance(delivered=self.cursor(self.messages[3]), read=self.cursor(self.messages[1]))
+
+        self.assertEqual(
+            [self.readers(msg) for msg in self.messages],
+            [{self.bob.id}, {self.bob.id}, set(), set()],
+        )
+        self.assertTrue(message_delivered_to(self.messages[3]).filter(user=self.bob).exists())
+
+    def test_sender_is_excluded(self):
+        advance_hub_watermarks(self.alice.id, self.hub.id, self.now, read=self.cursor(self.messages[3]))
+
+        self.assertEqual(self.readers(self.messages[0]), set())
+
+    def test_nothing_to_advance_writes_nothing(self):
+        with self.assertNumQueries(0):
+            self.advance()
+
+        self.assertFalse(HubReadReceipt.objects.exists())
+
+
+# =========================
+# ✅ HUB MESSAGE HYDRATION
+# =========================
+
+class HubMessageHydrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = make_user(1)
+        cls.bob = make_user(2)
+        cls.hub = CommunityHub.objects.create(name="Ikeja")
+        cls.root = HubMessage.objects.create(hub=cls.hub, sender=cls.bob, text="root")
+
+        for i in range(6):
+            msg = HubMessage.objects.create(hub=cls.hub, sender=cls.bob, text=f"m{i}", reply_to=cls.root)
+            MessageAttachment.objects.create(message=msg, attachment_type="IMAGE", url=f"https://example.com/{i}.jpg")
+            MessageReaction.objects.create(message=msg, user=cls.alice, emoji="🔥")
+            MessageReaction.objects.create(message=msg, user=cls.bob, emoji="🔥")
+
+    def messages(self, n):
+        return list(
+            HubMessage.objects.select_related("sender")
+            .filter(hub=self.hub, reply_to=self.root)
+            .order_by("created_at")[:n]
+        )
+
+    def test_query_count_independent_of_page_size(self):
+        for n in (1, 6):
+            messages = self.messages(n)
+            with self.subTest(page=n), self.assertNumQueries(4):
+                serialize_hub_messages(messages, viewer_id=self.alice.id)
+
+    def test_hydrated_payload(self):
+        data = serialize_hub_messages(self.messages(1), viewer_id=self.alice.id)[0]
+
+        self.assertEqual(data["replyTo"], {"id": str(self.root.id), "text": "root", "senderName": self.bob.username})
+        self.assertEqual(len(data["attachments"]), 1)
+        self.assertEqual(data["reactions"], [{"emoji": "🔥", "count": 2}])
+        self.assertEqual(data["myReaction"], "🔥")
+        self.assertFalse(data["isMine"])
@@ -6,9 +6,7 @@ from rest_framework import status
 from django.contrib.gis.geos import Point
 from django.utils import timezone
 from community.services import LocationResolver, ensure_system_hubs_and_join, AdminUnit
-from websocket.events.broadcaster import chat_group_name
-from websocket.events.socket import notify_group
-import base64
+from websocket.events.bus import Event, HubEvent, publish_hub
 from uuid import UUID
 from django.db.models import Q
 from community.models import (
@@ -21,25 +19,7 @@ from community.models import (
 
 from accounts.models import User 
 
-
-
-def encode_cursor(created_at, message_id: UUID) -> str:
-    """
-    cursor format: base64("timestamp|uuid")
-    """
-    raw = f"{created_at.isoformat()}|{str(message_id)}"
-    return base64.urlsafe_b64encode(raw.encode()).decode()
-
-def decode_cursor(cursor: str):
-    """
-    returns (created_at_iso, uuid_str) or (None, None)
-    """
-    try:
-        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
-        created_at_str, message_id_str = raw.split("|", 1)
-        return created_at_str, message_id_str
-    except Exception:
-        return None, None
+from community.history import hub_history
 
 from django.contrib.gis.geos import Point
 from django.utils import timezone
@@ -52,6 +32,8 @@ from rest_framework import status
 
 from community.models import AdminUnit, CommunityHub, HubType, CommunityMembership, HubMessage, HubReadReceipt
 from community.serializers import HubSerializer
+from community.hub_stats import hub_listing_overlays, refresh_hub_last_message, set_hub_last_message
+from community.hub_tree import get_state_hub_tree
 
 class NearbyCommunitiesByLocationView(APIView):
     permission_classes = [IsAuthenticated]
@@ -132,147 +114,25 @@ class NearbyCommunitiesByLocationView(APIView):
         # ✅ ensure system hubs exist for current admin units
         hubs_by_level = ensure_system_hubs_and_join(user=user, admin_units=admin_units)
 
-        # ✅ user memberships
-        joined_rows = (
-            CommunityMembership.objects.filter(user=user, is_active=True)
-            .values("hub_id", "role")
-        )
-        joined_map = {str(r["hub_id"]): r["role"] for r in joined_rows}
-
         groups = []
         state_unit = admin_units.get(1)
 
         if state_unit:
-            lga_units = (
-                AdminUnit.objects.filter(level=2, parent=state_unit)
-                .select_related("hub")
-                .prefetch_related("hub__children")
-                .order_by("name")
-            )
-
-            # ✅ collect all hub ids for bulk stats
-            all_hubs = []
-            for lga in lga_units:
-                system_hub = getattr(lga, "hub", None)
-
-                if not system_hub:
-                    system_hub = CommunityHub.objects.create(
-                        admin_unit=lga,
-                        name=lga.name,
-                        hub_type=HubType.SYSTEM,
-                        is_active=True,
-                        is_verified=True,
-                    )
-
-                all_hubs.append(system_hub)
+            # ✅ shared state → LGA → hub snapshot (cached, invalidated on hub changes)
+            tree = get_state_hub_tree(state_unit)
 
-                local_hubs = list(
-                    system_hub.children.filter(
-                        hub_type=HubType.LOCAL,
-                        is_active=True,
-                    ).order_by("name")
-                )
-                all_hubs.extend(local_hubs)
-
-            hub_ids = [h.id for h in all_hubs]
-
-            # ✅ members_count (bulk)
-            members_rows = (
-                CommunityMembership.objects.filter(hub_id__in=hub_ids, is_active=True)
-                .values("hub_id")
-                .annotate(cnt=Count("id"))
-            )
-            members_map = {str(r["hub_id"]): r["cnt"] for r in members_rows}
-
-            # ✅ last message preview (bulk)
-            last_msg_time_rows = (
-                HubMessage.objects.filter(hub_id__in=hub_ids)
-                .values("hub_id")
-                .annotate(last_at=Max("created_at"))
-            )
-            last_at_map = {str(r["hub_id"]): r["last_at"] for r in last_msg_time_rows}
-
-            last_messages = (
-                HubMessage.objects.filter(hub_id__in=hub_ids)
-                .select_related("sender")
-                .order_by("-created_at")
-            )
-
-            last_msg_map = {}
-            for msg in last_messages:
-                hid = str(msg.hub_id)
-                if hid not in last_msg_map:
-                    last_msg_map[hid] = msg
-
-            # ✅ unread_count (per hub)
-            receipts_rows = (
-                HubReadReceipt.objects.filter(user=user, hub_id__in=hub_ids)
-                .values("hub_id", "last_seen_at")
-            )
-            last_seen_map = {str(r["hub_id"]): r["last_seen_at"] for r in receipts_rows}
-
-            unread_map = {}
-            for h in hub_ids:
-                hid = str(h)
-                last_seen = last_seen_map.get(hid)
-
-                if not last_seen:
-                    unread_map[hid] = HubMessage.objects.filter(hub_id=h).count()
-                else:
-                    unread_map[hid] = HubMessage.objects.filter(
-                        hub_id=h, created_at__gt=last_seen
-                    ).count()
-
-            # ✅ build LGA groups
-            for lga in lga_units:
-                system_hub = getattr(lga, "hub", None)
-                if not system_hub:
-                    continue
-
-                # ✅ build list: system + locals
-                local_hubs = list(
-                    system_hub.children.filter(
-                        hub_type=HubType.LOCAL,
-                        is_active=True,
-                    ).order_by("name")
-                )
-
-                hub_list = [system_hub] + local_hubs
-
-                hubs_payload = []
-                for hub in hub_list:
-                    base = HubSerializer(hub).data
-                    role = joined_map.get(str(hub.id))
-                    last_msg = last_msg_map.get(str(hub.id))
-
-                    base.update(
-                        {
-                            "user_joined": role is not None,
-                            "user_role": role,
-
-                            "members_count": members_map.get(str(hub.id), 0),
-                            "online_count": 0,
-                            "unread_count": unread_map.get(str(hub.id), 0),
-
-                            "last_message_text": getattr(last_msg, "text", None) if last_msg else None,
-                            "last_message_type": getattr(last_msg, "message_type", None) if last_msg else None,
-                            "last_message_at": last_msg.created_at.isoformat() if last_msg else None,
-                            "last_message_sender_name": (
-                                getattr(last_msg.sender, "username", None)
-                                if last_msg and last_msg.sender
-                                else None
-                            ),
-
-                            "pinned_message_id": None,
-                        }
-                    )
-
-                    hubs_payload.append(base)
+            # ✅ per-user overlay only (joined role, counts, previews)
+            hub_ids = [hub["id"] for lga_group in tree for hub in lga_group["hubs"]]
+            overlays = hub_listing_overlays(user, hub_ids)
 
+            for lga_group in tree:
                 groups.append(
                     {
-                        "lga": {"id": str(lga.id), "name": lga.name},
-                        "hubs": hubs_payload,
+                        "lga": lga_group["lga"],
+                        "hubs": [
+                            {**hub, **overlays[str(hub["id"])]}
+                            for hub in lga_group["hubs"]
+                        ],
                     }
                 )
 
@@ -416,7 +276,9 @@ from rest_framework import status
 
 from community.models import CommunityMembership, HubMessage, MessageAttachment, MessageType
 from community.services import HubMessageSerializer
-from websocket.events.socket import notify_group
+from community.idempotency import ClientTempIdConflict
+from community.messaging import create_hub_message
+from websocket.events.bus import Event, HubEvent, publish_hub
 
 
 class GroupMessagesView(APIView):
@@ -435,77 +297,37 @@ class GroupMessagesView(APIView):
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        cursor = request.query_params.get("cursor")
-
-        qs = (
-            HubMessage.objects.filter(hub_id=group_id)
-            .exclude(hidden_by__user=user)  # ✅ delete-for-me filter
-            .select_related("sender")
-            .order_by("-created_at", "-id")
+        # ✅ keyset paging: cursor/before = older, after = newer, around = jump to message
+        rows, cursors = hub_history(
+            group_id,
+            user.id,
+            self.PAGE_SIZE,
+            before=request.query_params.get("before") or request.query_params.get("cursor"),
+            after=request.query_params.get("after"),
+            around=request.query_params.get("around"),
         )
 
-
-        # ✅ cursor pagination (load older)
-        if cursor:
-            created_at_str, message_id_str = decode_cursor(cursor)
-
-            if created_at_str and message_id_str:
-                try:
-                    created_at = timezone.datetime.fromisoformat(created_at_str)
-                    if created_at.tzinfo is None:
-                        created_at = created_at.replace(tzinfo=timezone.utc)
-
-                    msg_uuid = UUID(message_id_str)
-
-                    qs = qs.filter(
-                        Q(created_at__lt=created_at)
-                        | Q(created_at=created_at, id__lt=msg_uuid)
-                    )
-                except Exception:
-                    # ignore invalid cursor
-                    pass
-
-        # ✅ fetch one extra to know if there's next page
-        rows = list(qs[: self.PAGE_SIZE + 1])
-        has_more = len(rows) > self.PAGE_SIZE
-        rows = rows[: self.PAGE_SIZE]
-
-        # ✅ we want the frontend to render oldest -> newest
-        rows.reverse()
-
         messages = [
             {
-                "id": str(m.id),
-                "text": m.text,
-                "createdAt": m.created_at.isoformat(),
+                "id": str(m["id"]),
+                "text": m["text"],
+                "createdAt": m["created_at"].isoformat(),
                 "sender": {
-                    "id": str(m.sender_id),
-                    "name": getattr(m.sender, "full_name", None)
-                    or m.sender.username,
-                    "photo": getattr(m.sender, "photo", None),
+                    "id": str(m["sender_id"]),
+                    "name": m["sender__full_name"] or m["sender__username"],
+                    "photo": m.get("sender__photo"),
                 },
-                "isMine": str(m.sender_id) == str(user.id),
+                "isMine": str(m["sender_id"]) == str(user.id),
                 "status": "sent",
                 "seenBy": [],
             }
             for m in rows
         ]
 
-        next_cursor = None
-        if has_more and rows:
-            # ✅ next cursor should be based on OLDEST message in this batch
-            oldest = rows[0]
-            next_cursor = encode_cursor(oldest.created_at, UUID(oldest["id"]) if isinstance(oldest, dict) else oldest.id)
-
-        # ✅ Fix: rows[0] is model not dict
-        if has_more and rows:
-            oldest_model = HubMessage.objects.get(id=rows[0]["id"]) if isinstance(rows[0], dict) else rows[0]
-            next_cursor = encode_cursor(oldest_model.created_at, oldest_model.id)
-
         return Response(
             {
                 "messages": messages,
-                "nextCursor": next_cursor,
+                **cursors,
             },
             status=status.HTTP_200_OK,
         )
@@ -536,49 +358,34 @@ class GroupMessagesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # ✅ Resolve reply_to
-        reply_obj = None
-        if reply_to_id:
-            try:
-                reply_obj = HubMessage.objects.filter(hub_id=group_id, id=reply_to_id).first()
-            except Exception:
-                reply_obj = None
-
-        # ✅ Create message
-        msg = HubMessage.objects.create(
-            hub_id=group_id,
-            sender=user,
-            text=text,
-            message_type=message_type,
-            client_temp_id=client_temp_id,
-            reply_to=reply_obj,
-        )
-
-        # ✅ Attach uploaded attachments
+        # ✅ Create message (a retried clientTempId returns the original)
         # attachments = [{id, type, url, ...}]
-        for att in attachments:
-            att_id = att.get("id")
-            if not att_id:
-                continue
-
-            # ✅ Attach only existing attachments (avoid user hacking)
-            a = MessageAttachment.objects.filter(id=att_id, message__isnull=True).first()
-            if not a:
-                continue
-
-            a.message = msg
-            a.save()
+        try:
+            msg, created = create_hub_message(
+                hub_id=group_id,
+                sender_id=user.id,
+                text=text,
+                message_type=message_type,
+                client_temp_id=client_temp_id,
+                reply_to_id=reply_to_id,
+                attachment_ids=[att.get("id") for att in attachments if isinstance(att, dict) and att.get("id")],
+            )
+        except ClientTempIdConflict:
+            return Response(
+                {"error": "clientTempId already used in another chat"},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         # ✅ Serialize for response
         data = HubMessageSerializer(msg, context={"request": request}).data
 
+        if not created:
+            return Response(data, status=status.HTTP_200_OK)
+
         # ✅ Broadcast to websocket group
-        notify_group(
-            group_id=str(group_id),
-            payload={
-                "type": "message:new",
-                "payload": data,
-            },
+        publish_hub(
+            str(group_id),
+            Event(HubEvent.MESSAGE_NEW, data),
         )
 
         return Response(data, status=status.HTTP_201_CREATED)
@@ -690,7 +497,7 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from community.models import HubMessage, MessageReaction
-from websocket.events.socket import notify_group
+from websocket.events.bus import Event, HubEvent, publish_hub
 
 class MessageReactionView(APIView):
     permission_classes = [IsAuthenticated]
@@ -724,9 +531,9 @@ class MessageReactionView(APIView):
             "action": action,
         }
 
-        notify_group(
-            group_id=str(msg.hub_id),
-            payload={"type": "reaction:update", "payload": payload},
+        publish_hub(
+            str(msg.hub_id),
+            Event(HubEvent.REACTION_UPDATE, payload),
         )
 
         return Response(payload, status=status.HTTP_200_OK)
@@ -740,7 +547,7 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from community.models import HubMessage
-from websocket.events.socket import notify_group
+from websocket.events.bus import Event, HubEvent, publish_hub
 
 from datetime import timedelta
 from django.utils import timezone
@@ -790,17 +597,21 @@ class MessageDeleteView(APIView):
         msg.deleted_at = timezone.now()
         msg.save(update_fields=["deleted_at"])
 
+        # ✅ preview must not show a deleted message
+        if msg.hub.last_message_id == msg.id:
+            refresh_hub_last_message(msg.hub_id)
+
 
         # ✅ notify websocket
-        notify_group(
-            group_id=str(msg.hub_id),
-            payload={
-                "type": "message:delete",
-                "payload": {
+        publish_hub(
+            str(msg.hub_id),
+            Event(
+                HubEvent.MESSAGE_DELETE,
+                {
                     "messageId": str(msg.id),
                     "deletedAt": msg.deleted_at.isoformat(),
                 },
-            },
+            ),
         )
 
 
@@ -816,7 +627,7 @@ from rest_framework import status
 
 from community.models import HubMessage
 from community.services import HubMessageSerializer
-from websocket.events.socket import notify_group
+from websocket.events.bus import Event, HubEvent, publish_hub
 
 
 class MessageEditView(APIView):
@@ -841,13 +652,14 @@ class MessageEditView(APIView):
         msg.text = text
         msg.edited_at = timezone.now()
         msg.save(update_fields=["text", "edited_at"])
+        # ✅ hub preview reads through last_message pointer, so the edit shows up as-is
 
 
         data = HubMessageSerializer(msg, context={"request": request}).data
 
-        notify_group(
-            group_id=str(msg.hub_id),
-            payload={"type": "message:edit", "payload": data},
+        publish_hub(
+            str(msg.hub_id),
+            Event(HubEvent.MESSAGE_EDIT, data),
         )
 
         return Response(data, status=status.HTTP_200_OK)
@@ -880,6 +692,7 @@ from rest_framework.response import Response
 from rest_framework import status
 
 from community.models import HubMessage, CommunityMembership, HubMessageReceipt, HubMessageReaction
+from community.read_state import message_delivered_to, message_read_by, watermark_mode
 
 
 class MessageInfoView(APIView):
@@ -894,19 +707,11 @@ class MessageInfoView(APIView):
         if not CommunityMembership.objects.filter(user=request.user, hub_id=msg.hub_id, is_active=True).exists():
             return Response({"error": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
 
-        # ✅ receipts (delivered/read)
-        receipts = (
-            HubMessageReceipt.objects.select_related("user")
-            .filter(message=msg)
-            .order_by("-read_at", "-delivered_at")
-        )
-
         delivered = []
         read = []
 
-        for r in receipts:
-            u = r.user
-            base = {
+        def user_payload(u):
+            return {
                 "user": {
                     "id": str(u.id),
                     "name": getattr(u, "full_name", None) or u.username,
@@ -914,10 +719,28 @@ class MessageInfoView(APIView):
                 }
             }
 
-            if r.delivered_at:
-                delivered.append({**base, "deliveredAt": r.delivered_at.isoformat()})
-            if r.read_at:
-                read.append({**base, "readAt": r.read_at.isoformat()})
+        if watermark_mode():
+            # ✅ range comparison against per-user hub cursors (no per-message rows)
+            for w in message_delivered_to(msg).select_related("user").order_by("-delivered_at"):
+                delivered.append({**user_payload(w.user), "deliveredAt": w.delivered_at.isoformat() if w.delivered_at else None})
+
+            for w in message_read_by(msg).select_related("user").order_by("-read_at"):
+                read.append({**user_payload(w.user), "readAt": w.read_at.isoformat() if w.read_at else None})
+        else:
+            # ✅ receipts (delivered/read)
+            receipts = (
+                HubMessageReceipt.objects.select_related("user")
+                .filter(message=msg)
+                .order_by("-read_at", "-delivered_at")
+            )
+
+            for r in receipts:
+                base = user_payload(r.user)
+
+                if r.delivered_at:
+                    delivered.append({**base, "deliveredAt": r.delivered_at.isoformat()})
+                if r.read_at:
+                    read.append({**base, "readAt": r.read_at.isoformat()})
 
         # ✅ reactions by who
         reaction_items = (
@@ -970,7 +793,8 @@ from rest_framework import status
 
 from community.models import CommunityHub, CommunityMembership, HubMessage, MessageAttachment
 from community.services import HubMessageSerializer
-from websocket.events.socket import notify_group
+from community.forwarding import forward_hub_messages
+from websocket.events.bus import Event, HubEvent, publish_hub
 
 
 class MessageForwardView(APIView):
@@ -1087,6 +911,7 @@ class MessageForwardView(APIView):
                         duration_ms=getattr(a, "duration_ms", None),
                     )
 
+                set_hub_last_message(new_msg)
                 forwarded_count += 1
 
                 # ✅ serialize response payload
@@ -1097,12 +922,9 @@ class MessageForwardView(APIView):
                 forwarded_messages.append(payload)
 
                 # ✅ websocket broadcast to target hub group
-                notify_group(
-                    group_name=chat_group_name(str(hub.id)),
-                    payload={
-                        "type": "message:new",
-                        "payload": payload,
-                    },
+                publish_hub(
+                    str(hub.id),
+                    Event(HubEvent.MESSAGE_NEW, payload),
                 )
 
         if forwarded_count == 0:
@@ -1222,12 +1044,14 @@ class BulkCommunityMessageForwardView(APIView):
                             duration_ms=getattr(a, "duration_ms", None),
                         )
 
+                    set_hub_last_message(new_msg)
+
                     payload = HubMessageSerializer(new_msg, context={"request": request}).data
                     created_payloads.append(payload)
 
-                    notify_group(
-                        group_name=chat_group_name(str(target_hub_id)),
-                        payload={"type": "message:new", "payload": payload},
+                    publish_hub(
+                        str(target_hub_id),
+                        Event(HubEvent.MESSAGE_NEW, payload),
                     )
 
         if not created_payloads:
@@ -1260,6 +1084,7 @@ from community.models import (
     HubType,
 )
 from community.serializers import HubSerializer
+from community.search import search_hubs
 
 
 class CommunityHubSearchView(APIView):
@@ -1281,96 +1106,17 @@ class CommunityHubSearchView(APIView):
         if not q:
             return Response({"hubs": []}, status=status.HTTP_200_OK)
 
-        # ✅ hub search (simple + fast)
-        hubs_qs = (
-            CommunityHub.objects.filter(is_active=True)
-            .filter(
-                Q(name__icontains=q)
-                | Q(category__icontains=q)
-                | Q(description__icontains=q)
-            )
-            .order_by("-is_verified", "name")[:20]
-        )
-
-        hubs = list(hubs_qs)
+        # ✅ indexed full-text + trigram search, ranked (community.search)
+        hubs = list(search_hubs(user, q, limit=20))
         hub_ids = [h.id for h in hubs]
 
-        # ✅ joined state
-        joined_rows = (
-            CommunityMembership.objects.filter(user=user, is_active=True, hub_id__in=hub_ids)
-            .values("hub_id", "role")
-        )
-        joined_map = {str(r["hub_id"]): r["role"] for r in joined_rows}
-
-        # ✅ members_count
-        members_rows = (
-            CommunityMembership.objects.filter(hub_id__in=hub_ids, is_active=True)
-            .values("hub_id")
-            .annotate(cnt=Count("id"))
-        )
-        members_map = {str(r["hub_id"]): r["cnt"] for r in members_rows}
-
-        # ✅ last message preview
-        last_messages = (
-            HubMessage.objects.filter(hub_id__in=hub_ids)
-            .select_related("sender")
-            .order_by("-created_at")
-        )
-
-        last_msg_map = {}
-        for msg in last_messages:
-            hid = str(msg.hub_id)
-            if hid not in last_msg_map:
-                last_msg_map[hid] = msg
-
-        # ✅ unread_count
-        receipts_rows = (
-            HubReadReceipt.objects.filter(user=user, hub_id__in=hub_ids)
-            .values("hub_id", "last_seen_at")
-        )
-        last_seen_map = {str(r["hub_id"]): r["last_seen_at"] for r in receipts_rows}
-
-        unread_map = {}
-        for hub in hubs:
-            hid = str(hub.id)
-            last_seen = last_seen_map.get(hid)
-
-            if not last_seen:
-                unread_map[hid] = HubMessage.objects.filter(hub=hub).count()
-            else:
-                unread_map[hid] = HubMessage.objects.filter(
-                    hub=hub,
-                    created_at__gt=last_seen,
-                ).count()
+        overlays = hub_listing_overlays(user, hub_ids)
 
         # ✅ response hubs
         payload = []
         for hub in hubs:
             base = HubSerializer(hub).data
-            role = joined_map.get(str(hub.id))
-            last_msg = last_msg_map.get(str(hub.id))
-
-            base.update(
-                {
-                    "user_joined": role is not None,
-                    "user_role": role,
-                    "members_count": members_map.get(str(hub.id), 0),
-                    "online_count": 0,
-                    "unread_count": unread_map.get(str(hub.id), 0),
-
-                    "last_message_text": getattr(last_msg, "text", None) if last_msg else None,
-                    "last_message_type": getattr(last_msg, "message_type", None) if last_msg else None,
-                    "last_message_at": last_msg.created_at.isoformat() if last_msg else None,
-                    "last_message_sender_name": (
-                        getattr(last_msg.sender, "username", None)
-                        if last_msg and last_msg.sender
-                        else None
-                    ),
-
-                    "pinned_message_id": None,
-                }
-            )
-
+            base.update(overlays[str(hub.id)])
             payload.append(base)
 
         return Response({"hubs": payload}, status=status.HTTP_200_OK)
@@ -1937,44 +1683,13 @@ class BulkCommunityMessageForwardView(APIView):
             ).values_list("hub_id", flat=True)
         )
 
-        created_payloads = []
-        for target_hub_id in parsed_target_ids:
-            if target_hub_id not in allowed_target_hubs:
-                continue
-
-            for src in src_list:
-                with transaction.atomic():
-                    new_msg = HubMessage.objects.create(
-                        hub_id=target_hub_id,
-                        sender=user,
-                        text=src.text or "",
-                        message_type=src.message_type,
-                        reply_to=src.reply_to if src.reply_to_id else None,
-                        forwarded_from=src,
-                        is_forwarded=True,
-                    )
-
-                    for a in src.attachments.all():
-                        MessageAttachment.objects.create(
-                            message=new_msg,
-                            attachment_type=a.attachment_type,
-                            url=a.url,
-                            thumbnail_url=getattr(a, "thumbnail_url", "") or "",
-                            mime_type=getattr(a, "mime_type", "") or "",
-                            file_name=getattr(a, "file_name", "") or "",
-                            file_size=getattr(a, "file_size", None),
-                            width=getattr(a, "width", None),
-                            height=getattr(a, "height", None),
-                            duration_ms=getattr(a, "duration_ms", None),
-                        )
-
-                    payload = HubMessageSerializer(new_msg, context={"request": request}).data
-                    created_payloads.append(payload)
-
-                    notify_group(
-                        group_name=chat_group_name(str(target_hub_id)),
-                        payload={"type": "message:new", "payload": payload},
-                    )
+        # ✅ one transaction, one batched event per hub
+        created_payloads = forward_hub_messages(
+            user,
+            src_list,
+            [hub_id for hub_id in parsed_target_ids if hub_id in allowed_target_hubs],
+            request=request,
+        )
 
         if not created_payloads:
             return Response(
@@ -2062,7 +1777,6 @@ class BulkPrivateMessageForwardView(APIView):
             ).values_list("conversation_id", flat=True)
         )
 
-        channel_layer = get_channel_layer()
         created_payloads = []
 
         for target_conversation_id in parsed_target_ids:
@@ -2112,17 +1826,7 @@ class BulkPrivateMessageForwardView(APIView):
                     }
                     created_payloads.append(payload)
 
-                    async_to_sync(channel_layer.group_send)(
-                        f"private_chat_{target_conversation_id}",
-                        {
-                            "type": "broadcast",
-                            "payload": {
-                                "type": "message:new",
-                                "payload": payload,
-                            },
-                            "sender": None,
-                        },
-                    )
+                    publish_private(target_conversation_id, Event(PrivateEvent.MESSAGE_NEW, payload))
 
         if not created_payloads:
             return Response(
@@ -2153,12 +1857,14 @@ from community.models import (
     PrivateConversationMember,
     PrivateMessage,
 )
+from community.messaging import create_private_message
+from community.history import advance_private_read_marker, hydrate_private_messages, private_history
 
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from websocket.events.bus import Event, PrivateEvent, publish_private
 
 class PrivateConversationMessagesView(APIView):
     permission_classes = [IsAuthenticated]
+    PAGE_SIZE = 50
 
     def get(self, request, conversation_id):
         user = request.user
@@ -2172,42 +1878,23 @@ class PrivateConversationMessagesView(APIView):
         if not member:
             return Response({"error": "Not allowed"}, status=status.HTTP_403_FORBIDDEN)
 
-        # ✅ load last messages
-        msgs = (
-            PrivateMessage.objects
-            .filter(conversation_id=conversation_id, deleted_at__isnull=True)
-            .select_related("sender")
-            .order_by("-created_at")[:50]
+        # ✅ keyset paging: cursor/before = older, after = newer, around = jump to message
+        rows, cursors, has_newer = private_history(
+            conversation_id,
+            self.PAGE_SIZE,
+            before=request.query_params.get("before") or request.query_params.get("cursor"),
+            after=request.query_params.get("after"),
+            around=request.query_params.get("around"),
         )
 
-        # reverse oldest -> newest
-        msgs = list(msgs)[::-1]
-
-        results = []
-        for m in msgs:
-            results.append({
-                "id": str(m.id),
-                "clientTempId": getattr(m, "client_temp_id", None),
-                "conversationId": str(conversation_id),
-                "messageType": "TEXT",  # update if you support MEDIA
-                "text": m.text or "",
-                "sender": {"id": str(m.sender_id), "name": m.sender.full_name or m.sender.username},
-                "createdAt": m.created_at.isoformat(),
-                "isMine": str(m.sender_id) == str(user.id),
-                "deletedAt": m.deleted_at.isoformat() if m.deleted_at else None,
-                "editedAt": m.edited_at.isoformat() if getattr(m, "edited_at", None) else None,
-                "attachments": [],  # update if you store attachments
-                "reactions": [],
-                "myReaction": None,
-                "replyTo": None,
-            })
-
-        # ✅ update last_read_at
-        member.last_read_at = timezone.now()
-        member.save(update_fields=["last_read_at"])
+        results = hydrate_private_messages(rows, conversation_id, user.id)
+
+        # ✅ update last_read_at only when the latest messages were shown and are new to the marker
+        if rows and not has_newer:
+            advance_private_read_marker(member, rows[-1]["created_at"], timezone.now())
 
         return Response(
-            {"messages": results, "nextCursor": None},
+            {"messages": results, **cursors},
             status=status.HTTP_200_OK,
         )
 
@@ -2228,16 +1915,24 @@ class PrivateConversationMessagesView(APIView):
             return Response({"error": "Conversation not found"}, status=status.HTTP_404_NOT_FOUND)
 
         text = (request.data.get("text") or "").strip()
-        client_temp_id = request.data.get("clientTempId")
+        client_temp_id = request.data.get("clientTempId") or ""
 
         if not text:
             return Response({"error": "Text required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        msg = PrivateMessage.objects.create(
-            conversation=convo,
-            sender=user,
-            text=text,
-        )
+        # ✅ a retried clientTempId returns the original message
+        try:
+            msg, created = create_private_message(
+                conversation_id=convo.id,
+                sender_id=user.id,
+                text=text,
+                client_temp_id=client_temp_id,
+            )
+        except ClientTempIdConflict:
+            return Response(
+                {"error": "clientTempId already used in another chat"},
+                status=status.HTTP_409_CONFLICT,
+            )
 
         payload = {
             "id": str(msg.id),
@@ -2256,24 +1951,15 @@ class PrivateConversationMessagesView(APIView):
             "replyTo": None,
         }
 
-        # ✅ BROADCAST TO WS ROOM (instant update)
-        channel_layer = get_channel_layer()
-        async_to_sync(channel_layer.group_send)(
-            f"private_chat_{conversation_id}",
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "message:new",
-                    "payload": payload,
-                },
-                "sender": None,
-            },
-        )
+        # ✅ BROADCAST TO WS ROOM (instant update), once per message
+        if created:
+            publish_private(conversation_id, Event(PrivateEvent.MESSAGE_NEW, payload))
 
         return Response(payload, status=status.HTTP_200_OK)
 
 
 from community.models import PrivateMessageAttachment
+from community.forwarding import forward_private_messages
 
 
 class BulkPrivateMessageForwardView(APIView):
@@ -2314,7 +2000,7 @@ class BulkPrivateMessageForwardView(APIView):
             )
 
         src_messages = (
-            PrivateMessage.objects.select_related("sender", "conversation", "reply_to")
+            PrivateMessage.objects.select_related("sender", "conversation", "reply_to__sender")
             .prefetch_related("attachments")
             .filter(id__in=parsed_message_ids, deleted_at__isnull=True)
         )
@@ -2345,67 +2031,12 @@ class BulkPrivateMessageForwardView(APIView):
             ).values_list("conversation_id", flat=True)
         )
 
-        channel_layer = get_channel_layer()
-        created_payloads = []
-
-        for target_conversation_id in parsed_target_ids:
-            if target_conversation_id not in allowed_target_conversations:
-                continue
-
-            for src in src_list:
-                with transaction.atomic():
-                    msg = PrivateMessage.objects.create(
-                        conversation_id=target_conversation_id,
-                        sender=user,
-                        text=src.text or "",
-                        message_type=src.message_type,
-                        reply_to=src.reply_to if src.reply_to_id else None,
-                    )
-
-                    for a in src.attachments.all():
-                        PrivateMessageAttachment.objects.create(
-                            message=msg,
-                            attachment_type=a.attachment_type,
-                            url=a.url,
-                            s3_key=getattr(a, "s3_key", "") or "",
-                            thumbnail_url=getattr(a, "thumbnail_url", "") or "",
-                            mime_type=getattr(a, "mime_type", "") or "",
-                            file_name=getattr(a, "file_name", "") or "",
-                            file_size=getattr(a, "file_size", None),
-                            width=getattr(a, "width", None),
-                            height=getattr(a, "height", None),
-                            duration_ms=getattr(a, "duration_ms", None),
-                        )
-
-                    payload = {
-                        "id": str(msg.id),
-                        "clientTempId": None,
-                        "conversationId": str(target_conversation_id),
-                        "messageType": "TEXT",
-                        "text": msg.text,
-                        "sender": {"id": str(user.id), "name": user.full_name or user.username},
-                        "createdAt": msg.created_at.isoformat(),
-                        "isMine": True,
-                        "deletedAt": None,
-                        "editedAt": None,
-                        "attachments": [],
-                        "reactions": [],
-                        "myReaction": None,
-                        "replyTo": None,
-                    }
-                    created_payloads.append(payload)
-
-                    async_to_sync(channel_layer.group_send)(
-                        f"private_chat_{target_conversation_id}",
-                        {
-                            "type": "broadcast",
-                            "payload": {
-                                "type": "message:new",
-                                "payload": payload,
-                            },
-                            "sender": None,
-                        },
-                    )
+        # ✅ one transaction, one batched event per conversation
+        created_payloads = forward_private_messages(
+            user,
+            src_list,
+            [cid for cid in parsed_target_ids if cid in allowed_target_conversations],
+        )
 
         if not created_payloads:
             return Response(
@@ -7,6 +7,7 @@ django.setup()  # ✅ MUST come before any Django imports that touch models
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
+from websocket.admission import WSAdmissionMiddleware
 from websocket.middleware import WSTokenAuthMiddleware
 from websocket.urls import websocket_urlpatterns
 
@@ -15,8 +16,11 @@ django_asgi_app = get_asgi_application()
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
-        "websocket": WSTokenAuthMiddleware(
-            URLRouter(websocket_urlpatterns)
+        # ✅ admission first: rejected reconnects never reach auth or the DB
+        "websocket": WSAdmissionMiddleware(
+            WSTokenAuthMiddleware(
+                URLRouter(websocket_urlpatterns)
+            )
         ),
     }
 )
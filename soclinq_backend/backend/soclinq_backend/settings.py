@@ -73,16 +73,104 @@ CORS_ALLOW_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
 
 ASGI_APPLICATION = "soclinq_backend.asgi.application"
 
+# ✅ comma-separated redis URLs; channels_redis consistent-hashes channels and
+# groups across them, so sharded hub groups spread over the nodes
+CHANNEL_REDIS_HOSTS = [
+  h.strip()
+  for h in os.getenv("CHANNEL_REDIS_HOSTS", "redis://127.0.0.1:6379/0").split(",")
+  if h.strip()
+]
+
+# ✅ sub-groups per country/state SYSTEM hub chat group
+HUB_GROUP_SHARDS = int(os.getenv("HUB_GROUP_SHARDS", "16"))
+
 CHANNEL_LAYERS = {
   "default": {
     "BACKEND": "channels_redis.core.RedisChannelLayer",
     "CONFIG": {
-      "hosts": [("127.0.0.1", 6379)],
+      "hosts": CHANNEL_REDIS_HOSTS,
+    },
+  },
+  # ✅ typing/presence: fire-and-forget pub/sub, kept off the message layer
+  "ephemeral": {
+    "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+    "CONFIG": {
+      "hosts": [os.getenv("EPHEMERAL_REDIS_URL", "redis://127.0.0.1:6379/3")],
     },
   },
 }
 
 
+# ✅ Caches: "default" stays Django's local-memory cache; the hub tree snapshots get
+# their own alias so they can be shared across processes without moving every
+# cache user onto Redis. Set HUB_TREE_CACHE_URL (e.g. redis://127.0.0.1:6379/2)
+# in production; unset, the tree is cached per process.
+HUB_TREE_CACHE_URL = os.getenv("HUB_TREE_CACHE_URL", "")
+
+# ✅ WebSocket membership checks are only cached when WS_MEMBERSHIP_CACHE_URL points at
+# Redis shared by the HTTP and daphne workers, so a leave/kick invalidates everywhere.
+# Unset, nothing is cached and every connect checks the database.
+WS_MEMBERSHIP_CACHE_URL = os.getenv("WS_MEMBERSHIP_CACHE_URL", "")
+
+# ✅ Shared tier of the geohash → admin unit resolution cache (community.geo_cache);
+# unset, each process only has its local LRU.
+GEO_RESOLVE_CACHE_URL = os.getenv("GEO_RESOLVE_CACHE_URL", "")
+GEO_RESOLVE_CACHE_ALIAS = "geo_resolve"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "hub_tree": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": HUB_TREE_CACHE_URL,
+        }
+        if HUB_TREE_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "hub_tree",
+        }
+    ),
+    "ws_membership": (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": WS_MEMBERSHIP_CACHE_URL,
+        }
+        if WS_MEMBERSHIP_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    ),
+    GEO_RESOLVE_CACHE_ALIAS: (
+        {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": GEO_RESOLVE_CACHE_URL,
+        }
+        if GEO_RESOLVE_CACHE_URL
+        else {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        }
+    ),
+}
+
+# ✅ Presence sorted sets (raw Redis; separate DB from the channel layer)
+PRESENCE_REDIS_URL = os.getenv("PRESENCE_REDIS_URL", "redis://127.0.0.1:6379/1")
+
+# ✅ WebSocket admission control (per process): new connections/s and burst
+WS_ADMISSION_RATE_PER_SECOND = int(os.getenv("WS_ADMISSION_RATE_PER_SECOND", "200"))
+WS_ADMISSION_BURST = int(os.getenv("WS_ADMISSION_BURST", "400"))
+
+# ✅ "receipts" keeps per-message HubMessageReceipt rows; "watermark" stores only per-user hub cursors
+HUB_READ_MODEL = os.getenv("HUB_READ_MODEL", "receipts")
+
+
+# ✅ Offline location enrichment (no network calls on the request path)
+GEOIP_BACKEND = os.getenv("GEOIP_BACKEND", "local")
+GEOIP_DATABASE_PATH = os.getenv("GEOIP_DATABASE_PATH", str(BASE_DIR / "data" / "geoip" / "ipv4.bin"))
+LOCATION_ENRICHMENT_QUEUE_SIZE = int(os.getenv("LOCATION_ENRICHMENT_QUEUE_SIZE", "10000"))
+
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -102,6 +190,7 @@ INSTALLED_APPS = [
     "audit",
     "channels",
     "django.contrib.gis",
+    "django.contrib.postgres",
     "rest_framework_simplejwt.token_blacklist",
     "corsheaders",
     "websocket",
@@ -118,8 +207,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     "accounts.auth_utils.EnsureCSRFCookieMiddleware",
     'django.middleware.csrf.CsrfViewMiddleware',
-    "accounts.middleware.user_location_middleware.UserLocationMiddleware",
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    "accounts.middleware.user_location_middleware.UserLocationMiddleware",
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "audit.middleware.AuditMiddleware",
@@ -28,6 +28,7 @@ path("api/v1/", include([
     path("dashboards/", include("dashboards.urls")),
     path("live/", include("live.urls")),
     path("communities/", include("community.urls")),
+    path("ws/", include("websocket.urls")),
 
 
 ]))
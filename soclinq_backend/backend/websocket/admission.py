@@ -0,0 +1,144 @@
+# websocket/admission.py
+"""
+Connection admission control for the WebSocket stack.
+
+When a channel-layer or daphne restart drops every socket at once, all
+clients reconnect together. WSAdmissionMiddleware sits outermost in the
+websocket chain and admits new connections through a per-process token
+bucket; connections over budget are accepted just long enough to be told
+when to retry, then closed with 1013 (Try Again Later) and a jittered
+retry-after, so the herd spreads itself out instead of retrying in lockstep.
+
+Membership checks done by chat consumers on connect are cached briefly
+(cached_hub_membership / cached_conversation_membership) so admitted
+reconnects mostly skip the database. They live on the "ws_membership" cache
+alias, which must be shared with the HTTP workers that invalidate them
+(community.signals); without a shared backend it caches nothing.
+"""
+import json
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.connection import ConnectionProxy
+
+
+TRY_AGAIN_LATER = 1013
+
+DEFAULT_RATE_PER_SECOND = 200
+DEFAULT_BURST = 400
+DEFAULT_RETRY_BASE_MS = 1000
+DEFAULT_RETRY_MAX_MS = 30_000
+
+MEMBERSHIP_TTL_SECONDS = 60
+NON_MEMBERSHIP_TTL_SECONDS = 10
+
+membership_cache = ConnectionProxy(caches, "ws_membership")
+
+
+class TokenBucket:
+    """
+    Event-loop local token bucket (no locking: one bucket per process/loop).
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def deficit_seconds(self) -> float:
+        """
+        Rough time until the bucket has refilled back to half full.
+        """
+        return max(0.0, (self.burst / 2 - self.tokens) / self.rate)
+
+
+class WSAdmissionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.bucket = TokenBucket(
+            rate=getattr(settings, "WS_ADMISSION_RATE_PER_SECOND", DEFAULT_RATE_PER_SECOND),
+            burst=getattr(settings, "WS_ADMISSION_BURST", DEFAULT_BURST),
+        )
+        self.retry_base_ms = getattr(settings, "WS_ADMISSION_RETRY_BASE_MS", DEFAULT_RETRY_BASE_MS)
+        self.retry_max_ms = getattr(settings, "WS_ADMISSION_RETRY_MAX_MS", DEFAULT_RETRY_MAX_MS)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "websocket" or self.bucket.try_take():
+            return await self.app(scope, receive, send)
+
+        await self._reject(receive, send)
+
+    def retry_after_ms(self) -> int:
+        # ✅ full jitter over a window that grows with how far behind the bucket is
+        window = min(
+            self.retry_max_ms,
+            self.retry_base_ms + int(self.bucket.deficit_seconds() * 1000),
+        )
+        return random.randint(self.retry_base_ms, max(self.retry_base_ms, window))
+
+    async def _reject(self, receive, send):
+        message = await receive()
+        if message["type"] != "websocket.connect":
+            return
+
+        retry_after = self.retry_after_ms()
+
+        # browsers can't see HTTP status on a refused handshake, so accept,
+        # say when to come back, and close with a retryable code
+        await send({"type": "websocket.accept"})
+        await send(
+            {
+                "type": "websocket.send",
+                "text": json.dumps(
+                    {"type": "ws:retry", "payload": {"retryAfterMs": retry_after}}
+                ),
+            }
+        )
+        await send({"type": "websocket.close", "code": TRY_AGAIN_LATER})
+
+
+# =========================
+# ✅ MEMBERSHIP FAST PATH
+# =========================
+
+def hub_membership_key(hub_id, user_id) -> str:
+    return f"ws_member:hub:{hub_id}:{user_id}"
+
+
+def conversation_membership_key(convo_id, user_id) -> str:
+    return f"ws_member:convo:{convo_id}:{user_id}"
+
+
+def _cached_check(key, check) -> bool:
+    allowed = membership_cache.get(key)
+    if allowed is None:
+        allowed = bool(check())
+        membership_cache.set(
+            key,
+            allowed,
+            timeout=MEMBERSHIP_TTL_SECONDS if allowed else NON_MEMBERSHIP_TTL_SECONDS,
+        )
+    return allowed
+
+
+def cached_hub_membership(hub_id, user_id, check) -> bool:
+    return _cached_check(hub_membership_key(hub_id, user_id), check)
+
+
+def cached_conversation_membership(convo_id, user_id, check) -> bool:
+    return _cached_check(conversation_membership_key(convo_id, user_id), check)
@@ -1,35 +1,212 @@
+# websocket/auth.py
+"""
+Single async authentication path for every WebSocket route.
+
+Accepts either the short-lived "ws" scoped token (issue_ws_token) or a
+SimpleJWT access token in ?token=. Token validation is pure CPU; the only
+DB access is loading the principal, which is cached per token id (jti) for
+PRINCIPAL_CACHE_TTL_SECONDS and coalesced per user while in flight, so a
+reconnect storm neither hammers the users table nor blocks the loop.
+"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
 from urllib.parse import parse_qs
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework.exceptions import AuthenticationFailed
+from uuid import UUID
+
+import jwt
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from jwt import ExpiredSignatureError, InvalidTokenError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
 
-jwt_authenticator = JWTAuthentication()
+PRINCIPAL_CACHE_TTL_SECONDS = 60
+PRINCIPAL_CACHE_MAX_SIZE = 50_000
 
+RESPONDER_GROUP = "RESPONDER"
 
-def authenticate_ws(scope):
+
+@dataclass(frozen=True)
+class WSPrincipal:
     """
-    Authenticate a WebSocket connection using JWT.
-    Token is passed as: ws://.../?token=JWT
+    The subset of User that WebSocket consumers need.
+    Quacks like an authenticated user for scope["user"].
     """
+    id: UUID
+    username: str
+    full_name: str
+    role: str
+    is_responder: bool
+    is_staff: bool
+
+    is_authenticated = True
+    is_anonymous = False
+    is_active = True
+
+    @property
+    def pk(self):
+        return self.id
+
+
+# =========================
+# ✅ TOKEN DECODING (no DB)
+# =========================
 
+def get_query_token(scope):
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return query.get("token", [None])[0]
+
+
+def _parse_user_id(raw):
     try:
-        query_string = scope.get("query_string", b"").decode()
-        query_params = parse_qs(query_string)
+        return UUID(str(raw))
+    except (TypeError, ValueError):
+        return raw  # fallback for non-UUID PKs
 
-        token = query_params.get("token", [None])[0]
-        if not token:
-            return None
 
-        validated_token = jwt_authenticator.get_validated_token(token)
-        user = jwt_authenticator.get_user(validated_token)
+def decode_ws_token(token: str):
+    """
+    Returns (user_id, token_id, expires_at) or None.
+    """
+    try:
+        payload = jwt.decode(
+            token,
+            settings.SECRET_KEY,
+            algorithms=["HS256"],
+            options={"require": ["exp", "sub"]},
+        )
+    except ExpiredSignatureError:
+        return None
+    except InvalidTokenError:
+        payload = None
 
-        if not user or not user.is_active:
+    if payload and payload.get("scope") == "ws":
+        user_id = payload.get("sub")
+    else:
+        # ✅ SimpleJWT access token (signature, expiry and token type checked)
+        try:
+            payload = AccessToken(token).payload
+        except TokenError:
             return None
+        user_id = payload.get(api_settings.USER_ID_CLAIM)
+
+    if not user_id:
+        return None
+
+    # tokens minted before jti was added fall back to a digest of the token
+    token_id = payload.get("jti") or hashlib.sha256(token.encode()).hexdigest()
+
+    return _parse_user_id(user_id), token_id, float(payload["exp"])
+
 
-        return user
+# =========================
+# ✅ PRINCIPAL CACHE
+# =========================
 
-    except AuthenticationFailed:
+_principals = {}   # token_id -> (expires_at, WSPrincipal)
+_inflight = {}     # user_id -> Future[WSPrincipal | None]
+
+
+def _cache_get(token_id):
+    hit = _principals.get(token_id)
+    if hit is None:
         return None
-    except Exception:
-        # Never crash a WS handshake
+
+    expires_at, principal = hit
+    if expires_at < time.time():
+        _principals.pop(token_id, None)
         return None
+
+    return principal
+
+
+def _cache_put(token_id, principal, token_exp):
+    if len(_principals) >= PRINCIPAL_CACHE_MAX_SIZE:
+        now = time.time()
+        for key in [k for k, (exp, _) in _principals.items() if exp < now]:
+            del _principals[key]
+        if len(_principals) >= PRINCIPAL_CACHE_MAX_SIZE:
+            _principals.pop(next(iter(_principals)))
+
+    _principals[token_id] = (min(time.time() + PRINCIPAL_CACHE_TTL_SECONDS, token_exp), principal)
+
+
+async def _load_principal(user_id):
+    User = get_user_model()
+
+    row = await (
+        User.objects
+        .filter(id=user_id, is_active=True)
+        .annotate(
+            in_responder_group=Exists(
+                User.groups.through.objects.filter(
+                    user_id=OuterRef("pk"),
+                    group__name=RESPONDER_GROUP,
+                )
+            )
+        )
+        .values("id", "username", "full_name", "role", "is_staff", "in_responder_group")
+        .afirst()
+    )
+
+    if not row:
+        return None
+
+    return WSPrincipal(
+        id=row["id"],
+        username=row["username"],
+        full_name=row["full_name"],
+        role=row["role"],
+        is_responder=row["in_responder_group"],
+        is_staff=row["is_staff"],
+    )
+
+
+async def _principal_for(user_id):
+    # ✅ concurrent connects for the same user share one query
+    future = _inflight.get(user_id)
+    if future is not None:
+        return await asyncio.shield(future)
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[user_id] = future
+    try:
+        principal = await _load_principal(user_id)
+        future.set_result(principal)
+        return principal
+    except BaseException:
+        future.set_result(None)  # waiters fail closed
+        raise
+    finally:
+        _inflight.pop(user_id, None)
+
+
+async def authenticate_ws_token(token: str):
+    """
+    Validated WSPrincipal for `token`, or None.
+    """
+    if not token:
+        return None
+
+    decoded = decode_ws_token(token)
+    if not decoded:
+        return None
+
+    user_id, token_id, token_exp = decoded
+
+    principal = _cache_get(token_id)
+    if principal is not None:
+        return principal
+
+    principal = await _principal_for(user_id)
+    if principal is None:
+        return None
+
+    _cache_put(token_id, principal, token_exp)
+    return principal
+
@@ -1,4 +1,3 @@
-from websocket.auth import authenticate_ws
 from .base import BaseConsumer
 
 
@@ -11,9 +10,9 @@ class AdminConsumer(BaseConsumer):
     GROUP_NAME = "admins"
 
     async def connect(self):
-        user = authenticate_ws(self.scope)
+        user = self.scope.get("user")
 
-        if not user:
+        if not user or not user.is_authenticated:
             await self.close(code=4001)
             return
 
@@ -21,8 +20,6 @@ class AdminConsumer(BaseConsumer):
             await self.close(code=4003)
             return
 
-        self.scope["user"] = user
-
         await self.channel_layer.group_add(
             self.GROUP_NAME,
             self.channel_name
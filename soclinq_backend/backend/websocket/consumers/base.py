@@ -1,5 +1,8 @@
+import orjson
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
+from websocket.events.bus import dumps, record_delivered
+
 
 class BaseConsumer(AsyncJsonWebsocketConsumer):
     """
@@ -8,10 +11,31 @@ class BaseConsumer(AsyncJsonWebsocketConsumer):
     - Only responsible for sending events
     """
 
+    @classmethod
+    async def decode_json(cls, text_data):
+        return orjson.loads(text_data)
+
+    @classmethod
+    async def encode_json(cls, content):
+        return dumps(content)
+
     async def broadcast(self, event):
         """
-        Receive events from channel layer and send to client
+        Receive events from channel layer and send to client.
+        Bus events arrive already encoded ("text") and are forwarded as-is.
         """
+        sender = event.get("sender")
+
+        # ✅ don’t echo back to the publishing socket
+        if sender and sender == self.channel_name:
+            return
+
+        text = event.get("text")
+        if text is not None:
+            await self.send(text_data=text)
+            record_delivered(event.get("event"))
+            return
+
         payload = event.get("payload")
         if payload:
             await self.send_json(payload)
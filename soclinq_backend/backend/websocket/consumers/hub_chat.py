@@ -1,29 +1,36 @@
+import time
 import uuid
 from django.utils import timezone
 from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from django.core.cache import cache
 from .base import BaseConsumer
+from websocket.admission import cached_hub_membership
+from websocket.ephemeral import EphemeralChannel
+from websocket.events.broadcaster import hub_group_shards, shard_group
+from websocket.events.bus import Event, HubEvent, apublish_hub, channel_message, hub_group
+from websocket.presence import remove_hub_presence, touch_hub_presence
+from websocket.presence_batch import presence_aggregator
+from websocket.receipts import HubReceiptAggregator
+from community.idempotency import ClientTempIdConflict
+from community.messaging import create_hub_message
 from community.models import (
     CommunityHub,
     CommunityMembership,
     HubMessage,
-    HubMessageReceipt,
-    HubReadReceipt,
+    MessageType,
 )
+from community.services import HubMessageSerializer
 
 PRESENCE_TTL_SECONDS = 45
-TYPING_RATE_LIMIT_SECONDS = 1  # typing event max 1 per second (per user per hub)
+TYPING_RATE_LIMIT_SECONDS = 1  # typing event max 1 per second (per connection)
+CLIENT_TEMP_ID_MAX_LENGTH = HubMessage._meta.get_field("client_temp_id").max_length
 
 
 def presence_key(hub_id: str, user_id: str) -> str:
     return f"presence:hub:{hub_id}:user:{user_id}"
 
 
-def typing_rl_key(hub_id: str, user_id: str) -> str:
-    return f"typing_rl:hub:{hub_id}:user:{user_id}"
-
-
 class HubChatConsumer(BaseConsumer):
     async def connect(self):
         user = self.scope.get("user")
@@ -44,7 +51,17 @@ class HubChatConsumer(BaseConsumer):
             return
 
         self.user = user
-        self.room = f"hub_chat_{self.hub_id}"
+
+        # ✅ country/state hubs are split into sub-groups; we join only ours
+        self.room_shards = await sync_to_async(hub_group_shards)(self.hub_id)
+        self.room = shard_group(hub_group(self.hub_id), self.channel_name, self.room_shards)
+
+        # ✅ delivered/seen are buffered and flushed in batches
+        self.receipts = HubReceiptAggregator(
+            hub_id=self.hub_id,
+            user_id=self.user.id,
+            broadcast=self._broadcast_receipts,
+        )
 
         await self.channel_layer.group_add(self.room, self.channel_name)
         await self.accept()
@@ -52,48 +69,29 @@ class HubChatConsumer(BaseConsumer):
         # ✅ mark online in redis
         await self._set_presence_online()
 
-        # ✅ broadcast presence to others
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "presence:update",
-                    "payload": {
-                        "userId": str(self.user.id),
-                        "online": True,
-                        "lastSeen": None,
-                    },
-                },
-                "sender": self.channel_name,
-            },
-        )
+        # ✅ typing/presence travel on the ephemeral layer, not the message layer
+        self._typing_sent_at = 0.0
+        self.ephemeral = EphemeralChannel(self.hub_id, on_event=self._on_ephemeral)
+        await self.ephemeral.join()
+
+        # ✅ presence to others goes out batched per hub (presence:batch)
+        presence_aggregator.joined(self.hub_id, self.ephemeral.group, self.ephemeral.layer, self.user.id)
 
         await self.send_json({"type": "ws:ready", "payload": {"ok": True}})
 
     async def disconnect(self, close_code):
+        if hasattr(self, "receipts"):
+            await self.receipts.close()
+
         if hasattr(self, "room"):
             await self.channel_layer.group_discard(self.room, self.channel_name)
 
         if hasattr(self, "user") and self.user and not self.user.is_anonymous:
             await self._set_presence_offline()
 
-            if hasattr(self, "room"):
-                await self.channel_layer.group_send(
-                    self.room,
-                    {
-                        "type": "broadcast",
-                        "payload": {
-                            "type": "presence:update",
-                            "payload": {
-                                "userId": str(self.user.id),
-                                "online": False,
-                                "lastSeen": timezone.now().isoformat(),
-                            },
-                        },
-                        "sender": self.channel_name,
-                    },
-                )
+            if hasattr(self, "ephemeral"):
+                presence_aggregator.left(self.hub_id, self.ephemeral.group, self.ephemeral.layer, self.user.id)
+                await self.ephemeral.leave()
 
     # =========================
     # ✅ RECEIVE EVENTS
@@ -111,6 +109,10 @@ class HubChatConsumer(BaseConsumer):
             await self.handle_ping()
             return
 
+        if event_type == "message:send":
+            await self.handle_send_message(payload)
+            return
+
         if event_type == "typing:update":
             await self.handle_typing(payload)
             return
@@ -137,6 +139,70 @@ class HubChatConsumer(BaseConsumer):
             {"type": "pong", "payload": {"serverTime": timezone.now().isoformat()}}
         )
 
+    # =========================
+    # ✅ MESSAGE SEND
+    # =========================
+
+    async def handle_send_message(self, payload: dict):
+        client_temp_id = (payload.get("clientTempId") or "").strip()
+        text = (payload.get("text") or "").strip()
+        attachments = payload.get("attachments") or []
+
+        message_type = payload.get("messageType") or MessageType.TEXT
+
+        if not client_temp_id:
+            await self.send_error("Missing clientTempId")
+            return
+
+        if len(client_temp_id) > CLIENT_TEMP_ID_MAX_LENGTH:
+            await self.send_error("clientTempId too long")
+            return
+
+        if message_type not in MessageType.values:
+            await self.send_error("Invalid messageType")
+            return
+
+        if not isinstance(attachments, list):
+            await self.send_error("Invalid attachments")
+            return
+
+        if not text and not attachments:
+            await self.send_error("Message must contain text or attachments")
+            return
+
+        # ✅ the socket outlives the membership: a user who left can't keep sending
+        if not await self._can_join_hub(user_id=self.user.id, hub_id=self.hub_id):
+            await self.send_error("Not a member of this hub")
+            return
+
+        try:
+            data, created = await self._create_message(
+                text=text,
+                message_type=message_type,
+                client_temp_id=client_temp_id,
+                reply_to_id=payload.get("replyToId"),
+                attachment_ids=[a.get("id") for a in attachments if isinstance(a, dict)],
+            )
+        except ClientTempIdConflict:
+            await self.send_error("clientTempId already used in another chat")
+            return
+
+        # ✅ ACK → sender only (also for a retried clientTempId)
+        await self.send_json({
+            "type": "message:ack",
+            "payload": {**data, "isMine": True},
+        })
+
+        # ✅ Broadcast → others, only for the first delivery of a clientTempId
+        if created:
+            await apublish_hub(
+                self.hub_id,
+                Event(HubEvent.MESSAGE_NEW, data),
+                sender=self.channel_name,
+                channel_layer=self.channel_layer,
+                shards=self.room_shards,
+            )
+
     # =========================
     # ✅ TYPING
     # =========================
@@ -145,31 +211,31 @@ class HubChatConsumer(BaseConsumer):
         is_typing = bool(payload.get("isTyping"))
         name = payload.get("name") or getattr(self.user, "full_name", None) or self.user.username
 
-        # ✅ rate limit typing spam
-        allowed = await self._typing_allowed()
-        if not allowed:
+        # ✅ rate limit typing spam (per connection, in-process)
+        now = time.monotonic()
+        if now - self._typing_sent_at < TYPING_RATE_LIMIT_SECONDS:
             return
+        self._typing_sent_at = now
 
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "typing:update",
-                    "payload": {
+        await self.ephemeral.mark_active()
+        await self.ephemeral.publish(
+            channel_message(
+                Event(
+                    HubEvent.TYPING_UPDATE,
+                    {
                         "user": {
                             "id": str(self.user.id),
                             "name": name,
                         },
                         "isTyping": is_typing,
                     },
-                },
-                "sender": self.channel_name,
-            },
+                ),
+                sender=self.ephemeral.channel_name,
+            )
         )
 
     # =========================
-    # ✅ DELIVERED (per message)
+    # ✅ DELIVERED / SEEN (buffered)
     # =========================
 
     async def handle_delivered(self, payload: dict):
@@ -177,70 +243,39 @@ class HubChatConsumer(BaseConsumer):
         if not message_id:
             return
 
-        ok = await self._mark_delivered(message_id=message_id, user_id=self.user.id)
-        if not ok:
-            return
-
-        # broadcast to others (sender can update ticks)
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "message:delivered:update",
-                    "payload": {
-                        "messageId": str(message_id),
-                        "userId": str(self.user.id),
-                        "deliveredAt": timezone.now().isoformat(),
-                    },
-                },
-                "sender": self.channel_name,
-            },
-        )
-
-    # =========================
-    # ✅ SEEN (read receipt)
-    # =========================
+        await self.receipts.add_delivered(message_id)
 
     async def handle_seen(self, payload: dict):
         message_id = payload.get("messageId")
         if not message_id:
             return
 
-        ok = await self._mark_seen(message_id=message_id, user_id=self.user.id, hub_id=self.hub_id)
-        if not ok:
-            return
-
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "message:seen:update",
-                    "payload": {
-                        "messageId": str(message_id),
-                        "userId": str(self.user.id),
-                        "readAt": timezone.now().isoformat(),
-                    },
-                },
-                "sender": self.channel_name,
-            },
+        await self.receipts.add_seen(message_id)
+        await self.ephemeral.mark_active()
+
+    async def _broadcast_receipts(self, event: Event):
+        # one batched update per flush (sender can update ticks)
+        await apublish_hub(
+            self.hub_id,
+            event,
+            sender=self.channel_name,
+            channel_layer=self.channel_layer,
+            shards=self.room_shards,
         )
 
     # =========================
-    # ✅ GROUP BROADCAST HANDLER
+    # ✅ EPHEMERAL BROADCAST HANDLER
     # =========================
 
-    async def broadcast(self, event):
-        payload = event.get("payload")
-        sender = event.get("sender")
+    async def _on_ephemeral(self, message):
+        if message.get("type") != "broadcast":
+            return
 
-        # ✅ don’t echo back to sender for presence/typing etc
-        if sender and sender == self.channel_name:
+        # ✅ own typing events are filtered by the ephemeral channel name
+        if message.get("sender") == self.ephemeral.channel_name:
             return
 
-        if payload:
-            await self.send_json(payload)
+        await self.broadcast(message)
 
     # =========================
     # ✅ REDIS PRESENCE HELPERS
@@ -253,9 +288,14 @@ class HubChatConsumer(BaseConsumer):
             {"online": True, "lastSeen": None, "updatedAt": timezone.now().isoformat()},
             timeout=PRESENCE_TTL_SECONDS,
         )
+        touch_hub_presence(str(self.hub_id), str(self.user.id), self.channel_name)
 
     @sync_to_async
     def _set_presence_offline(self):
+        # ✅ another tab/device still connected: stay online
+        if not remove_hub_presence(str(self.hub_id), str(self.user.id), self.channel_name):
+            return
+
         cache.set(
             presence_key(str(self.hub_id), str(self.user.id)),
             {
@@ -266,72 +306,32 @@ class HubChatConsumer(BaseConsumer):
             timeout=PRESENCE_TTL_SECONDS,
         )
 
-    @sync_to_async
-    def _typing_allowed(self) -> bool:
-        key = typing_rl_key(str(self.hub_id), str(self.user.id))
-        if cache.get(key):
-            return False
-        cache.set(key, True, timeout=TYPING_RATE_LIMIT_SECONDS)
-        return True
-
     # =========================
     # ✅ DB HELPERS
     # =========================
 
-    @staticmethod
     @sync_to_async
-    def _can_join_hub(user_id, hub_id) -> bool:
-        return (
-            CommunityHub.objects.filter(id=hub_id, is_active=True).exists()
-            and CommunityMembership.objects.filter(user_id=user_id, hub_id=hub_id, is_active=True).exists()
+    def _create_message(self, text, message_type, client_temp_id, reply_to_id, attachment_ids):
+        msg, created = create_hub_message(
+            hub_id=self.hub_id,
+            sender_id=self.user.id,
+            text=text,
+            message_type=message_type,
+            client_temp_id=client_temp_id,
+            reply_to_id=reply_to_id,
+            attachment_ids=attachment_ids,
         )
+        return dict(HubMessageSerializer(msg).data), created
 
     @staticmethod
     @sync_to_async
-    def _mark_delivered(message_id: str, user_id: int) -> bool:
-        msg = HubMessage.objects.filter(id=message_id).first()
-        if not msg:
-            return False
-
-        receipt, _ = HubMessageReceipt.objects.get_or_create(message_id=msg.id, user_id=user_id)
-
-        if receipt.delivered_at is None:
-            receipt.delivered_at = timezone.now()
-            receipt.save(update_fields=["delivered_at"])
-
-        return True
-
-    @staticmethod
-    @sync_to_async
-    def _mark_seen(message_id: str, user_id: int, hub_id: str) -> bool:
-        msg = HubMessage.objects.filter(id=message_id, hub_id=hub_id).first()
-        if not msg:
-            return False
-
-        # ✅ per message receipt
-        receipt, _ = HubMessageReceipt.objects.get_or_create(message_id=msg.id, user_id=user_id)
-
-        now = timezone.now()
-        changed = False
-
-        if receipt.delivered_at is None:
-            receipt.delivered_at = now
-            changed = True
-
-        if receipt.read_at is None:
-            receipt.read_at = now
-            changed = True
-
-        if changed:
-            receipt.save(update_fields=["delivered_at", "read_at"])
-
-        # ✅ per hub last read
-        hub_read, _ = HubReadReceipt.objects.get_or_create(user_id=user_id, hub_id=hub_id)
-        hub_read.last_seen_message = msg
-        hub_read.last_seen_at = now
-        hub_read.save(update_fields=["last_seen_message", "last_seen_at"])
-
-        # ✅ optional seen_by update
-        msg.seen_by.add(user_id)
-
-        return True
+    def _can_join_hub(user_id, hub_id) -> bool:
+        # ✅ cached: reconnect storms mostly skip the DB
+        return cached_hub_membership(
+            hub_id,
+            user_id,
+            lambda: (
+                CommunityHub.objects.filter(id=hub_id, is_active=True).exists()
+                and CommunityMembership.objects.filter(user_id=user_id, hub_id=hub_id, is_active=True).exists()
+            ),
+        )
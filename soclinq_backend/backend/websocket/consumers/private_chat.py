@@ -1,7 +1,11 @@
 from asgiref.sync import sync_to_async
 from django.utils import timezone
 
+from websocket.admission import cached_conversation_membership
 from websocket.consumers.base import BaseConsumer
+from websocket.events.bus import Event, PrivateEvent, apublish_private, private_group
+from community.idempotency import ClientTempIdConflict
+from community.messaging import create_private_message
 from community.models import (
     PrivateConversation,
     PrivateConversationMember,
@@ -39,7 +43,7 @@ class PrivateChatConsumer(BaseConsumer):
             await self.close(code=4003)
             return
 
-        self.room = f"private_chat_{self.conversation_id}"
+        self.room = private_group(self.conversation_id)
 
         await self.channel_layer.group_add(self.room, self.channel_name)
         await self.accept()
@@ -98,12 +102,16 @@ class PrivateChatConsumer(BaseConsumer):
             await self.send_error("Message cannot be empty")
             return
 
-        msg = await self._create_message(
-            convo_id=self.conversation_id,
-            sender_id=self.user.id,
-            text=text,
-            client_temp_id=client_temp_id,
-        )
+        try:
+            msg = await self._create_message(
+                convo_id=self.conversation_id,
+                sender_id=self.user.id,
+                text=text,
+                client_temp_id=client_temp_id,
+            )
+        except ClientTempIdConflict:
+            await self.send_error("clientTempId already used in another chat")
+            return
 
         message_payload = {
             "id": str(msg["id"]),
@@ -129,17 +137,15 @@ class PrivateChatConsumer(BaseConsumer):
             "payload": message_payload,
         })
 
+        if not msg["created"]:
+            return  # retry: the original was already broadcast
+
         # Broadcast → others
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "message:new",
-                    "payload": message_payload,
-                },
-                "sender": self.channel_name,
-            },
+        await apublish_private(
+            self.conversation_id,
+            Event(PrivateEvent.MESSAGE_NEW, message_payload),
+            sender=self.channel_name,
+            channel_layer=self.channel_layer,
         )
 
     # =========================
@@ -161,16 +167,10 @@ class PrivateChatConsumer(BaseConsumer):
         if not changed:
             return
 
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "message:delivered",
-                    "payload": {"messageId": str(message_id)},
-                },
-                "sender": None,
-            },
+        await apublish_private(
+            self.conversation_id,
+            Event(PrivateEvent.DELIVERED, {"messageId": str(message_id)}),
+            channel_layer=self.channel_layer,
         )
 
     # =========================
@@ -193,35 +193,18 @@ class PrivateChatConsumer(BaseConsumer):
         if not changed:
             return
 
-        await self.channel_layer.group_send(
-            self.room,
-            {
-                "type": "broadcast",
-                "payload": {
-                    "type": "message:seen",
-                    "payload": {
-                        "messageId": str(message_id),
-                        "userId": str(self.user.id),
-                    },
+        await apublish_private(
+            self.conversation_id,
+            Event(
+                PrivateEvent.SEEN,
+                {
+                    "messageId": str(message_id),
+                    "userId": str(self.user.id),
                 },
-                "sender": None,
-            },
+            ),
+            channel_layer=self.channel_layer,
         )
 
-    # =========================
-    # BROADCAST HANDLER
-    # =========================
-
-    async def broadcast(self, event):
-        payload = event.get("payload")
-        sender = event.get("sender")
-
-        if sender and sender == self.channel_name:
-            return
-
-        if payload:
-            await self.send_json(payload)
-
     # =========================
     # DB HELPERS
     # =========================
@@ -229,21 +212,25 @@ class PrivateChatConsumer(BaseConsumer):
     @staticmethod
     @sync_to_async
     def _can_join_conversation(user_id, convo_id) -> bool:
-        return (
-            PrivateConversation.objects.filter(id=convo_id, is_active=True).exists()
-            and PrivateConversationMember.objects.filter(
-                conversation_id=convo_id,
-                user_id=user_id,
-            ).exists()
+        # ✅ cached: reconnect storms mostly skip the DB
+        return cached_conversation_membership(
+            convo_id,
+            user_id,
+            lambda: (
+                PrivateConversation.objects.filter(id=convo_id, is_active=True).exists()
+                and PrivateConversationMember.objects.filter(
+                    conversation_id=convo_id,
+                    user_id=user_id,
+                ).exists()
+            ),
         )
 
     @staticmethod
     @sync_to_async
     def _create_message(convo_id, sender_id, text, client_temp_id):
-        convo = PrivateConversation.objects.get(id=convo_id)
-
-        msg = PrivateMessage.objects.create(
-            conversation=convo,
+        # ✅ a retried clientTempId returns the original message
+        msg, created = create_private_message(
+            conversation_id=convo_id,
             sender_id=sender_id,
             text=text,
             client_temp_id=client_temp_id,
@@ -256,6 +243,7 @@ class PrivateChatConsumer(BaseConsumer):
             "text": msg.text,
             "created_at": msg.created_at.isoformat(),
             "sender_name": sender.full_name or sender.username,
+            "created": created,
         }
 
     @staticmethod
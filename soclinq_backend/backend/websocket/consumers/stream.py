@@ -1,4 +1,3 @@
-from websocket.auth import authenticate_ws
 from .base import BaseConsumer
 
 
@@ -9,9 +8,9 @@ class StreamOwnerConsumer(BaseConsumer):
     """
 
     async def connect(self):
-        user = authenticate_ws(self.scope)
+        user = self.scope.get("user")
 
-        if not user:
+        if not user or not user.is_authenticated:
             await self.close(code=4001)
             return
 
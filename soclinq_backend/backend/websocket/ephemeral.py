@@ -0,0 +1,119 @@
+# websocket/ephemeral.py
+"""
+Ephemeral event path (typing, presence) for hub chat.
+
+Chatter that is worthless a second later must not compete with message
+delivery for channel-layer capacity, so it travels over a separate
+channel layer alias (EPHEMERAL_LAYER_ALIAS, a Redis pub/sub layer: no
+queues, nothing persisted, drop on the floor if nobody listens).
+
+Each HubChatConsumer opens an EphemeralChannel next to its regular one.
+For hubs with more than FULL_FANOUT_MAX_ONLINE members online, events go
+only to the FANOUT_CAP most recently active viewers instead of the whole
+hub group.
+"""
+import asyncio
+import logging
+import time
+
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from websocket.presence import (
+    hub_online_counts,
+    recent_hub_viewers,
+    remove_hub_viewer,
+    touch_hub_viewer,
+)
+
+
+logger = logging.getLogger(__name__)
+
+EPHEMERAL_LAYER_ALIAS = getattr(settings, "EPHEMERAL_CHANNEL_LAYER", "ephemeral")
+
+FULL_FANOUT_MAX_ONLINE = 500
+FANOUT_CAP = 200
+
+HUB_SIZE_TTL_SECONDS = 10
+ACTIVITY_TOUCH_SECONDS = 5
+
+# hub_id -> (checked_at monotonic, is_large); process-local, shared by all sockets
+_hub_size = {}
+
+
+def ephemeral_group(hub_id) -> str:
+    return f"hub_eph_{hub_id}"
+
+
+async def _is_large_hub(hub_id) -> bool:
+    hit = _hub_size.get(hub_id)
+    if hit and time.monotonic() - hit[0] < HUB_SIZE_TTL_SECONDS:
+        return hit[1]
+
+    counts = await sync_to_async(hub_online_counts)([hub_id])
+    is_large = counts.get(str(hub_id), 0) > FULL_FANOUT_MAX_ONLINE
+    _hub_size[hub_id] = (time.monotonic(), is_large)
+    return is_large
+
+
+class EphemeralChannel:
+    def __init__(self, hub_id, on_event):
+        """
+        on_event: async callable(message: dict) for every event received.
+        """
+        self.hub_id = str(hub_id)
+        self.group = ephemeral_group(self.hub_id)
+        self.on_event = on_event
+
+        self.layer = get_channel_layer(EPHEMERAL_LAYER_ALIAS)
+        self.channel_name = None
+
+        self._reader = None
+        self._touched_at = 0.0
+
+    async def join(self):
+        self.channel_name = await self.layer.new_channel()
+        await self.layer.group_add(self.group, self.channel_name)
+        self._reader = asyncio.create_task(self._read_loop())
+        await self.mark_active(force=True)
+
+    async def leave(self):
+        if self._reader:
+            self._reader.cancel()
+
+        if self.channel_name:
+            await self.layer.group_discard(self.group, self.channel_name)
+            await sync_to_async(remove_hub_viewer)(self.hub_id, self.channel_name)
+
+    async def _read_loop(self):
+        while True:
+            message = await self.layer.receive(self.channel_name)
+            try:
+                await self.on_event(message)
+            except Exception:
+                # a broken socket shouldn't kill the reader, but a handler bug must show up
+                logger.exception("ephemeral event handler failed for %s", self.group)
+
+    async def mark_active(self, force: bool = False):
+        """
+        Bump this viewer in the recent-activity set (throttled in-process).
+        """
+        now = time.monotonic()
+        if not force and now - self._touched_at < ACTIVITY_TOUCH_SECONDS:
+            return
+
+        self._touched_at = now
+        await sync_to_async(touch_hub_viewer)(self.hub_id, self.channel_name)
+
+    async def publish(self, message: dict):
+        if not await _is_large_hub(self.hub_id):
+            await self.layer.group_send(self.group, message)
+            return
+
+        # ✅ capped fan-out: only the most recently active viewers
+        channels = await sync_to_async(recent_hub_viewers)(self.hub_id, FANOUT_CAP)
+        await asyncio.gather(
+            *(self.layer.send(channel, message) for channel in channels if channel != self.channel_name),
+            return_exceptions=True,
+        )
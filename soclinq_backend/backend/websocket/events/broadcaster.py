@@ -1,2 +1,69 @@
-def chat_group_name(group_id: str) -> str:
-    return f"chat:{group_id}"
+import asyncio
+import zlib
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+
+# =========================
+# ✅ SHARDED GROUPS
+# =========================
+# channels_redis keeps each group in one Redis key and group_send walks all of
+# it, so a country/state SYSTEM hub with every member in one group is a
+# hotspot. Such hubs are split into HUB_GROUP_SHARDS sub-groups by
+# channel-name hash; with several CHANNEL_LAYERS hosts the shards also land
+# on different Redis nodes.
+
+DEFAULT_HUB_GROUP_SHARDS = 16
+SHARDED_MAX_ADMIN_LEVEL = 1  # ADMIN_0 (country) and ADMIN_1 (state)
+
+_shard_counts = {}  # hub_id -> shards (hub type/level never change)
+
+
+def hub_group_shards(hub_id) -> int:
+    """
+    Number of sub-groups for a hub's chat group (1 = not sharded).
+    Sync: call through sync_to_async from consumers.
+    """
+    hub_id = str(hub_id)
+    shards = _shard_counts.get(hub_id)
+
+    if shards is None:
+        from community.models import CommunityHub, HubType
+
+        is_large = CommunityHub.objects.filter(
+            id=hub_id,
+            hub_type=HubType.SYSTEM,
+            admin_unit__level__lte=SHARDED_MAX_ADMIN_LEVEL,
+        ).exists()
+
+        shards = getattr(settings, "HUB_GROUP_SHARDS", DEFAULT_HUB_GROUP_SHARDS) if is_large else 1
+        _shard_counts[hub_id] = shards
+
+    return shards
+
+
+def shard_group(base: str, channel_name: str, shards: int) -> str:
+    """
+    The sub-group of `base` a given channel belongs to.
+    """
+    if shards <= 1:
+        return base
+    return f"{base}.s{zlib.crc32(channel_name.encode()) % shards}"
+
+
+def shard_groups(base: str, shards: int) -> list[str]:
+    if shards <= 1:
+        return [base]
+    return [f"{base}.s{i}" for i in range(shards)]
+
+
+async def group_send_all(base: str, message: dict, shards: int, channel_layer=None):
+    """
+    group_send to every shard of `base` in parallel.
+    """
+    channel_layer = channel_layer or get_channel_layer()
+
+    await asyncio.gather(
+        *(channel_layer.group_send(group, message) for group in shard_groups(base, shards))
+    )
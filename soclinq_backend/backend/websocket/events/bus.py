@@ -0,0 +1,162 @@
+# websocket/events/bus.py
+"""
+Chat event bus: the one place that knows event names, group names and the
+wire format.
+
+Views and consumers publish Event objects; the bus encodes the
+{"type", "payload"} envelope once per publish (orjson) and ships the
+encoded text through the channel layer, so every consumer forwards it with
+send(text_data=...) untouched and fan-out CPU stays flat in hub size.
+
+Counters (per process) track published, delivered and failed events per
+type; read them with bus_stats().
+"""
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.layers import get_channel_layer
+import orjson
+from django.core.serializers.json import DjangoJSONEncoder
+
+from websocket.events.broadcaster import group_send_all, hub_group_shards
+
+
+class HubEvent:
+    MESSAGE_NEW = "message:new"
+    MESSAGE_BATCH = "message:batch"
+    MESSAGE_EDIT = "message:edit"
+    MESSAGE_DELETE = "message:delete"
+    REACTION_UPDATE = "reaction:update"
+    DELIVERED_UPDATE = "message:delivered:update"
+    SEEN_UPDATE = "message:seen:update"
+    TYPING_UPDATE = "typing:update"
+    PRESENCE_BATCH = "presence:batch"
+
+
+class PrivateEvent:
+    MESSAGE_NEW = "message:new"
+    MESSAGE_BATCH = "message:batch"
+    DELIVERED = "message:delivered"
+    SEEN = "message:seen"
+
+
+@dataclass(frozen=True)
+class Event:
+    type: str
+    payload: dict
+
+    def envelope(self) -> dict:
+        return {"type": self.type, "payload": self.payload}
+
+
+# =========================
+# ✅ GROUP NAMING
+# =========================
+
+def hub_group(hub_id) -> str:
+    return f"hub_chat_{hub_id}"
+
+
+def private_group(conversation_id) -> str:
+    return f"private_chat_{conversation_id}"
+
+
+# =========================
+# ✅ SERIALIZATION
+# =========================
+
+_django_encoder = DjangoJSONEncoder()
+
+
+def dumps(content) -> str:
+    """
+    Fast JSON encoding; Decimal, lazy strings etc. fall back to DjangoJSONEncoder.
+    """
+    return orjson.dumps(
+        content,
+        default=_django_encoder.default,
+        option=orjson.OPT_NON_STR_KEYS,
+    ).decode()
+
+
+def encode_event(event: Event) -> str:
+    return dumps(event.envelope())
+
+
+def channel_message(event: Event, sender: str | None = None) -> dict:
+    """
+    Channel-layer message handled by BaseConsumer.broadcast.
+    """
+    return {
+        "type": "broadcast",
+        "event": event.type,
+        "text": encode_event(event),
+        "sender": sender,
+    }
+
+
+# =========================
+# ✅ COUNTERS
+# =========================
+
+_counters = {"published": Counter(), "delivered": Counter(), "failed": Counter()}
+_counters_lock = threading.Lock()
+
+
+def _count(kind: str, event_type: str | None):
+    with _counters_lock:
+        _counters[kind][event_type or "unknown"] += 1
+
+
+def record_delivered(event_type: str | None):
+    _count("delivered", event_type)
+
+
+def record_failed(event_type: str | None):
+    _count("failed", event_type)
+
+
+def bus_stats() -> dict:
+    with _counters_lock:
+        return {kind: dict(counter) for kind, counter in _counters.items()}
+
+
+# =========================
+# ✅ PUBLISH
+# =========================
+
+async def apublish_hub(hub_id, event: Event, sender: str | None = None, channel_layer=None, shards: int | None = None):
+    if shards is None:
+        shards = await sync_to_async(hub_group_shards)(hub_id)
+
+    await group_send_all(
+        hub_group(hub_id),
+        channel_message(event, sender),
+        shards,
+        channel_layer=channel_layer,
+    )
+    _count("published", event.type)
+
+
+def publish_hub(hub_id, event: Event, sender: str | None = None):
+    """
+    Sync publish to every socket of a hub (all shards).
+    """
+    async_to_sync(group_send_all)(
+        hub_group(hub_id),
+        channel_message(event, sender),
+        hub_group_shards(hub_id),
+    )
+    _count("published", event.type)
+
+
+async def apublish_private(conversation_id, event: Event, sender: str | None = None, channel_layer=None):
+    channel_layer = channel_layer or get_channel_layer()
+    await channel_layer.group_send(private_group(conversation_id), channel_message(event, sender))
+    _count("published", event.type)
+
+
+def publish_private(conversation_id, event: Event, sender: str | None = None):
+    async_to_sync(apublish_private)(conversation_id, event, sender)
@@ -1,22 +1,13 @@
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from websocket.events.bus import Event, publish_hub
 
 
 def notify_group(group_id: str, payload: dict, exclude_user_channel: str | None = None):
     """
-    Broadcast payload to a websocket chat group.
-    Group naming MUST match the consumer group_add.
+    Broadcast a {"type", "payload"} dict to a hub chat group.
+    Kept for callers outside the bus; new code should use publish_hub().
     """
-    channel_layer = get_channel_layer()
-
-    # ✅ Valid group name for Channels (no slashes, no spaces, < 100 chars)
-    group_name = f"chat_{group_id}"
-
-    async_to_sync(channel_layer.group_send)(
-        group_name,
-        {
-            "type": "broadcast",
-            "payload": payload,
-            "sender_channel": exclude_user_channel,
-        },
+    publish_hub(
+        group_id,
+        Event(payload["type"], payload.get("payload")),
+        sender=exclude_user_channel,
     )
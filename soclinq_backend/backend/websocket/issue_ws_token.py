@@ -1,4 +1,5 @@
 # websocket/ws_tokens.py
+import uuid
 from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
@@ -10,6 +11,7 @@ def issue_ws_token(user):
     payload = {
         "sub": str(user.id),
         "scope": "ws",
+        "jti": uuid.uuid4().hex,  # key for the WS principal cache
         "iat": timezone.now(),
         "exp": timezone.now() + timedelta(seconds=WS_TOKEN_TTL),
     }
@@ -1,10 +1,27 @@
+import time
+
+import redis
 from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.core.cache import cache
 from django.utils import timezone
 
 
 PRESENCE_TTL_SECONDS = 45  # user stays online if pinged within this window
 
+_redis_client = None
+
+
+def get_presence_redis():
+    """
+    Shared Redis client for presence sets (sorted sets need raw Redis,
+    the Django cache API can't express them).
+    """
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.PRESENCE_REDIS_URL)
+    return _redis_client
+
 
 def _presence_key(room: str, user_id: str) -> str:
     return f"presence:{room}:{user_id}"
@@ -52,3 +69,144 @@ def typing_allowed(room: str, user_id: str) -> bool:
         return False
     cache.set(key, True, timeout=1)
     return True
+
+
+# =========================
+# ✅ PER-HUB PRESENCE SETS
+# =========================
+# presence:hub:<hub>:online is a sorted set of user ids scored by last
+# heartbeat. Stale members are trimmed lazily on read, so the count is a
+# ZCARD (O(1)) after a cheap range delete.
+#
+# A user may hold several sockets (tabs, devices) on one hub:
+# presence:hub:<hub>:conns:<user> holds their channel names, and the user
+# leaves the online set only when the last live connection closes.
+
+
+def _hub_online_key(hub_id: str) -> str:
+    return f"presence:hub:{hub_id}:online"
+
+
+def _hub_connections_key(hub_id: str, user_id: str) -> str:
+    return f"presence:hub:{hub_id}:conns:{user_id}"
+
+
+# KEYS: connections, online; ARGV: channel_name, stale cutoff, user_id
+_REMOVE_CONNECTION_LUA = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZCARD', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[3])
+    return 1
+end
+return 0
+"""
+
+
+def touch_hub_presence(hub_id: str, user_id: str, channel_name: str):
+    key = _hub_online_key(hub_id)
+    connections_key = _hub_connections_key(hub_id, user_id)
+    now = time.time()
+
+    try:
+        pipe = get_presence_redis().pipeline(transaction=False)
+        pipe.zadd(connections_key, {channel_name: now})
+        pipe.expire(connections_key, PRESENCE_TTL_SECONDS * 2)
+        pipe.zadd(key, {str(user_id): now})
+        pipe.expire(key, PRESENCE_TTL_SECONDS * 2)
+        pipe.execute()
+    except redis.RedisError:
+        pass  # presence is best-effort
+
+
+def remove_hub_presence(hub_id: str, user_id: str, channel_name: str) -> bool:
+    """
+    Drop one connection; True if it was the user's last live one on the hub
+    (the user is then removed from the online set).
+    """
+    try:
+        last = get_presence_redis().eval(
+            _REMOVE_CONNECTION_LUA,
+            2,
+            _hub_connections_key(hub_id, user_id),
+            _hub_online_key(hub_id),
+            channel_name,
+            time.time() - PRESENCE_TTL_SECONDS,
+            str(user_id),
+        )
+    except redis.RedisError:
+        return True
+    return bool(last)
+
+
+def hub_online_counts(hub_ids) -> dict[str, int]:
+    """
+    Online member count for many hubs in one pipelined round trip.
+    Returns {hub_id_str: count}; empty dict if Redis is unavailable.
+    """
+    hub_ids = [str(h) for h in hub_ids]
+    if not hub_ids:
+        return {}
+
+    cutoff = time.time() - PRESENCE_TTL_SECONDS
+
+    try:
+        pipe = get_presence_redis().pipeline(transaction=False)
+        for hub_id in hub_ids:
+            key = _hub_online_key(hub_id)
+            pipe.zremrangebyscore(key, "-inf", cutoff)
+            pipe.zcard(key)
+        results = pipe.execute()
+    except redis.RedisError:
+        return {}
+
+    return dict(zip(hub_ids, results[1::2]))
+
+
+# =========================
+# ✅ RECENT VIEWERS (ephemeral fan-out targets)
+# =========================
+# presence:hub:<hub>:viewers is a sorted set of ephemeral channel names
+# scored by the last user-initiated activity (open, typing, read).
+
+VIEWER_IDLE_SECONDS = 10 * 60
+
+
+def _hub_viewers_key(hub_id: str) -> str:
+    return f"presence:hub:{hub_id}:viewers"
+
+
+def touch_hub_viewer(hub_id: str, channel_name: str):
+    key = _hub_viewers_key(hub_id)
+
+    try:
+        pipe = get_presence_redis().pipeline(transaction=False)
+        pipe.zadd(key, {channel_name: time.time()})
+        pipe.expire(key, VIEWER_IDLE_SECONDS)
+        pipe.execute()
+    except redis.RedisError:
+        pass
+
+
+def remove_hub_viewer(hub_id: str, channel_name: str):
+    try:
+        get_presence_redis().zrem(_hub_viewers_key(hub_id), channel_name)
+    except redis.RedisError:
+        pass
+
+
+def recent_hub_viewers(hub_id: str, limit: int) -> list[str]:
+    """
+    Channel names of the `limit` most recently active viewers of a hub.
+    """
+    key = _hub_viewers_key(hub_id)
+
+    try:
+        pipe = get_presence_redis().pipeline(transaction=False)
+        pipe.zremrangebyscore(key, "-inf", time.time() - VIEWER_IDLE_SECONDS)
+        pipe.zrevrange(key, 0, limit - 1)
+        _, channels = pipe.execute()
+    except redis.RedisError:
+        return []
+
+    return [c.decode() if isinstance(c, bytes) else c for c in channels]
@@ -0,0 +1,160 @@
+# websocket/presence_batch.py
+"""
+Per-hub presence batching.
+
+Instead of one presence:update group_send per connect/disconnect, each
+process collects join/leave events per hub and emits a single
+presence:batch delta every BATCH_WINDOW_SECONDS:
+
+    {"type": "presence:batch",
+     "payload": {"hubId": ..., "online": [userId...],
+                 "offline": [{"userId": ..., "lastSeen": iso}]}}
+
+Offline events are held for FLAP_SUPPRESS_SECONDS; if the user reconnects
+within that time (mobile network flap) neither edge is broadcast. Multiple
+sockets of one user in a process count as one presence.
+"""
+import asyncio
+import logging
+import time
+
+from django.utils import timezone
+
+from websocket.events.bus import Event, HubEvent, channel_message
+
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW_SECONDS = 2.0
+FLAP_SUPPRESS_SECONDS = 10.0
+MAX_FLUSH_RETRIES = 3  # then the delta is dropped; clients are stale until each user's next edge
+
+
+class _HubPresence:
+    def __init__(self, hub_id, group, channel_layer):
+        self.hub_id = hub_id
+        self.group = group
+        self.channel_layer = channel_layer
+
+        self.connections = {}      # user_id -> open socket count in this process
+        self.pending_online = set()
+        self.pending_offline = {}  # user_id -> (left_at monotonic, lastSeen iso)
+        self.failed_flushes = 0
+        self.flush_task = None
+
+
+class PresenceAggregator:
+    def __init__(self, window: float = BATCH_WINDOW_SECONDS, flap_suppress: float = FLAP_SUPPRESS_SECONDS):
+        self.window = window
+        self.flap_suppress = flap_suppress
+        self._hubs = {}
+
+    def _hub(self, hub_id, group, channel_layer) -> _HubPresence:
+        state = self._hubs.get(hub_id)
+        if state is None:
+            state = self._hubs[hub_id] = _HubPresence(hub_id, group, channel_layer)
+        return state
+
+    def joined(self, hub_id, group, channel_layer, user_id):
+        state = self._hub(hub_id, group, channel_layer)
+        user_id = str(user_id)
+
+        state.connections[user_id] = state.connections.get(user_id, 0) + 1
+        if state.connections[user_id] > 1:
+            return
+
+        if state.pending_offline.pop(user_id, None) is not None:
+            return  # ✅ flap: offline never went out, so online needn't either
+
+        state.pending_online.add(user_id)
+        self._schedule(state)
+
+    def left(self, hub_id, group, channel_layer, user_id):
+        state = self._hub(hub_id, group, channel_layer)
+        user_id = str(user_id)
+
+        remaining = state.connections.get(user_id, 0) - 1
+        if remaining > 0:
+            state.connections[user_id] = remaining
+            return
+        state.connections.pop(user_id, None)
+
+        if user_id in state.pending_online:
+            # joined and left within one window: nobody saw it
+            state.pending_online.discard(user_id)
+        else:
+            state.pending_offline[user_id] = (time.monotonic(), timezone.now().isoformat())
+
+        self._schedule(state)
+
+    def _schedule(self, state: _HubPresence):
+        if state.flush_task is None or state.flush_task.done():
+            state.flush_task = asyncio.create_task(self._flush_loop(state))
+
+    async def _flush_loop(self, state: _HubPresence):
+        while state.pending_online or state.pending_offline:
+            await asyncio.sleep(self.window)
+            await self._flush(state)
+
+        if not state.connections:
+            self._hubs.pop(state.hub_id, None)
+
+    async def _flush(self, state: _HubPresence):
+        cutoff = time.monotonic() - self.flap_suppress
+
+        online = sorted(state.pending_online)
+        state.pending_online = set()
+
+        offline = []
+        for user_id, (left_at, last_seen) in list(state.pending_offline.items()):
+            if left_at <= cutoff:
+                offline.append({"userId": user_id, "lastSeen": last_seen})
+                del state.pending_offline[user_id]
+
+        if not online and not offline:
+            return
+
+        try:
+            await state.channel_layer.group_send(
+                state.group,
+                channel_message(
+                    Event(
+                        HubEvent.PRESENCE_BATCH,
+                        {
+                            "hubId": str(state.hub_id),
+                            "online": online,
+                            "offline": offline,
+                        },
+                    )
+                ),
+            )
+        except Exception:
+            state.failed_flushes += 1
+            logger.exception(
+                "presence batch flush failed for hub %s (attempt %s)", state.hub_id, state.failed_flushes
+            )
+            if state.failed_flushes < MAX_FLUSH_RETRIES:
+                self._requeue(state, online, offline)
+            else:
+                state.failed_flushes = 0
+            return
+
+        state.failed_flushes = 0
+
+    @staticmethod
+    def _requeue(state: _HubPresence, online, offline):
+        """
+        Put an unsent delta back so the next window retries it. Edges that
+        happened since (reconnect, disconnect) win over the stale ones.
+        """
+        for user_id in online:
+            if user_id in state.connections and user_id not in state.pending_offline:
+                state.pending_online.add(user_id)
+
+        for item in offline:
+            user_id = item["userId"]
+            if user_id not in state.connections and user_id not in state.pending_offline:
+                state.pending_offline[user_id] = (0.0, item["lastSeen"])  # already past the flap window
+
+
+presence_aggregator = PresenceAggregator()
@@ -0,0 +1,194 @@
+# websocket/receipts.py
+"""
+Per-connection delivered/seen receipt buffering.
+
+Clients report receipts message by message while scrolling; the aggregator
+collects them and, every FLUSH_INTERVAL_SECONDS (or once MAX_BUFFERED ids
+are pending), writes them with a fixed handful of bulk statements and emits
+one batched broadcast per event kind.
+"""
+import asyncio
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from community.models import HubMessage, HubMessageReceipt
+from community.read_state import advance_hub_watermarks, watermark_mode
+from websocket.events.bus import Event, HubEvent
+
+
+FLUSH_INTERVAL_SECONDS = 0.5
+MAX_BUFFERED = 500
+
+
+def _as_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError):
+        return None
+
+
+class HubReceiptAggregator:
+    def __init__(self, hub_id, user_id, broadcast):
+        """
+        broadcast: async callable(event: Event) used for the batched updates.
+        """
+        self.hub_id = hub_id
+        self.user_id = user_id
+        self.broadcast = broadcast
+
+        self._delivered = set()
+        self._seen = set()
+        self._flush_task = None
+        self._lock = asyncio.Lock()
+
+    # =========================
+    # ✅ BUFFERING
+    # =========================
+
+    async def add_delivered(self, message_id):
+        mid = _as_uuid(message_id)
+        if mid is None:
+            return
+        self._delivered.add(mid)
+        await self._schedule()
+
+    async def add_seen(self, message_id):
+        mid = _as_uuid(message_id)
+        if mid is None:
+            return
+        # seen implies delivered
+        self._seen.add(mid)
+        await self._schedule()
+
+    async def _schedule(self):
+        if len(self._delivered) + len(self._seen) >= MAX_BUFFERED:
+            await self.flush()
+            return
+
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(FLUSH_INTERVAL_SECONDS)
+        await self.flush()
+
+    async def close(self):
+        """
+        Flush whatever is pending (call from disconnect).
+        """
+        await self.flush()
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+
+    # =========================
+    # ✅ FLUSH
+    # =========================
+
+    async def flush(self):
+        async with self._lock:
+            delivered, self._delivered = self._delivered, set()
+            seen, self._seen = self._seen, set()
+
+            if not delivered and not seen:
+                return
+
+            now = timezone.now()
+            result = await self._write(delivered, seen, now)
+
+        if result["delivered"]:
+            await self.broadcast(
+                Event(
+                    HubEvent.DELIVERED_UPDATE,
+                    {
+                        "messageId": result["delivered"][-1],
+                        "messageIds": result["delivered"],
+                        "userId": str(self.user_id),
+                        "deliveredAt": now.isoformat(),
+                    },
+                )
+            )
+
+        if result["seen"]:
+            await self.broadcast(
+                Event(
+                    HubEvent.SEEN_UPDATE,
+                    {
+                        "messageId": result["seen"][-1],
+                        "messageIds": result["seen"],
+                        "userId": str(self.user_id),
+                        "readAt": now.isoformat(),
+                    },
+                )
+            )
+
+    @sync_to_async
+    def _write(self, delivered: set, seen: set, now) -> dict:
+        # ✅ one query to validate every id against this hub (and order them)
+        created = dict(
+            HubMessage.objects
+            .filter(id__in=delivered | seen, hub_id=self.hub_id)
+            .order_by("created_at", "id")
+            .values_list("id", "created_at")
+        )
+        if not created:
+            return {"delivered": [], "seen": []}
+
+        rows = list(created)
+        seen_ids = [mid for mid in rows if mid in seen]
+        delivered_ids = [mid for mid in rows if mid in delivered and mid not in seen]
+        touched = seen_ids + delivered_ids
+
+        with transaction.atomic():
+            # ✅ per hub watermarks: collapsed to the newest message, never move back
+            newest = rows[-1]
+            newest_seen = seen_ids[-1] if seen_ids else None
+            advance_hub_watermarks(
+                user_id=self.user_id,
+                hub_id=self.hub_id,
+                now=now,
+                delivered=(created[newest], newest),
+                read=(created[newest_seen], newest_seen) if newest_seen else None,
+            )
+
+            if not watermark_mode():
+                self._write_receipts(touched, seen_ids, now)
+
+        return {
+            "delivered": [str(mid) for mid in rows if mid in delivered],
+            "seen": [str(mid) for mid in seen_ids],
+        }
+
+    def _write_receipts(self, touched: list, seen_ids: list, now):
+        seen_set = set(seen_ids)
+
+        # ✅ create missing receipts; existing ones keep their timestamps
+        HubMessageReceipt.objects.bulk_create(
+            [
+                HubMessageReceipt(
+                    message_id=mid,
+                    user_id=self.user_id,
+                    delivered_at=now,
+                    read_at=now if mid in seen_set else None,
+                )
+                for mid in touched
+            ],
+            ignore_conflicts=True,
+        )
+
+        HubMessageReceipt.objects.filter(
+            message_id__in=touched, user_id=self.user_id, delivered_at__isnull=True
+        ).update(delivered_at=now, updated_at=now)
+
+        if seen_ids:
+            HubMessageReceipt.objects.filter(
+                message_id__in=seen_ids, user_id=self.user_id, read_at__isnull=True
+            ).update(read_at=now, updated_at=now)
+
+            SeenBy = HubMessage.seen_by.through
+            SeenBy.objects.bulk_create(
+                [SeenBy(hubmessage_id=mid, user_id=self.user_id) for mid in seen_ids],
+                ignore_conflicts=True,
+            )
@@ -1,3 +1,670 @@
-from django.test import TestCase
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import redis
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from community.models import AdminUnit, CommunityHub, CommunityMembership, HubMessage, HubType
+from websocket import receipts
+from websocket.admission import (
+    TRY_AGAIN_LATER,
+    TokenBucket,
+    WSAdmissionMiddleware,
+    cached_hub_membership,
+    hub_membership_key,
+    membership_cache,
+)
+from websocket.consumers.base import BaseConsumer
+from websocket.consumers.hub_chat import HubChatConsumer
+from websocket.ephemeral import FANOUT_CAP, FULL_FANOUT_MAX_ONLINE, EphemeralChannel
+from websocket.events.broadcaster import group_send_all, hub_group_shards, shard_group, shard_groups
+from websocket.events.bus import (
+    Event,
+    HubEvent,
+    PrivateEvent,
+    apublish_hub,
+    apublish_private,
+    bus_stats,
+    channel_message,
+    dumps,
+    hub_group,
+    private_group,
+)
+from websocket.presence import get_presence_redis, hub_online_counts, remove_hub_presence, touch_hub_presence
+from websocket.presence_batch import PresenceAggregator
+from websocket.receipts import HubReceiptAggregator
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+# =========================
+# ✅ ADMISSION CONTROL
+# =========================
+
+class TokenBucketTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("websocket.admission.time.monotonic", new=self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_burst_then_reject(self):
+        bucket = TokenBucket(rate=2, burst=3)
+
+        self.assertEqual([bucket.try_take() for _ in range(4)], [True, True, True, False])
+
+    def test_refill(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        for _ in range(3):
+            bucket.try_take()
+
+        self.clock.now += 0.25
+        self.assertFalse(bucket.try_take())
+
+        self.clock.now += 0.5
+        self.assertTrue(bucket.try_take())
+        self.assertFalse(bucket.try_take())
+
+    def test_refill_capped_at_burst(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        bucket.try_take()
+
+        self.clock.now += 60
+        self.assertEqual([bucket.try_take() for _ in range(4)], [True, True, True, False])
+
+    def test_deficit_seconds(self):
+        bucket = TokenBucket(rate=2, burst=4)
+        self.assertEqual(bucket.deficit_seconds(), 0.0)
+
+        for _ in range(4):
+            bucket.try_take()
+        self.assertEqual(bucket.deficit_seconds(), 1.0)
+
+
+@override_settings(
+    WS_ADMISSION_RATE_PER_SECOND=1,
+    WS_ADMISSION_BURST=1,
+    WS_ADMISSION_RETRY_BASE_MS=1000,
+    WS_ADMISSION_RETRY_MAX_MS=5000,
+)
+class WSAdmissionMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        patcher = mock.patch("websocket.admission.time.monotonic", new=self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.app = mock.AsyncMock()
+        self.middleware = WSAdmissionMiddleware(self.app)
+
+    def connect(self, scope_type="websocket"):
+        sent = []
+
+        async def receive():
+            return {"type": "websocket.connect"}
+
+        async def send(message):
+            sent.append(message)
+
+        async_to_sync(self.middleware.__call__)({"type": scope_type}, receive, send)
+        return sent
+
+    def test_admits_within_budget(self):
+        self.assertEqual(self.connect(), [])
+        self.assertEqual(self.app.await_count, 1)
+
+    def test_rejects_over_budget_with_1013(self):
+        self.connect()
+        sent = self.connect()
+
+        self.assertEqual(self.app.await_count, 1)
+        self.assertEqual([m["type"] for m in sent], ["websocket.accept", "websocket.send", "websocket.close"])
+        self.assertEqual(sent[-1]["code"], TRY_AGAIN_LATER)
+
+        retry = json.loads(sent[1]["text"])
+        self.assertEqual(retry["type"], "ws:retry")
+        self.assertGreaterEqual(retry["payload"]["retryAfterMs"], 1000)
+        self.assertLessEqual(retry["payload"]["retryAfterMs"], 5000)
+
+    def test_admits_again_after_refill(self):
+        self.connect()
+        self.connect()
+
+        self.clock.now += 1
+        self.assertEqual(self.connect(), [])
+        self.assertEqual(self.app.await_count, 2)
+
+    def test_http_is_never_throttled(self):
+        self.connect()
+        self.connect(scope_type="http")
+
+        self.assertEqual(self.app.await_count, 2)
+
+    def test_retry_after_capped(self):
+        for _ in range(3):
+            self.connect()
+        self.middleware.bucket.tokens = -1000  # far behind
+
+        for _ in range(20):
+            self.assertLessEqual(self.middleware.retry_after_ms(), 5000)
+
+
+# =========================
+# ✅ MEMBERSHIP FAST PATH
+# =========================
+
+class MembershipCacheTests(SimpleTestCase):
+    def test_not_cached_without_shared_backend(self):
+        check = mock.Mock(return_value=True)
+
+        cached_hub_membership("hub", "user", check)
+        cached_hub_membership("hub", "user", check)
+
+        # a leave handled by another process must be seen on the next connect
+        self.assertEqual(check.call_count, 2)
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+            "ws_membership": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+                "LOCATION": "ws_membership_test",
+            },
+        }
+    )
+    def test_cached_on_shared_backend(self):
+        self.addCleanup(membership_cache.clear)
+        check = mock.Mock(return_value=True)
+
+        cached_hub_membership("hub", "user", check)
+        self.assertTrue(cached_hub_membership("hub", "user", check))
+        self.assertEqual(check.call_count, 1)
+
+        membership_cache.delete(hub_membership_key("hub", "user"))
+        check.return_value = False
+        self.assertFalse(cached_hub_membership("hub", "user", check))
+
+
+# =========================
+# ✅ HUB CHAT SEND
+# =========================
+
+class HubChatSendTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(phone_number="+2348000000001", username="user1")
+        cls.hub = CommunityHub.objects.create(name="Ikeja")
+        cls.membership = CommunityMembership.objects.create(user=cls.user, hub=cls.hub)
+
+    def setUp(self):
+        self.consumer = HubChatConsumer()
+        self.consumer.hub_id = str(self.hub.id)
+        self.consumer.user = self.user
+        self.consumer.channel_name = "test.channel"
+        self.consumer.channel_layer = mock.Mock()
+        self.consumer.room_shards = 1
+        self.consumer.send_json = mock.AsyncMock()
+
+        patcher = mock.patch("websocket.consumers.hub_chat.apublish_hub", new=mock.AsyncMock())
+        self.publish = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, **payload):
+        async_to_sync(self.consumer.receive_json)({"type": "message:send", "payload": payload})
+        return self.consumer.send_json.await_args.args[0]
+
+    def test_retry_acks_again_but_broadcasts_once(self):
+        first = self.send(clientTempId="tmp-1", text="hi")
+        retry = self.send(clientTempId="tmp-1", text="hi")
+
+        self.assertEqual(first["type"], "message:ack")
+        self.assertEqual(retry["type"], "message:ack")
+        self.assertEqual(retry["payload"]["id"], first["payload"]["id"])
+        self.assertEqual(HubMessage.objects.filter(hub=self.hub).count(), 1)
+
+        self.publish.assert_awaited_once()
+        self.assertEqual(self.publish.await_args.args[1].type, HubEvent.MESSAGE_NEW)
+
+    def test_invalid_message_type_is_rejected(self):
+        for message_type in ("BOGUS", "X" * 50, {"a": 1}):
+            with self.subTest(message_type=message_type):
+                reply = self.send(clientTempId="tmp-1", text="hi", messageType=message_type)
+                self.assertEqual(reply["type"], "ERROR")
+
+        self.assertFalse(HubMessage.objects.exists())
+
+    def test_long_client_temp_id_is_rejected(self):
+        reply = self.send(clientTempId="x" * 101, text="hi")
+
+        self.assertEqual(reply["type"], "ERROR")
+        self.assertFalse(HubMessage.objects.exists())
+
+    def test_left_member_cannot_send(self):
+        self.membership.is_active = False
+        self.membership.save()
+
+        reply = self.send(clientTempId="tmp-1", text="hi")
+
+        self.assertEqual(reply["type"], "ERROR")
+        self.assertFalse(HubMessage.objects.exists())
+        self.publish.assert_not_awaited()
+
+
+# =========================
+# ✅ HUB PRESENCE
+# =========================
+
+class HubPresenceTests(SimpleTestCase):
+    def setUp(self):
+        try:
+            get_presence_redis().ping()
+        except redis.RedisError:
+            self.skipTest("presence Redis not available")
+
+        self.hub_id = str(uuid.uuid4())
+        self.addCleanup(self.cleanup)
+
+    def cleanup(self):
+        client = get_presence_redis()
+        keys = list(client.scan_iter(f"presence:hub:{self.hub_id}:*"))
+        if keys:
+            client.delete(*keys)
+
+    def online(self):
+        return hub_online_counts([self.hub_id])[self.hub_id]
+
+    def test_online_until_last_connection_closes(self):
+        touch_hub_presence(self.hub_id, "user-1", "tab-a")
+        touch_hub_presence(self.hub_id, "user-1", "tab-b")
+        touch_hub_presence(self.hub_id, "user-2", "tab-c")
+        self.assertEqual(self.online(), 2)
+
+        self.assertFalse(remove_hub_presence(self.hub_id, "user-1", "tab-a"))
+        self.assertEqual(self.online(), 2)
+
+        self.assertTrue(remove_hub_presence(self.hub_id, "user-1", "tab-b"))
+        self.assertEqual(self.online(), 1)
+
+    def test_stale_connection_does_not_pin_user_online(self):
+        with mock.patch("websocket.presence.time.time", return_value=1_000.0):
+            touch_hub_presence(self.hub_id, "user-1", "crashed-tab")
+        touch_hub_presence(self.hub_id, "user-1", "tab-a")
+
+        self.assertTrue(remove_hub_presence(self.hub_id, "user-1", "tab-a"))
+
+
+# =========================
+# ✅ PRESENCE BATCHING
+# =========================
+
+class PresenceAggregatorTests(SimpleTestCase):
+    WINDOW = 0.01
+    FLAP = 0.05
+
+    def setUp(self):
+        self.layer = mock.Mock(group_send=mock.AsyncMock())
+        self.presence = PresenceAggregator(window=self.WINDOW, flap_suppress=self.FLAP)
+
+    def join(self, user_id):
+        self.presence.joined("hub", "hub_chat_hub", self.layer, user_id)
+
+    def leave(self, user_id):
+        self.presence.left("hub", "hub_chat_hub", self.layer, user_id)
+
+    def batches(self):
+        return [json.loads(c.args[1]["text"])["payload"] for c in self.layer.group_send.await_args_list]
+
+    def run_events(self, *steps, settle=None):
+        async def scenario():
+            for step in steps:
+                if isinstance(step, float):
+                    await asyncio.sleep(step)
+                else:
+                    step()
+            await asyncio.sleep(settle if settle is not None else self.FLAP * 3)
+
+        async_to_sync(scenario)()
+
+    def test_joins_in_one_window_are_one_batch(self):
+        self.run_events(lambda: self.join("b"), lambda: self.join("a"), lambda: self.join("a"))
+
+        self.assertEqual(self.batches(), [{"hubId": "hub", "online": ["a", "b"], "offline": []}])
+
+    def test_user_stays_online_while_a_socket_is_open(self):
+        self.run_events(lambda: self.join("a"), lambda: self.join("a"), self.WINDOW * 3, lambda: self.leave("a"))
+
+        self.assertEqual(len(self.batches()), 1)
+
+    def test_reconnect_within_flap_window_is_silent(self):
+        self.run_events(
+            lambda: self.join("a"),
+            self.WINDOW * 3,
+            lambda: self.leave("a"),
+            self.WINDOW,
+            lambda: self.join("a"),
+        )
+
+        self.assertEqual([b["online"] for b in self.batches()], [["a"]])
+        self.assertEqual([b["offline"] for b in self.batches()], [[]])
+
+    def test_offline_sent_after_flap_window(self):
+        self.run_events(lambda: self.join("a"), self.WINDOW * 3, lambda: self.leave("a"))
+
+        offline = self.batches()[-1]["offline"]
+        self.assertEqual([item["userId"] for item in offline], ["a"])
+
+    def test_failed_flush_is_retried(self):
+        self.layer.group_send.side_effect = [ConnectionError("layer down"), None]
+
+        with self.assertLogs("websocket.presence_batch", level="ERROR"):
+            self.run_events(lambda: self.join("a"))
+
+        self.assertEqual([b["online"] for b in self.batches()], [["a"], ["a"]])
+
+
+# =========================
+# ✅ EPHEMERAL CHANNEL
+# =========================
+
+class EphemeralChannelTests(SimpleTestCase):
+    def setUp(self):
+        self.layer = mock.Mock(group_send=mock.AsyncMock(), send=mock.AsyncMock())
+
+        for target, kwargs in (
+            ("websocket.ephemeral.get_channel_layer", {"return_value": self.layer}),
+            ("websocket.ephemeral._hub_size", {"new": {}}),
+            ("websocket.ephemeral.touch_hub_viewer", {}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.channel = EphemeralChannel("hub", on_event=mock.AsyncMock())
+        self.channel.channel_name = "eph.me"
+
+    def publish(self, online):
+        with (
+            mock.patch("websocket.ephemeral.hub_online_counts", return_value={"hub": online}) as counts,
+            mock.patch("websocket.ephemeral.recent_hub_viewers", return_value=["eph.me", "eph.a", "eph.b"]) as viewers,
+        ):
+            async_to_sync(self.channel.publish)({"type": "typing"})
+        return counts, viewers
+
+    def test_small_hub_uses_group(self):
+        self.publish(online=3)
+
+        self.layer.group_send.assert_awaited_once_with("hub_eph_hub", {"type": "typing"})
+        self.layer.send.assert_not_awaited()
+
+    def test_large_hub_fans_out_to_recent_viewers_only(self):
+        _, viewers = self.publish(online=FULL_FANOUT_MAX_ONLINE + 1)
+
+        viewers.assert_called_once_with("hub", FANOUT_CAP)
+        self.layer.group_send.assert_not_awaited()
+        self.assertEqual(sorted(c.args[0] for c in self.layer.send.await_args_list), ["eph.a", "eph.b"])
+
+    def test_hub_size_is_cached(self):
+        self.publish(online=3)
+        counts, _ = self.publish(online=3)
+
+        counts.assert_not_called()
+
+    def test_handler_error_does_not_stop_reader(self):
+        messages = [{"n": 1}, {"n": 2}]
+
+        async def receive(channel_name):
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        self.layer.receive = receive
+        self.channel.on_event.side_effect = [RuntimeError("boom"), None]
+
+        async def scenario():
+            reader = asyncio.create_task(self.channel._read_loop())
+            await asyncio.sleep(0.01)
+            reader.cancel()
+
+        with self.assertLogs("websocket.ephemeral", level="ERROR"):
+            async_to_sync(scenario)()
+
+        self.assertEqual([c.args[0] for c in self.channel.on_event.await_args_list], [{"n": 1}, {"n": 2}])
+
+
+# =========================
+# ✅ RECEIPT BUFFERING
+# =========================
+
+def _ids(n):
+    return [str(uuid.uuid4()) for _ in range(n)]
+
+
+class HubReceiptAggregatorTests(SimpleTestCase):
+    def setUp(self):
+        self.broadcast = mock.AsyncMock()
+        self.write = mock.AsyncMock(side_effect=self.fake_write)
+        self.aggregator = HubReceiptAggregator(hub_id="hub", user_id="user", broadcast=self.broadcast)
+        self.aggregator._write = self.write
+
+        for name, value in (("FLUSH_INTERVAL_SECONDS", 0.01), ("MAX_BUFFERED", 3)):
+            patcher = mock.patch.object(receipts, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @staticmethod
+    async def fake_write(delivered, seen, now):
+        return {
+            "delivered": sorted(str(m) for m in delivered),
+            "seen": sorted(str(m) for m in seen),
+        }
+
+    def test_flushes_once_after_interval(self):
+        delivered = _ids(2)
+
+        async def scenario():
+            for mid in delivered:
+                await self.aggregator.add_delivered(mid)
+            self.write.assert_not_awaited()
+
+            await asyncio.sleep(0.05)
+
+        async_to_sync(scenario)()
+
+        self.write.assert_awaited_once()
+        self.assertEqual(self.broadcast.await_count, 1)
+        event = self.broadcast.await_args.args[0]
+        self.assertEqual(event.type, HubEvent.DELIVERED_UPDATE)
+        self.assertEqual(event.payload["messageIds"], sorted(delivered))
+
+    def test_flushes_inline_at_max_buffered(self):
+        async def scenario():
+            await self.aggregator.add_delivered(_ids(1)[0])
+            await self.aggregator.add_seen(_ids(1)[0])
+            await self.aggregator.add_seen(_ids(1)[0])
+
+            self.write.assert_awaited_once()
+            await self.aggregator.close()
+
+        async_to_sync(scenario)()
+
+        self.assertEqual(
+            [c.args[0].type for c in self.broadcast.await_args_list],
+            [HubEvent.DELIVERED_UPDATE, HubEvent.SEEN_UPDATE],
+        )
+
+    def test_duplicates_and_invalid_ids_collapse(self):
+        mid = _ids(1)[0]
+
+        async def scenario():
+            for value in (mid, mid, "not-a-uuid", None):
+                await self.aggregator.add_seen(value)
+            await self.aggregator.close()
+
+        async_to_sync(scenario)()
+
+        delivered, seen, _ = self.write.await_args.args
+        self.assertEqual((delivered, {str(m) for m in seen}), (set(), {mid}))
+
+    def test_close_flushes_pending_and_empty_flush_writes_nothing(self):
+        async def scenario():
+            await self.aggregator.close()
+            self.write.assert_not_awaited()
+
+            await self.aggregator.add_delivered(_ids(1)[0])
+            await self.aggregator.close()
+
+        async_to_sync(scenario)()
+
+        self.write.assert_awaited_once()
+
+
+# =========================
+# ✅ SHARDED HUB GROUPS
+# =========================
+
+def make_unit(code, level, parent=None):
+    square = Polygon(((0, 0), (0, 1), (1, 1), (1, 0), (0, 0)), srid=4326)
+    return AdminUnit.objects.create(
+        country_code="NG",
+        level=level,
+        code=code,
+        name=code,
+        parent=parent,
+        geom=MultiPolygon(square, srid=4326),
+    )
+
+
+@override_settings(HUB_GROUP_SHARDS=4)
+class HubGroupShardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        lagos = make_unit("NGA.25_1", 1)
+        cls.state_hub = CommunityHub.objects.create(name="Lagos", hub_type=HubType.SYSTEM, admin_unit=lagos)
+        cls.lga_hub = CommunityHub.objects.create(
+            name="Ikeja",
+            hub_type=HubType.SYSTEM,
+            admin_unit=make_unit("NGA.25.10_1", 2, parent=lagos),
+        )
+        cls.local_hub = CommunityHub.objects.create(name="Allen Avenue", hub_type=HubType.LOCAL)
+
+    def setUp(self):
+        patcher = mock.patch.dict("websocket.events.broadcaster._shard_counts", clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_state_and_country_system_hubs_are_sharded(self):
+        self.assertEqual(hub_group_shards(self.state_hub.id), 4)
+        self.assertEqual(hub_group_shards(self.lga_hub.id), 1)
+        self.assertEqual(hub_group_shards(self.local_hub.id), 1)
+
+    def test_shard_count_is_cached_per_hub(self):
+        hub_group_shards(self.state_hub.id)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(hub_group_shards(str(self.state_hub.id)), 4)
+
+    def test_channel_maps_to_one_stable_shard(self):
+        base = f"hub_{self.state_hub.id}"
+        group = shard_group(base, "specific.abc!123", 4)
+
+        self.assertIn(group, shard_groups(base, 4))
+        self.assertEqual(group, shard_group(base, "specific.abc!123", 4))
+        self.assertEqual(shard_group(base, "specific.abc!123", 1), base)
+        self.assertEqual(shard_groups(base, 1), [base])
+
+    def test_group_send_all_reaches_every_shard(self):
+        layer = mock.Mock(group_send=mock.AsyncMock())
+        message = {"type": "hub.event"}
+
+        async_to_sync(group_send_all)("hub_x", message, 4, channel_layer=layer)
+
+        self.assertEqual(
+            sorted(c.args[0] for c in layer.group_send.await_args_list),
+            ["hub_x.s0", "hub_x.s1", "hub_x.s2", "hub_x.s3"],
+        )
+
+
+# =========================
+# ✅ EVENT BUS
+# =========================
+
+class EventBusTests(SimpleTestCase):
+    def setUp(self):
+        self.layer = mock.Mock(group_send=mock.AsyncMock())
+
+    def published(self, event_type):
+        return bus_stats()["published"].get(event_type, 0)
+
+    def test_hub_publish_reaches_every_shard(self):
+        event = Event(HubEvent.MESSAGE_NEW, {"id": "m1"})
+        before = self.published(HubEvent.MESSAGE_NEW)
+
+        async_to_sync(apublish_hub)("h1", event, sender="me", channel_layer=self.layer, shards=2)
+
+        groups = sorted(c.args[0] for c in self.layer.group_send.await_args_list)
+        self.assertEqual(groups, [f"{hub_group('h1')}.s0", f"{hub_group('h1')}.s1"])
+
+        message = self.layer.group_send.await_args.args[1]
+        self.assertEqual((message["type"], message["event"], message["sender"]), ("broadcast", HubEvent.MESSAGE_NEW, "me"))
+        self.assertEqual(json.loads(message["text"]), {"type": HubEvent.MESSAGE_NEW, "payload": {"id": "m1"}})
+
+        # one publish, however many shards
+        self.assertEqual(self.published(HubEvent.MESSAGE_NEW), before + 1)
+
+    def test_private_publish_uses_conversation_group(self):
+        async_to_sync(apublish_private)("c1", Event(PrivateEvent.SEEN, {}), channel_layer=self.layer)
+
+        self.layer.group_send.assert_awaited_once()
+        self.assertEqual(self.layer.group_send.await_args.args[0], private_group("c1"))
+
+    def test_group_names(self):
+        self.assertEqual(hub_group("h1"), "hub_chat_h1")
+        self.assertEqual(private_group("c1"), "private_chat_c1")
+
+
+# =========================
+# ✅ PRE-ENCODED ENVELOPES
+# =========================
+
+class EnvelopeTests(SimpleTestCase):
+    def setUp(self):
+        self.consumer = BaseConsumer()
+        self.consumer.channel_name = "test.channel"
+        self.consumer.send = mock.AsyncMock()
+
+    def test_dumps_handles_django_types(self):
+        message_id = uuid.uuid4()
+        sent_at = datetime(2026, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+        data = json.loads(dumps({"id": message_id, "at": sent_at, "amount": Decimal("1.50"), 1: "x"}))
+
+        self.assertEqual(data, {"id": str(message_id), "at": "2026-03-01T12:00:00+00:00", "amount": "1.50", "1": "x"})
+
+    def test_broadcast_forwards_encoded_text(self):
+        message = channel_message(Event(HubEvent.MESSAGE_NEW, {"id": "m1"}))
+
+        with mock.patch.object(BaseConsumer, "encode_json") as encode:
+            async_to_sync(self.consumer.broadcast)(message)
+
+        encode.assert_not_called()
+        self.consumer.send.assert_awaited_once_with(text_data=message["text"])
+
+    def test_broadcast_skips_publishing_socket(self):
+        message = channel_message(Event(HubEvent.TYPING_UPDATE, {}), sender="test.channel")
+
+        async_to_sync(self.consumer.broadcast)(message)
+
+        self.consumer.send.assert_not_awaited()
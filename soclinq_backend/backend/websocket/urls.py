@@ -5,6 +5,13 @@ from websocket.consumers.stream import StreamOwnerConsumer
 from websocket.consumers.admin import AdminConsumer
 from websocket.consumers.hub_chat import HubChatConsumer
 from websocket.consumers.private_chat import PrivateChatConsumer
+from websocket.views import EventBusStatsView
+
+# ✅ HTTP routes (mounted at api/v1/ws/)
+urlpatterns = [
+    path("stats/", EventBusStatsView.as_view(), name="websocket-stats"),
+]
+
 websocket_urlpatterns = [
     path("ws/responders/", ResponderConsumer.as_asgi()),
     path("ws/stream/", StreamOwnerConsumer.as_asgi()),
@@ -5,7 +5,7 @@ from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from websocket.ws_tokens import issue_ws_token
+from websocket.issue_ws_token import issue_ws_token
 
 class WebSocketTokenView(APIView):
     permission_classes = [IsAuthenticated]
@@ -13,3 +13,19 @@ class WebSocketTokenView(APIView):
     def post(self, request):
         token = issue_ws_token(request.user)
         return Response({"wsToken": token})
+
+
+from rest_framework.permissions import IsAdminUser
+from websocket.events.bus import bus_stats
+from community.geo_cache import resolution_cache
+
+
+class EventBusStatsView(APIView):
+    """
+    Counters of the serving process: chat events (published/delivered/failed)
+    and the geo resolution cache (hits/misses/hit rate).
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({**bus_stats(), "geoResolveCache": resolution_cache.stats()})
@@ -12,6 +12,7 @@ type SeenByMap = Record<string, string>;
 type WSIncoming =
   | { type: "message:new"; payload: ChatMessage }
   | { type: "message:ack"; payload: ChatMessage }
+  | { type: "message:batch"; payload: { messages: ChatMessage[] } }
   | { type: "message:delivered"; payload: { messageId: string } }
   | { type: "message:seen"; payload: { messageId: string; userId: string } }
   | {
@@ -42,6 +43,14 @@ type WSIncoming =
         lastSeen?: string | null;
       };
     }
+  | {
+      type: "presence:batch";
+      payload: {
+        hubId: string;
+        online: string[];
+        offline: { userId: string; lastSeen: string | null }[];
+      };
+    }
   | { type: "ERROR"; message: string }
   | { type: string; payload?: any };
 
@@ -96,8 +105,8 @@ export function useChatThreadWS({
 
       /* ---------- MESSAGE NEW / ACK ---------- */
 
-      if (evt.type === "message:new" || evt.type === "message:ack") {
-        const msg = normalizeMine(evt.payload);
+      const upsertMessage = (incoming: ChatMessage) => {
+        const msg = normalizeMine(incoming);
         const hash = hashMessage(msg);
       
         if (knownHashes.current.has(hash)) return;
@@ -122,7 +131,17 @@ export function useChatThreadWS({
       
           return [...prev, { ...msg, status: msg.status ?? "sent" }];
         });
-      
+      };
+
+      if (evt.type === "message:new" || evt.type === "message:ack") {
+        upsertMessage(evt.payload);
+        return;
+      }
+
+      /* ---------- MESSAGE BATCH (bulk forward) ---------- */
+
+      if (evt.type === "message:batch") {
+        for (const m of evt.payload?.messages ?? []) upsertMessage(m);
         return;
       }
       
@@ -295,6 +314,28 @@ export function useChatThreadWS({
           })
         );
       }
+
+      /* ✅ hub presence arrives as batched deltas → one presence-ws event per user */
+
+      if (evt.type === "presence:batch") {
+        const { online = [], offline = [] } = evt.payload ?? {};
+
+        for (const userId of online) {
+          window.dispatchEvent(
+            new CustomEvent("chat:presence-ws", {
+              detail: { userId, online: true, lastSeen: null },
+            })
+          );
+        }
+
+        for (const { userId, lastSeen } of offline) {
+          window.dispatchEvent(
+            new CustomEvent("chat:presence-ws", {
+              detail: { userId, online: false, lastSeen: lastSeen ?? null },
+            })
+          );
+        }
+      }
     },
   });
 